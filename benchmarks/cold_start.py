@@ -0,0 +1,102 @@
+import os
+import sys
+import json
+import time
+import signal
+import argparse
+import itertools
+import statistics
+import subprocess
+import tempfile
+from utils.stand_in_servers import StandInOpenAIServer, StandInTTSServer
+from utils.synthetic_audio import utterance, to_int16
+from utils.audio_clip import AudioClip
+from utils.control_socket import send_command
+
+# Cold start of the headless service (daemon.py) against local stand-in
+# servers: the time from launching the process until its control socket
+# answers, the service's own breakdown of that time, and how long the first
+# utterance takes (until its answer is spoken) compared with the second, since
+# stages load what they need on first use. For comparison it also times
+# importing the GUI application, if its dependencies are installed.
+#
+# Usage: python -m benchmarks.cold_start [--runs 3]
+
+def time_gui_import():
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, '-c', 'import app'], capture_output=True, text=True)
+    if result.returncode != 0:
+        return None, result.stderr.strip().splitlines()[-1]
+    return (time.perf_counter() - start) * 1000, None
+
+def wait_until_ready(process, socket_path, timeout=30):
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"The service exited with status {process.returncode}")
+        try:
+            return send_command('status', path=socket_path, timeout=1)
+        except OSError:
+            time.sleep(0.005)
+    raise RuntimeError("The service did not become ready")
+
+def process_utterance(socket_path, wav_path):
+    completed = send_command('status', path=socket_path)['pipeline']['completed']
+    start = time.perf_counter()
+    send_command('submit', {'path': wav_path}, path=socket_path)
+    while True:
+        status = send_command('status', path=socket_path)
+        if status['pipeline']['completed'] > completed and not status['speaking']:
+            return (time.perf_counter() - start) * 1000, status
+        time.sleep(0.005)
+
+def main():
+    parser = argparse.ArgumentParser(description='Cold start of the headless service')
+    parser.add_argument('--runs', type=int, default=3, help='Service launches to average')
+    args = parser.parse_args()
+
+    gui_ms, gui_error = time_gui_import()
+    print(f"GUI application imports: {f'{gui_ms:.0f} ms' if gui_error is None else f'unavailable ({gui_error})'}")
+
+    # Every utterance gets a new question, so the second is not answered from the response cache
+    questions = itertools.count(1)
+    with tempfile.TemporaryDirectory() as directory, \
+            StandInOpenAIServer(transcribe=lambda filename, audio: f"Question number {next(questions)}?",
+                                latency=0.05) as openai_server, \
+            StandInTTSServer() as tts_server:
+        socket_path = os.path.join(directory, 'control.sock')
+        wav_path = os.path.join(directory, 'utterance.wav')
+        AudioClip(to_int16(utterance(2.0))).save(wav_path)
+        # One spoken-answer hotkey, whatever the user's own settings are
+        settings_path = os.path.join(directory, 'settings.json')
+        with open(settings_path, 'w') as f:
+            json.dump({'hotkey1_output': 'LLM', 'hotkey1_model': 'stand-in'}, f)
+        env = dict(os.environ, CONTROL_SOCKET=socket_path, OPENAI_API_BASE=openai_server.base_url,
+                   TTS_STAND_IN_ENDPOINT=tts_server.endpoint, TRACING='0')
+
+        ready_times = []
+        breakdowns = []
+        for run in range(args.runs):
+            start = time.perf_counter()
+            command = [sys.executable, 'daemon.py', 'serve', '--no-prewarm', '--settings', settings_path]
+            process = subprocess.Popen(command, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            try:
+                status = wait_until_ready(process, socket_path)
+                ready_times.append((time.perf_counter() - start) * 1000)
+                breakdowns.append(status['cold_start_ms'])
+                if run == args.runs - 1:
+                    print(f"Loaded at start: {status['loaded_modules'] or 'none of the heavy modules'}")
+                    for label in ('First', 'Second'):
+                        elapsed, status = process_utterance(socket_path, wav_path)
+                        print(f"{label} utterance: {elapsed:.0f} ms; loaded: {status['loaded_modules']}")
+            finally:
+                process.send_signal(signal.SIGTERM if hasattr(signal, 'SIGTERM') else signal.SIGINT)
+                process.wait(10)
+
+    print(f"Launch to ready: median {statistics.median(ready_times):.0f} ms over {args.runs} run(s) "
+          f"(includes starting the interpreter)")
+    for phase in breakdowns[0]:
+        print(f"  {phase:20s} {statistics.median(breakdown[phase] for breakdown in breakdowns):7.1f} ms")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+import argparse
+import random
+import string
+import time
+from types import SimpleNamespace
+from utils.hotkey_dispatch import HotkeyDispatcher
+
+# Cost per keystroke (press + release) in the keyboard hook: the old layout,
+# one listener per hotkey each checking every key, against the single
+# dispatcher with a lookup table. No real keyboard hook is installed; the
+# callbacks are called directly with pynput-like key objects.
+#
+# Usage: python -m benchmarks.hotkey_dispatch [--keystrokes 200000] [--profiles 3 10 100]
+
+def make_keys(count, hotkeys, seed=0):
+    # Mostly typing, with a hotkey now and then
+    rng = random.Random(seed)
+    letters = [SimpleNamespace(char=c) for c in string.ascii_lowercase + string.digits]
+    special = [SimpleNamespace(char=None, name=hotkey) for hotkey in hotkeys]
+    return [rng.choice(special) if rng.random() < 0.01 else rng.choice(letters) for _ in range(count)]
+
+def per_listener_callbacks(hotkeys, post, is_busy):
+    # The previous design: every listener sees every key
+    callbacks = []
+    for hotkey_id, hotkey in hotkeys.items():
+        key_combination = {hotkey.lower()}
+        state = {'pressed': False}
+
+        def on_press(key, key_combination=key_combination, state=state, hotkey_id=hotkey_id):
+            try:
+                key_char = key.char.lower()
+            except AttributeError:
+                key_char = key.name.lower()
+            if is_busy():
+                post('interrupt', None)
+            if key_char in key_combination and not state['pressed']:
+                state['pressed'] = True
+                post('toggle', hotkey_id)
+
+        def on_release(key, key_combination=key_combination, state=state):
+            try:
+                key_char = key.char.lower()
+            except AttributeError:
+                key_char = key.name.lower()
+            if key_char in key_combination:
+                state['pressed'] = False
+
+        callbacks.append((on_press, on_release))
+    return callbacks
+
+def time_keystrokes(keys, callbacks):
+    start = time.perf_counter_ns()
+    for key in keys:
+        for on_press, _ in callbacks:
+            on_press(key)
+        for _, on_release in callbacks:
+            on_release(key)
+    return (time.perf_counter_ns() - start) / len(keys)
+
+def main():
+    parser = argparse.ArgumentParser(description='Keyboard hook cost per keystroke')
+    parser.add_argument('--keystrokes', type=int, default=200000)
+    parser.add_argument('--profiles', type=int, nargs='+', default=[3, 10, 100])
+    args = parser.parse_args()
+
+    post = lambda event, hotkey_id: None
+    is_busy = lambda: False
+    print(f"{'profiles':>8}{'per-listener (ns)':>19}{'dispatcher (ns)':>17}{'speed-up':>10}")
+    for count in args.profiles:
+        hotkeys = {f'hotkey{index + 1}': f'f{index + 1}' for index in range(count)}
+        keys = make_keys(args.keystrokes, list(hotkeys.values()))
+
+        old = time_keystrokes(keys, per_listener_callbacks(hotkeys, post, is_busy))
+        dispatcher = HotkeyDispatcher(post, is_busy)
+        for hotkey_id, hotkey in hotkeys.items():
+            dispatcher.bind(hotkey_id, hotkey, 'Toggle')
+        new = time_keystrokes(keys, [(dispatcher.on_press, dispatcher.on_release)])
+        print(f"{count:>8}{old:>19.0f}{new:>17.0f}{old / new:>9.1f}x")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,55 @@
+import argparse
+import statistics
+import time
+from utils.stand_in_servers import StandInOpenAIServer
+from utils import async_runtime
+import utils.gpt_response as gpt_response
+
+# Time to first audio for buffered vs streamed LLM responses, measured against
+# the local stand-in server. Speech synthesis is modelled as a fixed request
+# latency plus a per-character cost, so only the LLM path is real.
+#
+# Usage: python -m benchmarks.llm_streaming [--runs 5] [--latency 0.3] [--token-interval 0.03]
+
+def synthesis_seconds(text, base, per_char):
+    return base + per_char * len(text)
+
+def measure_buffered(args):
+    start = time.perf_counter()
+    answer = async_runtime.run(gpt_response.get_response('benchmark', 'stand-in', 'LLM', 'Be brief.', use_cache=False))
+    handed_off = time.perf_counter() - start
+    return handed_off + synthesis_seconds(answer, args.tts_base, args.tts_per_char)
+
+def measure_streamed(args):
+    first = []
+
+    def speak(sentence):
+        if not first:
+            first.append(time.perf_counter() - start + synthesis_seconds(sentence, args.tts_base, args.tts_per_char))
+
+    start = time.perf_counter()
+    async_runtime.run(gpt_response.speak_streamed_response('benchmark', 'stand-in', 'LLM', 'Be brief.', speak, use_cache=False))
+    return first[0]
+
+def main():
+    parser = argparse.ArgumentParser(description='Time to first audio, buffered vs streamed LLM responses')
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--latency', type=float, default=0.3, help='Seconds before the first byte')
+    parser.add_argument('--token-interval', type=float, default=0.03, help='Seconds between streamed tokens')
+    parser.add_argument('--tts-base', type=float, default=0.15, help='Modelled TTS request latency')
+    parser.add_argument('--tts-per-char', type=float, default=0.002, help='Modelled TTS cost per character')
+    args = parser.parse_args()
+
+    with StandInOpenAIServer(latency=args.latency, token_interval=args.token_interval) as server:
+        gpt_response.CHAT_COMPLETIONS_URL = f'{server.base_url}/chat/completions'
+        buffered = [measure_buffered(args) for _ in range(args.runs)]
+        streamed = [measure_streamed(args) for _ in range(args.runs)]
+    async_runtime.shutdown()
+
+    print(f"{'mode':<10}{'median TTFA (ms)':>18}{'min (ms)':>10}{'max (ms)':>10}")
+    for mode, values in (('buffered', buffered), ('streamed', streamed)):
+        print(f"{mode:<10}{statistics.median(values) * 1000:>18.1f}{min(values) * 1000:>10.1f}{max(values) * 1000:>10.1f}")
+    print(f"Streaming saves {(statistics.median(buffered) - statistics.median(streamed)) * 1000:.1f} ms to first audio.")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+import re
+import time
+import argparse
+from utils.stand_in_servers import StandInOpenAIServer
+from utils.synthetic_audio import SAMPLE_RATE, speech_like, noise, concat, to_int16
+from utils.audio_clip import AudioClip
+from utils.chunked_transcription import split_at_pauses
+from utils import async_runtime
+import utils.transcription as transcription
+
+# Long-recording transcription check. A synthetic recording of sentences
+# separated by pauses, plus one stretch of speech with no pause longer than a
+# chunk, is transcribed through the stand-in server. The stand-in "hears" one
+# word per WORD_SECONDS of speech (w0, w1, ...) in whatever range a chunk
+# covers, so words in a hard-cut overlap come back twice, as they would from a
+# real model. The merged transcript must list every word exactly once, in
+# order. Chunked transcription is timed serially and with the parallel limit.
+#
+# Usage: python -m benchmarks.long_recording [--latency 0.5] [--unbroken 45]
+
+WORD_SECONDS = 0.5
+
+def build_recording(sentences, sentence_seconds, pause_seconds, unbroken_seconds):
+    # Returns the int16 samples and the (start, end) sample range of each word
+    parts, words, position = [], [], 0
+    segments = [sentence_seconds] * sentences + [unbroken_seconds, sentence_seconds]
+    for index, seconds in enumerate(segments):
+        speech = speech_like(seconds, seed=index)
+        words += [(position + offset, position + offset + int(WORD_SECONDS * SAMPLE_RATE))
+                  for offset in range(0, len(speech), int(WORD_SECONDS * SAMPLE_RATE))]
+        parts += [speech, noise(pause_seconds, seed=index)]
+        position += len(speech) + int(pause_seconds * SAMPLE_RATE)
+    return to_int16(concat(*parts)), words
+
+def make_transcriber(samples, words):
+    chunks = split_at_pauses(samples, SAMPLE_RATE)
+
+    def transcribe(filename, audio):
+        start, end = chunks[int(re.search(r'_part(\d+)', filename).group(1))]
+        return ' '.join(f'w{index}' for index, (word_start, word_end) in enumerate(words)
+                        if start <= (word_start + word_end) // 2 < end)
+    return transcribe, chunks
+
+def timed(clip, max_parallel):
+    start = time.perf_counter()
+    text = async_runtime.run(transcription._transcribe_chunked(clip, 'long', 'wav', max_parallel=max_parallel))
+    return text, time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description='Chunked transcription of a long recording against a stand-in server')
+    parser.add_argument('--sentences', type=int, default=5)
+    parser.add_argument('--sentence-seconds', type=float, default=8.0)
+    parser.add_argument('--pause-seconds', type=float, default=1.0)
+    parser.add_argument('--unbroken', type=float, default=45.0, help='Seconds of speech without a pause')
+    parser.add_argument('--latency', type=float, default=0.5, help='Stand-in server round trip in seconds')
+    args = parser.parse_args()
+
+    samples, words = build_recording(args.sentences, args.sentence_seconds, args.pause_seconds, args.unbroken)
+    clip = AudioClip(samples, SAMPLE_RATE)
+    transcribe, chunks = make_transcriber(samples, words)
+    expected = ' '.join(f'w{index}' for index in range(len(words)))
+    print(f"{clip}, {len(words)} words, {len(chunks)} chunks:")
+    for start, end in chunks:
+        print(f"  {start / SAMPLE_RATE:7.2f}s - {end / SAMPLE_RATE:7.2f}s")
+
+    with StandInOpenAIServer(latency=args.latency, transcribe=transcribe) as server:
+        transcription.TRANSCRIPTION_URL = f'{server.base_url}/audio/transcriptions'
+        routed = transcription.transcribe_audio(clip, name='long')
+        serial, serial_time = timed(clip, 1)
+        parallel, parallel_time = timed(clip, transcription.CHUNK_MAX_PARALLEL)
+    async_runtime.shutdown()
+
+    print(f"serial:   {serial_time:.2f}s")
+    print(f"parallel: {parallel_time:.2f}s (up to {transcription.CHUNK_MAX_PARALLEL} at once)")
+    failed = False
+    for label, text in (('transcribe_audio', routed), ('serial', serial), ('parallel', parallel)):
+        if text != expected:
+            got = text.split()
+            missing = sorted(set(expected.split()) - set(got), key=lambda word: int(word[1:]))
+            print(f"{label}: transcript differs ({len(got)} words, expected {len(words)}; missing {missing[:10]})")
+            failed = True
+    if failed:
+        raise SystemExit(1)
+    print("Merged transcript has every word once, in order.")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,202 @@
+import os
+import json
+import time
+import argparse
+import tempfile
+import threading
+import numpy as np
+from utils.stand_in_servers import StandInOpenAIServer, StandInTTSServer, StandInOutputStream
+from utils.synthetic_audio import utterance, to_int16
+from utils.audio_clip import AudioClip
+from utils.vad import trim_silence
+from utils.output_engine import get_output_engine
+from utils.pipeline_scheduler import PipelineScheduler
+from utils import async_runtime, tracing
+import utils.transcription as transcription
+import utils.gpt_response as gpt_response
+import utils.text_to_speech as text_to_speech
+from utils.hotkey_listener import process_audio
+
+# End-to-end pipeline benchmark. Synthetic speech-like audio stands in for the
+# microphone, local stand-in servers for OpenAI (HTTP) and Google TTS (gRPC),
+# and a real-time null stream for the output device. process_audio() runs
+# unchanged; stage timings come from the tracing spans.
+#
+#   latency scenarios: one utterance at a time, buffered and streamed LLM
+#   throughput scenario: many utterances through the pipeline scheduler
+#
+# Results are compared with the stored baseline and regressions are flagged
+# (exit status 1). --save-baseline records the current run instead.
+#
+# Usage: python -m benchmarks.pipeline [--runs 10] [--failure-rate 0.1] [--save-baseline]
+
+BASELINE_FILE = os.path.join('benchmarks', 'baselines', 'pipeline.json')
+STAGES = ['transcription', 'llm_first_token', 'llm_completion', 'synthesis', 'first_audio']
+# Latency differences below this are noise, however large in relative terms
+SLACK_MS = 5.0
+
+class TraceCollector:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.records = {}
+        self.first_audio = {}
+
+    def __call__(self, record):
+        with self.lock:
+            self.records.setdefault(record['trace'], []).append(record)
+            if record['stage'] == 'first_audio':
+                self.first_audio.setdefault(record['trace'], threading.Event()).set()
+
+    def wait_first_audio(self, trace_id, timeout):
+        with self.lock:
+            event = self.first_audio.setdefault(trace_id, threading.Event())
+        return event.wait(timeout)
+
+    def durations(self, trace_ids, stage):
+        with self.lock:
+            return [record['duration_ms'] for trace_id in trace_ids
+                    for record in self.records.get(trace_id, []) if record['stage'] == stage]
+
+def make_clip(seconds):
+    return trim_silence(AudioClip(to_int16(utterance(seconds))))
+
+def run_latency(name, clip, collector, args, stream_llm):
+    trace_ids = []
+    succeeded = 0
+    for _ in range(args.runs):
+        trace = tracing.start_trace(name)
+        trace.mark('capture_end')
+        trace_ids.append(trace.id)
+        options = {'stream_llm': stream_llm, 'response_cache': args.response_cache}
+        process_audio(clip, 'stand-in', 'LLM', 'Be brief.', options, trace)
+        succeeded += collector.wait_first_audio(trace.id, args.timeout)
+        text_to_speech.stop_text_to_speech()
+    metrics = {f'{name}.success_rate': succeeded / args.runs}
+    for stage in STAGES:
+        values = collector.durations(trace_ids, stage)
+        if values:
+            p50, p95 = np.percentile(values, [50, 95])
+            metrics[f'{name}.{stage}.p50_ms'] = float(p50)
+            metrics[f'{name}.{stage}.p95_ms'] = float(p95)
+    return metrics
+
+def run_throughput(clip, args):
+    scheduler = PipelineScheduler(max_workers=args.concurrency, max_queued=args.utterances)
+    start = time.perf_counter()
+    for _ in range(args.utterances):
+        scheduler.submit('throughput', process_audio, clip, 'stand-in', 'LLM', 'Be brief.', {'response_cache': args.response_cache})
+    deadline = start + args.timeout * args.utterances
+    while time.perf_counter() < deadline:
+        stats = scheduler.stats()
+        if stats['queue_depth'] == 0 and stats['running'] == 0:
+            break
+        time.sleep(0.01)
+    elapsed = time.perf_counter() - start
+    text_to_speech.stop_text_to_speech()
+    return {'throughput.utterances_per_s': args.utterances / elapsed}
+
+def higher_is_better(name):
+    return name.endswith('per_s') or name.endswith('success_rate')
+
+def find_regressions(metrics, baseline, tolerance):
+    regressions = {}
+    for name, base in baseline.items():
+        value = metrics.get(name)
+        if value is None:
+            continue
+        if higher_is_better(name):
+            if value < base * (1 - tolerance):
+                regressions[name] = base
+        elif value > base * (1 + tolerance) + SLACK_MS:
+            regressions[name] = base
+    return regressions
+
+def stand_in_config(args):
+    keys = ('runs', 'utterances', 'concurrency', 'seconds', 'transcription_latency', 'llm_latency',
+            'token_interval', 'tts_latency', 'tts_char_interval', 'bandwidth', 'failure_rate')
+    return {key: getattr(args, key) for key in keys}
+
+def main():
+    parser = argparse.ArgumentParser(description='End-to-end pipeline latency and throughput against local stand-ins')
+    parser.add_argument('--runs', type=int, default=10, help='Utterances per latency scenario')
+    parser.add_argument('--utterances', type=int, default=20, help='Utterances in the throughput scenario')
+    parser.add_argument('--concurrency', type=int, default=4, help='Pipeline workers in the throughput scenario')
+    parser.add_argument('--seconds', type=float, default=3.0, help='Length of the synthetic utterance')
+    parser.add_argument('--transcription-latency', type=float, default=0.3)
+    parser.add_argument('--llm-latency', type=float, default=0.25, help='Seconds before the first token')
+    parser.add_argument('--token-interval', type=float, default=0.02)
+    parser.add_argument('--tts-latency', type=float, default=0.1)
+    parser.add_argument('--tts-char-interval', type=float, default=0.001)
+    parser.add_argument('--bandwidth', type=int, default=0, help='Upload bytes per second, 0 for unlimited')
+    parser.add_argument('--failure-rate', type=float, default=0.0, help='Fraction of requests that fail')
+    parser.add_argument('--timeout', type=float, default=10.0, help='Seconds to wait for each utterance')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='Allowed relative slowdown')
+    parser.add_argument('--baseline', default=BASELINE_FILE)
+    parser.add_argument('--save-baseline', action='store_true')
+    parser.add_argument('--tts-cache', action='store_true', help='Keep the TTS cache on (off by default)')
+    parser.add_argument('--response-cache', action='store_true', help='Keep the LLM response cache on (off by default)')
+    args = parser.parse_args()
+
+    collector = TraceCollector()
+    tracing.TRACING = True
+    tracing.TRACE_FILE = os.path.join(tempfile.mkdtemp(prefix='whispry-bench-'), 'trace.jsonl')
+    tracing.subscribers.append(collector)
+    if not args.tts_cache:
+        text_to_speech.tts_engine.cache = None
+
+    engine = get_output_engine()
+    engine.stream_factory = StandInOutputStream
+    engine.start(sample_rate=24000)
+
+    clip = make_clip(args.seconds)
+    common = {'failure_rate': args.failure_rate}
+    with StandInOpenAIServer(latency=args.transcription_latency, bandwidth=args.bandwidth, seed=1, **common) as stt, \
+            StandInOpenAIServer(latency=args.llm_latency, token_interval=args.token_interval, seed=2, **common) as llm, \
+            StandInTTSServer(latency=args.tts_latency, char_interval=args.tts_char_interval, seed=3, **common) as tts:
+        transcription.TRANSCRIPTION_URL = f'{stt.base_url}/audio/transcriptions'
+        gpt_response.CHAT_COMPLETIONS_URL = f'{llm.base_url}/chat/completions'
+        text_to_speech.TTS_STAND_IN_ENDPOINT = tts.endpoint
+
+        metrics = {}
+        metrics.update(run_latency('buffered', clip, collector, args, stream_llm=False))
+        metrics.update(run_latency('streamed', clip, collector, args, stream_llm=True))
+        metrics.update(run_throughput(clip, args))
+        # Let cancelled synthesis settle before the stand-ins go away
+        deadline = time.perf_counter() + args.timeout
+        while text_to_speech.is_audio_playing() and time.perf_counter() < deadline:
+            time.sleep(0.05)
+        failures = stt.failures + llm.failures + tts.failures
+    engine.stop()
+    async_runtime.shutdown()
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            stored = json.load(f)
+        if stored.get('config') == stand_in_config(args):
+            baseline = stored['metrics']
+        else:
+            print(f"Baseline in {args.baseline} was recorded with other settings; not comparing.")
+    regressions = find_regressions(metrics, baseline, args.tolerance)
+
+    print(f"{clip}, {failures} injected failure(s)")
+    print(f"{'metric':<38}{'value':>10}{'baseline':>10}{'change':>9}")
+    for name, value in metrics.items():
+        base = baseline.get(name)
+        stored = f'{base:.2f}' if base is not None else ''
+        change = f'{(value - base) / base * 100:+.0f}%' if base else ''
+        flag = '  REGRESSION' if name in regressions else ''
+        print(f"{name:<38}{value:>10.2f}{stored:>10}{change:>9}{flag}")
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, 'w') as f:
+            json.dump({'config': stand_in_config(args), 'metrics': {k: round(v, 3) for k, v in metrics.items()}}, f, indent=4)
+        print(f"Baseline saved to {args.baseline}")
+        return
+    if regressions:
+        print(f"{len(regressions)} metric(s) regressed by more than {args.tolerance:.0%}.")
+        raise SystemExit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,33 @@
+import re
+import time
+import argparse
+from utils.response_filter import response_filter
+
+# Cost of the response filter on a long answer: filtering it all at once, and
+# per token when it arrives as a stream. The filter's correctness checks are in
+# tests/test_response_filter.py.
+#
+# Usage: python -m benchmarks.response_filter [--repeat 100]
+
+def main():
+    parser = argparse.ArgumentParser(description='Response filter timing')
+    parser.add_argument('--repeat', type=int, default=100, help='Times each measurement is repeated')
+    args = parser.parse_args()
+
+    text = "Hello! Here is a longer answer with several sentences, and I think this is it. Thank you. " * 20
+    tokens = re.findall(r'\s*\S+', text)
+    start = time.perf_counter()
+    for _ in range(args.repeat):
+        response_filter.apply(text)
+    whole = (time.perf_counter() - start) / args.repeat
+    start = time.perf_counter()
+    for _ in range(args.repeat):
+        stream = response_filter.stream()
+        for token in tokens:
+            stream.feed(token)
+        stream.flush()
+    per_token = (time.perf_counter() - start) / args.repeat / len(tokens)
+    print(f"{len(text)} characters in {whole * 1e6:.0f} us at once; streamed: {per_token * 1e6:.1f} us per token")
+
+if __name__ == '__main__':
+    main()
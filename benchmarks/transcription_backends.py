@@ -0,0 +1,61 @@
+import argparse
+import statistics
+import time
+from utils.audio_clip import AudioClip
+from utils.stand_in_servers import StandInOpenAIServer
+from utils.synthetic_audio import utterance, to_int16
+from utils import async_runtime
+import utils.transcription as transcription
+
+# Transcription latency per utterance, local CPU model vs the remote endpoint.
+# The remote side is the stand-in server with a configurable round trip unless
+# --live is given, in which case the configured OPENAI_API_BASE is used. Pass
+# a mono 16 kHz WAV file to measure real speech instead of the synthetic clip.
+#
+# Usage: python -m benchmarks.transcription_backends [recording.wav] [--runs 5] [--latency 0.4] [--live]
+
+def measure(clip, backend, runs):
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        transcription.transcribe_audio(clip, encoder='wav', backend=backend)
+        times.append(time.perf_counter() - start)
+    return times
+
+def main():
+    parser = argparse.ArgumentParser(description='Transcription latency, local vs remote backend')
+    parser.add_argument('recording', nargs='?', help='Mono 16 kHz WAV file (default: synthetic utterance)')
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--seconds', type=float, default=4.0, help='Length of the synthetic utterance')
+    parser.add_argument('--latency', type=float, default=0.4, help='Stand-in server round trip in seconds')
+    parser.add_argument('--live', action='store_true', help='Use the configured remote endpoint')
+    args = parser.parse_args()
+
+    clip = AudioClip.from_wav(args.recording) if args.recording else AudioClip(to_int16(utterance(args.seconds)))
+    print(f"Clip: {clip}")
+
+    results = {}
+    start = time.perf_counter()
+    try:
+        transcription.load_transcription_backend('local')
+        print(f"Local model load (once per start): {time.perf_counter() - start:.1f}s")
+        results['local'] = measure(clip, 'local', args.runs)
+    except ImportError:
+        print("faster-whisper is not installed; skipping the local backend.")
+
+    if args.live:
+        results['remote'] = measure(clip, 'remote', args.runs)
+    else:
+        with StandInOpenAIServer(latency=args.latency) as server:
+            transcription.TRANSCRIPTION_URL = f'{server.base_url}/audio/transcriptions'
+            results['remote'] = measure(clip, 'remote', args.runs)
+    async_runtime.shutdown()
+
+    print(f"{'backend':<10}{'median (ms)':>13}{'min (ms)':>10}{'max (ms)':>10}{'RTF':>7}")
+    for backend, values in results.items():
+        median = statistics.median(values)
+        print(f"{backend:<10}{median * 1000:>13.1f}{min(values) * 1000:>10.1f}{max(values) * 1000:>10.1f}"
+              f"{median / clip.duration:>7.2f}")
+
+if __name__ == '__main__':
+    main()
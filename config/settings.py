@@ -1,12 +1,158 @@
-import os
-from dotenv import load_dotenv
-
-# Load environment variables from .env file
-load_dotenv()
-
-OPENAI_API_KEY = os.getenv('OPENAI_API_KEY')
-GOOGLE_APPLICATION_CREDENTIALS = os.getenv('GOOGLE_APPLICATION_CREDENTIALS')
-
-# Default audio devices (will be populated by the application)
-INPUT_DEVICE = None  # To be set by the user
-OUTPUT_DEVICE = None  # To be set by the user
\ No newline at end of file
+import os
+import tempfile
+from dotenv import load_dotenv
+
+# Load environment variables from .env file
+load_dotenv()
+
+OPENAI_API_KEY = os.getenv('OPENAI_API_KEY')
+OPENAI_API_BASE = os.getenv('OPENAI_API_BASE', 'https://api.openai.com/v1')
+GOOGLE_APPLICATION_CREDENTIALS = os.getenv('GOOGLE_APPLICATION_CREDENTIALS')
+# host:port of a local Text-to-Speech stand-in (plaintext gRPC), for benchmarks
+TTS_STAND_IN_ENDPOINT = os.getenv('TTS_STAND_IN_ENDPOINT')
+
+# Shared HTTP connection pool used for all upstream requests
+HTTP_POOL_SIZE = 10
+HTTP_KEEPALIVE_SECONDS = 60
+
+# Default audio devices (will be populated by the application)
+INPUT_DEVICE = None  # To be set by the user
+OUTPUT_DEVICE = None  # To be set by the user
+# While no audio stream is open, the device list is refreshed this often to
+# pick up devices that were plugged in or removed (0 turns this off)
+DEVICE_REFRESH_SECONDS = 5
+# While the assistant runs its streams are open, so a refresh closes and
+# reopens them at a moment when nothing is recorded or played; this is how
+# often that is done (0 turns it off)
+DEVICE_REFRESH_RUNNING_SECONDS = 60
+
+# Capture block size in frames at 16 kHz (1024 = 64 ms). Smaller blocks mean a
+# shorter wait for the final block when recording stops.
+AUDIO_BLOCK_SIZE = 1024
+
+# Output engine block size in frames; small blocks keep cue latency low
+OUTPUT_BLOCK_SIZE = 256
+
+# Local transcription (faster-whisper on the CPU), used by hotkeys whose
+# 'transcriber' option is 'local'. The model is loaded once when the
+# assistant starts; LOCAL_WHISPER_MODEL is a model size or a local path.
+LOCAL_WHISPER_MODEL = os.getenv('LOCAL_WHISPER_MODEL', 'base.en')
+LOCAL_WHISPER_COMPUTE_TYPE = 'int8'
+LOCAL_WHISPER_THREADS = 0  # 0 lets the runtime pick
+
+# Remote transcription of recordings longer than LONG_RECORDING_SECONDS is
+# split at pauses into chunks of at most CHUNK_MAX_SECONDS (and under the
+# upload limit), with up to CHUNK_MAX_PARALLEL requests at once. Where no
+# pause of CHUNK_MIN_PAUSE_MS is found the cut overlaps by CHUNK_OVERLAP_MS,
+# and up to CHUNK_DEDUP_WORDS repeated words are removed at that boundary.
+LONG_RECORDING_SECONDS = 60
+CHUNK_MAX_SECONDS = 30
+CHUNK_MIN_PAUSE_MS = 300
+CHUNK_OVERLAP_MS = 1000
+CHUNK_DEDUP_WORDS = 20
+CHUNK_MAX_PARALLEL = 4
+UPLOAD_LIMIT_BYTES = 25 * 1024 * 1024
+
+# Utterance processing: worker threads, and how many finished recordings may
+# wait for one before the oldest is dropped
+PIPELINE_WORKERS = 2
+PIPELINE_MAX_QUEUED = 4
+
+# Per-utterance latency tracing: spans are appended to TRACE_FILE as JSON lines
+# (set TRACING=0 to turn it off); python -m utils.tracing prints a summary
+TRACING = os.getenv('TRACING', '1').lower() in ('1', 'true', 'yes')
+TRACE_FILE = os.path.join('logs', 'trace.jsonl')
+TRACE_MAX_BYTES = 5 * 1024 * 1024
+TRACE_BACKUP_COUNT = 3
+
+# Persistent capture keeps the input stream open while the assistant runs, so a
+# recording starts instantly and includes the PRE_ROLL_MS before the key press
+PERSISTENT_CAPTURE = os.getenv('PERSISTENT_CAPTURE', '').lower() in ('1', 'true', 'yes')
+PRE_ROLL_MS = 300
+
+# Toggle recordings are spooled as int16 to a memory-mapped temporary file
+# (in SPOOL_DIR, or the system temp directory if unset) that grows by
+# SPOOL_CHUNK_SECONDS at a time, so long dictations don't build up in RAM
+SPOOL_DIR = os.getenv('SPOOL_DIR')
+SPOOL_CHUNK_SECONDS = 30
+
+# Recordings are handed to transcription in memory. Set SAVE_DEBUG_AUDIO=1 to
+# also keep a copy of every recording on disk for debugging.
+SAVE_DEBUG_AUDIO = os.getenv('SAVE_DEBUG_AUDIO', '').lower() in ('1', 'true', 'yes')
+DEBUG_AUDIO_DIR = os.path.join('audio', 'debug')
+
+# Voice activity detection. A frame counts as speech when its RMS level is
+# above VAD_ENERGY_THRESHOLD_DB, or when it is within VAD_UNVOICED_MARGIN_DB of
+# it and has the high zero-crossing rate of unvoiced consonants.
+VAD_TRIM_SILENCE = True
+VAD_FRAME_MS = 20
+VAD_ENERGY_THRESHOLD_DB = -45.0
+VAD_UNVOICED_MARGIN_DB = 10.0
+VAD_ZCR_THRESHOLD = 0.3
+VAD_MIN_SPEECH_MS = 60  # Shorter bursts (key clicks) are ignored
+VAD_HANGOVER_MS = 200  # Shorter pauses inside speech are kept
+VAD_PADDING_MS = 150  # Audio kept around speech when trimming
+
+# Streaming transcription: segments are cut once they reach the target length,
+# preferably on a silent block, and never grow past the maximum length
+STREAM_SEGMENT_SECONDS = 5.0
+STREAM_MAX_SEGMENT_SECONDS = 10.0
+STREAM_MAX_IN_FLIGHT = 3
+
+# Text-to-speech: answers are split into chunks of whole sentences (the first
+# sentence always on its own) and up to TTS_MAX_IN_FLIGHT are synthesized at once
+TTS_MAX_IN_FLIGHT = 3
+TTS_CHUNK_CHARS = 300
+
+# Synthesized speech is cached by text, voice and audio config. The disk tier
+# is optional: set TTS_CACHE_DIR to keep cached speech across restarts.
+TTS_CACHE_MAX_BYTES = 32 * 1024 * 1024
+TTS_CACHE_DIR = os.getenv('TTS_CACHE_DIR')
+TTS_CACHE_DISK_MAX_BYTES = 256 * 1024 * 1024
+
+# Conversation memory for LLM hotkeys with a 'memory_tokens' budget. Earlier
+# exchanges that no longer fit are dropped, or with 'memory_summary' folded
+# into a summary of at most CONVERSATION_SUMMARY_MAX_TOKENS, and at most
+# CONVERSATION_SUMMARY_MAX_SHARE of the budget so recent exchanges still fit.
+CONVERSATION_SUMMARY_MAX_TOKENS = 200
+CONVERSATION_SUMMARY_MAX_SHARE = 0.25
+
+# Chat responses are cached by model, system prompt and normalized question
+# for hotkeys that opt in with 'response_cache'. Answers to questions like
+# "what time is it" go stale, so they are kept for minutes rather than days.
+# Set RESPONSE_CACHE_FILE to keep cached responses across restarts.
+RESPONSE_CACHE_MAX_ENTRIES = 256
+RESPONSE_CACHE_TTL_SECONDS = 10 * 60
+RESPONSE_CACHE_FILE = os.getenv('RESPONSE_CACHE_FILE')
+
+# Upstream resilience. Each utterance gets UTTERANCE_BUDGET_SECONDS (plus
+# UTTERANCE_BUDGET_PER_AUDIO_SECOND for every second of audio, for long
+# recordings) to transcribe and answer. Each attempt is limited to its
+# stage's timeout, and transient failures are retried with jittered backoff
+# while the budget lasts. After BREAKER_FAILURE_THRESHOLD failures in a row an
+# endpoint is not called for BREAKER_RESET_SECONDS.
+UTTERANCE_BUDGET_SECONDS = 30
+UTTERANCE_BUDGET_PER_AUDIO_SECOND = 0.5
+STAGE_TIMEOUTS = {'transcription': 15, 'llm': 20, 'synthesis': 10}
+RETRY_MAX_ATTEMPTS = 3
+RETRY_BASE_DELAY = 0.2
+RETRY_MAX_DELAY = 2.0
+BREAKER_FAILURE_THRESHOLD = 5
+BREAKER_RESET_SECONDS = 30
+
+# Response post-processing: each phrase (whole words, any case) in a model
+# answer is replaced with its value; an empty value removes the phrase along
+# with the punctuation and space right after it
+RESPONSE_FILTER_RULES = {
+    'hello': '',
+    'hi': '',
+    'greetings': '',
+    'thank you': '',
+    'goodbye': '',
+    'have a great day': '',
+}
+
+# Headless service (daemon.py): the control socket's path. Where Unix sockets
+# are not available (Windows), it listens on CONTROL_PORT on localhost instead.
+CONTROL_SOCKET = os.getenv('CONTROL_SOCKET', os.path.join(tempfile.gettempdir(), 'voice_assistant.sock'))
+CONTROL_PORT = int(os.getenv('CONTROL_PORT', '8765'))
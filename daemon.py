@@ -0,0 +1,240 @@
+import time
+
+# Taken before anything else is imported, so the reported cold start covers the imports too
+STARTED = time.perf_counter()
+
+import os
+import sys
+import json
+import signal
+import logging
+import argparse
+import threading
+from config.settings import PERSISTENT_CAPTURE
+from utils.config_manager import CONFIG_FILE, load_settings, get_profile_options, get_hotkey_ids
+from utils.control_socket import ControlServer, send_command
+
+# Headless entry point: runs the assistant as a background service, without
+# the window, tray icon or notifications, and takes commands on a local
+# control socket (CONTROL_SOCKET). Only the pipeline itself is imported at
+# start; audio devices, the Text-to-Speech client, the keyboard hook and the
+# clipboard are loaded by the first command that needs them.
+#
+# Usage:
+#   python daemon.py [serve [--hotkeys] [--no-prewarm] [--settings FILE]]  run the service
+#   python daemon.py status                             report its state and cold-start times
+#   python daemon.py start|stop [hotkey1]               start or stop recording for a hotkey
+#   python daemon.py submit recording.wav [hotkey1]     process a WAV file as that hotkey's recording
+#   python daemon.py devices [--refresh]                list the audio devices
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# Reported by status when loaded, to show what the service has paid for so far
+HEAVY_MODULES = ['sounddevice', 'pydub', 'pynput', 'pyperclip', 'google.cloud.texttospeech', 'faster_whisper']
+
+def elapsed_ms(since):
+    return round((time.perf_counter() - since) * 1000, 1)
+
+class Daemon:
+    def __init__(self, settings, hotkeys=False, prewarm=True):
+        self.settings = settings
+        self.hotkeys = hotkeys
+        self.prewarm = prewarm
+        self.listener = None
+        self.cold_start = {}
+        self.first_use = {}
+        self.ready_at = None
+        self.audio_lock = threading.Lock()
+        self.audio_ready = None
+        self.stopping = threading.Event()
+        self.server = ControlServer({
+            'status': self.status,
+            'start': self.start_capture,
+            'stop': self.stop_capture,
+            'submit': self.submit,
+            'devices': self.devices,
+        })
+
+    def run(self):
+        self.cold_start['imports'] = elapsed_ms(STARTED)
+        start = time.perf_counter()
+        from utils import hotkey_listener
+        self.listener = hotkey_listener
+        self.cold_start['pipeline'] = elapsed_ms(start)
+
+        start = time.perf_counter()
+        for hotkey_id in get_hotkey_ids(self.settings):
+            profile = (
+                self.settings.get(f'{hotkey_id}_mode', 'Toggle'),
+                self.settings.get(f'{hotkey_id}_model', 'gpt-4o'),
+                self.settings.get(f'{hotkey_id}_output', 'LLM'),
+                self.settings.get(f'{hotkey_id}_precontext', 'Provide a concise and helpful response.'),
+            )
+            options = get_profile_options(self.settings, hotkey_id)
+            if self.hotkeys and self.settings.get(hotkey_id):
+                hotkey_listener.setup_hotkey_listener(hotkey_id, self.settings[hotkey_id], *profile, options=options)
+            else:
+                hotkey_listener.register_profile(hotkey_id, *profile, options=options)
+        self.server.start()
+        self.cold_start['profiles_and_socket'] = elapsed_ms(start)
+        self.cold_start['total'] = elapsed_ms(STARTED)
+        self.ready_at = time.perf_counter()
+        logging.info(f"Service ready in {self.cold_start['total']:.0f} ms: {self.cold_start}")
+
+        if self.hotkeys:
+            # A key press starts recording on the listener's thread, which never
+            # goes through start_capture, so the devices are opened here instead
+            self.prepare_audio()
+        if self.prewarm:
+            # After the service is ready, so warming up never delays it
+            from utils import async_runtime
+            async_runtime.prewarm()
+
+        signal.signal(signal.SIGINT, lambda *_: self.stopping.set())
+        signal.signal(signal.SIGTERM, lambda *_: self.stopping.set())
+        # A timed wait, so signals are handled promptly on every platform
+        while not self.stopping.wait(0.5):
+            pass
+        self.shutdown()
+
+    def shutdown(self):
+        from utils import async_runtime
+        from utils.text_to_speech import get_tts_cache_stats
+        from utils.gpt_response import get_response_cache_stats, get_hedge_stats
+        from utils.resilience import get_breaker_stats
+        logging.info("Stopping service...")
+        self.server.stop()
+        self.listener.stop_hotkey_listener()
+        if self.audio_ready:
+            from utils.audio_processing import close_persistent_stream, stop_output_engine
+            from utils.device_registry import device_registry
+            device_registry.stop_watching()
+            close_persistent_stream()
+            stop_output_engine()
+        logging.info(f"TTS cache stats: {get_tts_cache_stats()}")
+        logging.info(f"Response cache stats: {get_response_cache_stats()}")
+        logging.info(f"LLM hedge stats: {get_hedge_stats()}")
+        logging.info(f"Circuit breakers: {get_breaker_stats()}")
+        logging.info(f"Pipeline stats: {self.listener.get_pipeline_stats()}")
+        async_runtime.shutdown()
+        logging.info("Service stopped.")
+
+    def prepare_audio(self):
+        # The audio libraries and devices are opened by the first command that records or speaks
+        with self.audio_lock:
+            if self.audio_ready is not None:
+                return self.audio_ready
+            start = time.perf_counter()
+            try:
+                from utils.audio_processing import set_audio_devices, start_output_engine, open_persistent_stream
+                from utils.device_registry import device_registry
+                set_audio_devices(self.settings.get('input_device'), self.settings.get('output_device'))
+            except Exception as e:
+                logging.error(f"Audio devices unavailable: {e}")
+                self.audio_ready = False
+                return False
+            if not start_output_engine():
+                logging.warning("Output engine unavailable; sounds will be played from their files.")
+            if PERSISTENT_CAPTURE and not open_persistent_stream():
+                logging.warning("Persistent capture unavailable; recordings will open the stream on demand.")
+            # Picks up hot-plugged devices, and runs refreshes left pending while audio was in use
+            device_registry.watch()
+            self.first_use['audio'] = elapsed_ms(start)
+            self.audio_ready = True
+            return True
+
+    def check_hotkey(self, hotkey):
+        if hotkey not in self.listener.hotkey_profiles:
+            raise ValueError(f"Unknown hotkey '{hotkey}'; configured: {', '.join(sorted(self.listener.hotkey_profiles))}")
+
+    def status(self):
+        from utils.resilience import get_breaker_stats
+        return {
+            'uptime_s': round(time.perf_counter() - self.ready_at, 1),
+            'cold_start_ms': self.cold_start,
+            'first_use_ms': self.first_use,
+            **self.listener.get_listener_status(),
+            'breakers': get_breaker_stats(),
+            'loaded_modules': [name for name in HEAVY_MODULES if name in sys.modules],
+        }
+
+    def start_capture(self, hotkey='hotkey1'):
+        self.check_hotkey(hotkey)
+        if not self.prepare_audio():
+            raise RuntimeError("No audio input is available")
+        self.listener.start_capture(hotkey)
+        return {'hotkey': hotkey}
+
+    def stop_capture(self, hotkey='hotkey1'):
+        self.check_hotkey(hotkey)
+        self.listener.stop_capture(hotkey)
+        return {'hotkey': hotkey}
+
+    def submit(self, path, hotkey='hotkey1'):
+        from utils.audio_clip import AudioClip
+        self.check_hotkey(hotkey)
+        clip = AudioClip.from_wav(path)
+        if self.listener.hotkey_profiles[hotkey]['output_method'] == 'LLM':
+            self.prepare_audio()  # The answer is spoken; without an output device it is only logged
+        job = self.listener.submit_audio(hotkey, clip)
+        return {'job': job.id, 'hotkey': hotkey, 'duration_s': round(clip.duration, 2)}
+
+    def devices(self, refresh=False):
+        from utils.device_registry import device_registry
+        result = {}
+        if refresh:
+            device_registry.refresh()
+            # With audio in use the list below is the one from before; the refresh runs once it is not
+            result['refreshed'] = not device_registry.pending
+            if device_registry.pending:
+                result['note'] = 'Audio is in use; the devices will be refreshed once nothing is recorded or played.'
+        for kind in ('input', 'output'):
+            result[kind] = {
+                'devices': device_registry.names(kind),
+                'default': getattr(device_registry.default(kind), 'name', None),
+            }
+        return result
+
+def main():
+    parser = argparse.ArgumentParser(description='Headless voice assistant service and its control commands')
+    parser.set_defaults(hotkeys=False, prewarm=True, settings=CONFIG_FILE)
+    commands = parser.add_subparsers(dest='command')
+    serve = commands.add_parser('serve', help='Run the service (the default)')
+    serve.add_argument('--hotkeys', action='store_true', help='Also listen for the configured keyboard hotkeys')
+    serve.add_argument('--no-prewarm', dest='prewarm', action='store_false',
+                       help='Do not open upstream connections and clients until they are first used')
+    serve.add_argument('--settings', default=CONFIG_FILE, help=f'Settings file (default: {CONFIG_FILE})')
+    commands.add_parser('status', help="Show the service's state and cold-start times")
+    for name, description in (('start', 'Start recording for a hotkey'), ('stop', 'Stop recording for a hotkey')):
+        command = commands.add_parser(name, help=description)
+        command.add_argument('hotkey', nargs='?', default='hotkey1')
+    submit = commands.add_parser('submit', help="Process a mono 16-bit WAV file with a hotkey's settings")
+    submit.add_argument('path')
+    submit.add_argument('hotkey', nargs='?', default='hotkey1')
+    devices = commands.add_parser('devices', help='List the audio devices')
+    devices.add_argument('--refresh', action='store_true', help='Enumerate the devices again first')
+    args = parser.parse_args()
+
+    if args.command in (None, 'serve'):
+        try:
+            Daemon(load_settings(args.settings), hotkeys=args.hotkeys, prewarm=args.prewarm).run()
+        except RuntimeError as e:
+            logging.error(str(e))
+            sys.exit(1)
+        return
+
+    arguments = {key: value for key, value in vars(args).items() if key in ('hotkey', 'path', 'refresh')}
+    if 'path' in arguments:
+        arguments['path'] = os.path.abspath(arguments['path'])  # The service may run in another directory
+    try:
+        result = send_command(args.command, arguments)
+    except OSError as e:
+        print(f"The service is not running or not responding ({e}).", file=sys.stderr)
+        sys.exit(1)
+    except RuntimeError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+    print(json.dumps(result, indent=2))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,46 @@
+from utils.synthetic_audio import SAMPLE_RATE, speech_like, noise, concat
+from utils.chunked_transcription import split_at_pauses, overlapping_flags, merge_transcripts
+
+def seconds(chunks):
+    return [(start / SAMPLE_RATE, end / SAMPLE_RATE) for start, end in chunks]
+
+def test_short_recording_is_one_chunk():
+    samples = speech_like(3.0)
+    assert split_at_pauses(samples, SAMPLE_RATE, max_seconds=5) == [(0, len(samples))]
+
+def test_cut_in_the_middle_of_a_pause():
+    samples = concat(speech_like(3.0), noise(1.0), speech_like(3.0, seed=6))
+    chunks = split_at_pauses(samples, SAMPLE_RATE, max_seconds=5)
+    assert seconds(chunks) == [(0.0, 3.5), (3.5, 7.0)]
+    assert overlapping_flags(chunks) == [False, False]
+
+def test_hard_cut_overlaps_without_a_pause():
+    chunks = split_at_pauses(speech_like(10.0), SAMPLE_RATE, max_seconds=4, overlap_ms=1000)
+    assert seconds(chunks) == [(0.0, 4.0), (3.0, 7.0), (6.0, 10.0)]
+    assert overlapping_flags(chunks) == [False, True, True]
+
+def test_chunks_without_speech_are_dropped():
+    samples = concat(speech_like(2.0), noise(7.0))
+    assert seconds(split_at_pauses(samples, SAMPLE_RATE, max_seconds=3)) == [(0.0, 3.0)]
+    assert split_at_pauses(noise(5.0), SAMPLE_RATE, max_seconds=2) == []
+
+def test_overlapping_flags():
+    assert overlapping_flags([]) == []
+    assert overlapping_flags([(0, 10)]) == [False]
+    assert overlapping_flags([(0, 10), (10, 20), (18, 30)]) == [False, False, True]
+
+def test_repeated_words_at_an_overlap_are_dropped():
+    texts = ['We went down to the', 'To the river, and then home.']
+    assert merge_transcripts(texts, [False, True]) == 'We went down to the river, and then home.'
+
+def test_repeated_words_are_kept_without_overlap():
+    texts = ['Say it again and again.', 'Again and again.']
+    assert merge_transcripts(texts, [False, False]) == 'Say it again and again. Again and again.'
+
+def test_no_common_words_at_an_overlap():
+    assert merge_transcripts(['First part', 'second part'], [False, True]) == 'First part second part'
+
+def test_empty_chunks_are_skipped():
+    texts = ['Hello there', '', None, 'there friend']
+    assert merge_transcripts(texts, [False, True, True, True]) == 'Hello there friend'
+    assert merge_transcripts([], []) == ''
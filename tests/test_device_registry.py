@@ -0,0 +1,66 @@
+import contextlib
+from utils.device_registry import DeviceRegistry, AudioDevice
+
+# Refreshing restarts PortAudio, so with streams open it waits for a quiet
+# moment and then closes and reopens them around the refresh.
+
+def device(name, index):
+    return AudioDevice(f'Stand-in: {name}', index, name, 'Stand-in', 1, 2, 48000.0)
+
+class Audio:
+    def __init__(self):
+        self.devices = [device('Speakers', 0)]
+        self.streams_open = True
+        self.busy = True
+        self.restarts = 0
+        self.pauses = 0
+
+    def scan(self):
+        return list(self.devices), {'input': 0, 'output': 0}
+
+    def reinitialize(self):
+        assert not self.streams_open
+        self.restarts += 1
+
+    @contextlib.contextmanager
+    def pause(self):
+        self.pauses += 1
+        self.streams_open = False
+        yield
+        self.streams_open = True
+
+def registry_for(audio):
+    registry = DeviceRegistry(scan=audio.scan, reinitialize=audio.reinitialize)
+    registry.is_idle = lambda: not audio.streams_open
+    registry.is_quiet = lambda: not audio.busy
+    registry.pause_streams = audio.pause
+    registry.refresh()
+    return registry
+
+def test_refresh_waits_while_audio_is_in_use():
+    audio = Audio()
+    registry = registry_for(audio)
+    audio.devices.append(device('Headset', 1))
+    assert not registry.refresh()
+    assert registry.pending
+    assert audio.restarts == 0
+    assert registry.names('output') == ['Speakers']
+
+def test_pending_refresh_runs_once_quiet():
+    audio = Audio()
+    registry = registry_for(audio)
+    audio.devices.append(device('Headset', 1))
+    registry.refresh()
+    audio.busy = False
+    assert registry.refresh()
+    assert not registry.pending
+    assert (audio.restarts, audio.pauses) == (1, 1)
+    assert audio.streams_open
+    assert registry.names('output') == ['Speakers', 'Headset']
+
+def test_idle_refresh_does_not_pause():
+    audio = Audio()
+    audio.streams_open = False
+    registry = registry_for(audio)
+    registry.refresh()
+    assert (audio.restarts, audio.pauses) == (1, 0)
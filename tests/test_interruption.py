@@ -0,0 +1,47 @@
+import time
+import pytest
+from utils.stand_in_servers import StandInOpenAIServer
+from utils.text_to_speech import TTSEngine
+from utils import async_runtime
+import utils.gpt_response as gpt_response
+
+# Interrupting a streamed answer: sentences that arrive after the stop are not
+# spoken, and the rest of the stream is not read.
+
+SENTENCES = [f'This is sentence number {index} of the answer.' for index in range(6)]
+
+@pytest.fixture(scope='module', autouse=True)
+def runtime():
+    yield
+    async_runtime.shutdown()
+
+def test_stale_generation_is_not_spoken():
+    engine = TTSEngine(synthesize=lambda text: (b'\0\0', 16000, 2))
+    generation = engine.generation
+    assert engine.speak('Before the stop.', generation=generation)
+    engine.stop()
+    assert engine.speak('After the stop.', generation=generation) is False
+    assert engine.playback_queue.qsize() == 1
+    assert engine.speak('A new answer.', generation=engine.generation)
+
+def test_interrupted_stream_stops_reading(monkeypatch):
+    spoken = []
+
+    def speak(sentence):
+        # Interrupted while the first sentence plays
+        if spoken:
+            return False
+        spoken.append(sentence)
+        return True
+
+    with StandInOpenAIServer(reply=' '.join(SENTENCES), token_interval=0.03) as server:
+        monkeypatch.setattr(gpt_response, 'CHAT_COMPLETIONS_URL', f'{server.base_url}/chat/completions')
+        start = time.perf_counter()
+        answer = async_runtime.run(gpt_response.speak_streamed_response(
+            'Hello?', 'stand-in', 'LLM', 'Be brief.', speak, use_cache=False
+        ))
+        elapsed = time.perf_counter() - start
+    assert spoken == SENTENCES[:1]
+    assert answer == SENTENCES[0]
+    # The whole reply takes over a second to stream
+    assert elapsed < 0.8
@@ -0,0 +1,134 @@
+import time
+from contextlib import ExitStack
+import pytest
+from utils.stand_in_servers import StandInOpenAIServer, StandInTTSServer
+from utils.synthetic_audio import utterance, to_int16
+from utils.audio_clip import AudioClip
+from utils import async_runtime, resilience
+from utils.resilience import Deadline, get_breaker
+import utils.transcription as transcription
+import utils.gpt_response as gpt_response
+import utils.text_to_speech as text_to_speech
+
+# Fault injection for the upstream resilience layer: local stand-in servers
+# fail, stall or go down on purpose, and each test checks that calls are
+# retried, time-limited or cut off by the circuit breaker as intended.
+
+CALLS = 20
+FAILURE_RATE = 0.4
+BUDGET = 1.5
+
+@pytest.fixture(scope='module', autouse=True)
+def runtime():
+    yield
+    async_runtime.shutdown()
+
+@pytest.fixture(autouse=True)
+def closed_circuits():
+    # Every test starts and ends with all circuits closed
+    for name in ('transcription', 'chat', 'tts'):
+        get_breaker(name).record_success()
+    yield
+    for name in ('transcription', 'chat', 'tts'):
+        get_breaker(name).record_success()
+
+@pytest.fixture
+def chat_server(monkeypatch):
+    # Starts a chat completions stand-in with the given options and points the client at it
+    with ExitStack() as stack:
+        def start(**options):
+            server = stack.enter_context(StandInOpenAIServer(**options))
+            monkeypatch.setattr(gpt_response, 'CHAT_COMPLETIONS_URL', f'{server.base_url}/chat/completions')
+            return server
+        yield start
+
+@pytest.fixture
+def tts_server(monkeypatch):
+    with StandInTTSServer(failure_rate=FAILURE_RATE, seed=2) as server:
+        monkeypatch.setattr(text_to_speech, 'TTS_STAND_IN_ENDPOINT', server.endpoint)
+        # The client is created once per process; this one talks to the server above
+        monkeypatch.setattr(async_runtime, '_clients', {})
+        monkeypatch.setitem(resilience.STAGE_TIMEOUTS, 'synthesis', 0.5)
+        yield server
+
+def ask(deadline=None):
+    start = time.perf_counter()
+    answer = async_runtime.run(gpt_response.get_response(
+        'Hello?', 'stand-in', 'LLM', 'Be brief.', use_cache=False, deadline=deadline
+    ))
+    return answer, time.perf_counter() - start
+
+def open_circuit(monkeypatch, chat_server):
+    monkeypatch.setitem(resilience.STAGE_TIMEOUTS, 'llm', 2.0)
+    server = chat_server(failure_rate=1.0)
+    breaker = get_breaker('chat')
+    monkeypatch.setattr(breaker, 'reset_seconds', 0.5)
+    while breaker.state == 'closed':
+        ask()
+    return server, breaker
+
+def test_transient_failures_are_retried(monkeypatch):
+    clip = AudioClip(to_int16(utterance(2.0)))
+
+    def success_rate():
+        succeeded = 0
+        for _ in range(CALLS):
+            get_breaker('transcription').record_success()
+            try:
+                transcription.transcribe_audio(clip)
+                succeeded += 1
+            except Exception:
+                pass
+        return succeeded / CALLS
+
+    with StandInOpenAIServer(failure_rate=FAILURE_RATE, seed=1) as server:
+        monkeypatch.setattr(transcription, 'TRANSCRIPTION_URL', f'{server.base_url}/audio/transcriptions')
+        monkeypatch.setattr(resilience, 'RETRY_MAX_ATTEMPTS', 1)
+        without_retries = success_rate()
+        monkeypatch.setattr(resilience, 'RETRY_MAX_ATTEMPTS', 3)
+        with_retries = success_rate()
+    assert with_retries > without_retries
+    assert with_retries >= 0.8
+
+def test_stalled_endpoint_stays_within_budget(monkeypatch, chat_server):
+    monkeypatch.setitem(resilience.STAGE_TIMEOUTS, 'llm', 0.5)
+    chat_server(latency=10)
+    answer, elapsed = ask(Deadline(BUDGET))
+    assert answer == gpt_response.UNAVAILABLE_REPLY
+    assert elapsed < BUDGET + 0.3
+
+def test_open_circuit_fails_fast(monkeypatch, chat_server):
+    server, breaker = open_circuit(monkeypatch, chat_server)
+    requests_when_opened = len(server.request_log)
+    answer, elapsed = ask()
+    assert answer == gpt_response.UNAVAILABLE_REPLY
+    assert len(server.request_log) == requests_when_opened
+    assert elapsed < 0.05
+
+def test_circuit_closes_once_endpoint_recovers(monkeypatch, chat_server):
+    server, breaker = open_circuit(monkeypatch, chat_server)
+    server.failure_rate = 0.0
+    time.sleep(breaker.reset_seconds)
+    answer, _ = ask()
+    assert answer not in gpt_response.ERROR_REPLIES
+    assert breaker.state == 'closed'
+
+def test_failed_synthesis_is_retried(tts_server):
+    succeeded = 0
+    for _ in range(CALLS):
+        get_breaker('tts').record_success()
+        try:
+            text_to_speech.synthesize_pcm('Checking speech synthesis.')
+            succeeded += 1
+        except Exception:
+            pass
+    assert succeeded / CALLS >= 0.8
+
+def test_stalled_synthesis_times_out(tts_server):
+    tts_server.failure_rate = 0.0
+    tts_server.latency = 10
+    start = time.perf_counter()
+    with pytest.raises(Exception):
+        text_to_speech.synthesize_pcm('Checking a stalled synthesis.')
+    elapsed = time.perf_counter() - start
+    assert elapsed < resilience.RETRY_MAX_ATTEMPTS * (resilience.STAGE_TIMEOUTS['synthesis'] + resilience.RETRY_MAX_DELAY)
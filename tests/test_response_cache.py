@@ -0,0 +1,35 @@
+import json
+import threading
+from utils.response_cache import ResponseCache
+
+def test_concurrent_saves_leave_a_valid_file(tmp_path, caplog):
+    path = str(tmp_path / 'responses.json')
+    cache = ResponseCache(path=path)
+
+    def put_many(worker):
+        for i in range(50):
+            cache.put(f'{worker}-{i}', 'An answer long enough to take a moment to write. ' * 20)
+
+    workers = [threading.Thread(target=put_many, args=(worker,)) for worker in range(4)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    assert 'Could not write' not in caplog.text
+    with open(path, encoding='utf-8') as f:
+        stored = json.load(f)
+    assert len(stored) == len(cache.entries)
+    assert len(ResponseCache(path=path).entries) == len(cache.entries)
+
+def test_malformed_file_is_ignored(tmp_path):
+    path = tmp_path / 'responses.json'
+    path.write_text(json.dumps({'a': 1}))
+    assert not ResponseCache(path=str(path)).entries
+
+def test_malformed_rows_are_skipped(tmp_path):
+    path = tmp_path / 'responses.json'
+    cache = ResponseCache(path=str(path))
+    cache.put('good', 'Kept.')
+    rows = json.loads(path.read_text())
+    path.write_text(json.dumps([1, ['short'], ['bad', [None, 'then']]] + rows))
+    assert ResponseCache(path=str(path)).entries.keys() == {'good'}
@@ -0,0 +1,26 @@
+import random
+import pytest
+from utils.response_filter import response_filter
+
+@pytest.mark.parametrize('text, expected', [
+    ("Hello! This is his answer, I think.", "This is his answer, I think."),
+    ("Hi, this will help. Thank you.", "this will help. "),
+    ("Sure thing. Have a great day!", "Sure thing. "),
+    ("Shipping his high chips this time.", "Shipping his high chips this time."),
+    ("GREETINGS, earthling; goodbye", "earthling; "),
+])
+def test_apply(text, expected):
+    assert response_filter.apply(text) == expected
+
+def test_streaming_matches_filtering_at_once():
+    # Random texts cut into random pieces must come out as if filtered whole
+    rng = random.Random(0)
+    words = ['hi', 'Hi', 'hello', 'this', 'thank', 'you', 'goodbye', 'have', 'a', 'great', 'day', 'high', 'think', 'x']
+    separators = [' ', ' ', ', ', '! ', '. ', '  ']
+    for _ in range(2000):
+        text = ''.join(rng.choice(words) + rng.choice(separators) for _ in range(rng.randint(1, 12)))
+        cuts = sorted(rng.sample(range(1, len(text)), min(len(text) - 1, rng.randint(0, 8))))
+        stream = response_filter.stream()
+        pieces = [text[a:b] for a, b in zip([0] + cuts, cuts + [len(text)])]
+        streamed = ''.join(stream.feed(piece) for piece in pieces) + stream.flush()
+        assert streamed == response_filter.apply(text), f"{text!r} cut at {cuts}"
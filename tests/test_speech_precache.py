@@ -0,0 +1,34 @@
+from utils.text_to_speech import TTSEngine
+from utils.tts_cache import TTSCache
+from utils.output_engine import get_output_engine
+
+# Speech cached ahead is keyed by the output rate, so it is only made once the
+# output engine has one, and made again when the rate changes.
+
+def engine_with_log():
+    synthesized = []
+
+    def synthesize(text):
+        synthesized.append(text)
+        return b'\0\0', 16000, 2
+
+    return TTSEngine(synthesize=synthesize, cache=TTSCache(disk_dir=None)), synthesized
+
+def test_precache_waits_for_the_output_rate(monkeypatch):
+    monkeypatch.setattr(get_output_engine(), 'sample_rate', None)
+    engine, synthesized = engine_with_log()
+    engine.precache(['Sorry, something went wrong.'])
+    assert synthesized == []
+    monkeypatch.setattr(get_output_engine(), 'sample_rate', 48000)
+    engine.precache()
+    assert synthesized == ['Sorry, something went wrong.']
+
+def test_precache_again_for_a_new_rate(monkeypatch):
+    monkeypatch.setattr(get_output_engine(), 'sample_rate', 48000)
+    engine, synthesized = engine_with_log()
+    engine.precache(['Sorry, something went wrong.'])
+    engine.precache()
+    assert len(synthesized) == 1
+    monkeypatch.setattr(get_output_engine(), 'sample_rate', 44100)
+    engine.precache()
+    assert len(synthesized) == 2
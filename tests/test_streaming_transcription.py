@@ -0,0 +1,82 @@
+import time
+import numpy as np
+import pytest
+from utils.stand_in_servers import StandInOpenAIServer
+from utils.synthetic_audio import SAMPLE_RATE, speech_like, noise, silence, concat
+from utils.streaming_transcription import StreamingTranscriber
+from utils import async_runtime
+import utils.transcription as transcription
+import utils.hotkey_listener as hotkey_listener
+
+# StreamingTranscriber against the transcription stand-in: segments are cut at
+# pauses and uploaded while capture goes on, and the text comes back in capture
+# order however the requests finish.
+
+BLOCK_SIZE = 512
+
+@pytest.fixture(scope='module', autouse=True)
+def runtime():
+    yield
+    async_runtime.shutdown()
+
+@pytest.fixture
+def server(monkeypatch):
+    # Later segments are answered sooner, so they finish out of order
+    def transcribe(filename, audio):
+        index = int(filename.split('_')[1].split('.')[0])
+        time.sleep(max(0.0, 0.3 - 0.1 * index))
+        return f'Segment {index}.'
+
+    with StandInOpenAIServer(transcribe=transcribe) as server:
+        monkeypatch.setattr(transcription, 'TRANSCRIPTION_URL', f'{server.base_url}/audio/transcriptions')
+        yield server
+
+def feed(transcriber, samples, realtime=False):
+    # Capture-sized blocks, shaped like the audio callback's
+    for offset in range(0, len(samples), BLOCK_SIZE):
+        transcriber.feed(samples[offset:offset + BLOCK_SIZE].reshape(-1, 1).astype(np.float32))
+        if realtime:
+            time.sleep(BLOCK_SIZE / SAMPLE_RATE / 4)
+
+def three_phrases():
+    # Two segments end at the pauses; the last phrase is too short to end one
+    return concat(
+        speech_like(1.2), noise(0.4, seed=3),
+        speech_like(1.2, seed=4), noise(0.4, seed=5),
+        speech_like(0.5, seed=6),
+    )
+
+def test_segments_are_joined_in_capture_order(server):
+    transcriber = StreamingTranscriber(segment_seconds=1.0, max_segment_seconds=3.0)
+    feed(transcriber, three_phrases())
+    assert transcriber.finish() == 'Segment 0. Segment 1. Segment 2.'
+    assert len(server.request_log) == 3
+
+def test_only_the_tail_is_pending_after_release(server):
+    transcriber = StreamingTranscriber(segment_seconds=1.0, max_segment_seconds=3.0)
+    feed(transcriber, three_phrases(), realtime=True)
+    # Segments cut at the pauses are uploaded during capture
+    deadline = time.perf_counter() + 5
+    while transcriber.pending_segments() and time.perf_counter() < deadline:
+        time.sleep(0.01)
+    assert len(transcriber.futures) == 2
+    assert transcriber.pending_segments() == 0
+    assert len(server.request_log) == 2
+    text = transcriber.finish()
+    assert len(server.request_log) == 3
+    assert text == 'Segment 0. Segment 1. Segment 2.'
+
+def test_silent_recording_is_not_answered(server, monkeypatch):
+    transcriber = StreamingTranscriber(segment_seconds=1.0, max_segment_seconds=3.0)
+    feed(transcriber, silence(2.5))
+    asked = []
+
+    async def get_response(*args, **kwargs):
+        asked.append(args)
+        return 'An answer.'
+
+    monkeypatch.setattr(hotkey_listener, 'get_response', get_response)
+    monkeypatch.setattr(hotkey_listener, 'text_to_speech', lambda *args: asked.append(args))
+    hotkey_listener.process_audio(transcriber, 'stand-in', 'LLM', 'Be brief.')
+    assert not server.request_log
+    assert not asked
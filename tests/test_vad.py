@@ -0,0 +1,48 @@
+import pytest
+from config.settings import VAD_FRAME_MS, VAD_PADDING_MS
+from utils.synthetic_audio import corpus, SAMPLE_RATE
+from utils.vad import speech_bounds, VoiceActivityDetector
+
+# The detector against the labelled synthetic corpus: speech bounds must land
+# within a couple of frames of the labels (plus padding), and auto-stop must
+# fire at the first pause long enough to end the utterance.
+
+TOLERANCE = (VAD_PADDING_MS + 2 * VAD_FRAME_MS) / 1000
+AUTO_STOP_MS = 800
+BLOCK_SIZE = 512
+
+SIGNALS = corpus()
+
+@pytest.mark.parametrize('signal', SIGNALS, ids=[signal['name'] for signal in SIGNALS])
+def test_speech_bounds(signal):
+    bounds = speech_bounds(signal['samples'], SAMPLE_RATE)
+    expected = signal['speech']
+    if not expected:
+        assert bounds is None, f"speech at {bounds[0] / SAMPLE_RATE:.2f}s"
+        return
+    assert bounds is not None, 'missed speech'
+    start, end = bounds[0] / SAMPLE_RATE, bounds[1] / SAMPLE_RATE
+    assert start == pytest.approx(max(0.0, expected[0][0] - VAD_PADDING_MS / 1000), abs=TOLERANCE)
+    assert end == pytest.approx(min(signal['duration'], expected[-1][1] + VAD_PADDING_MS / 1000), abs=TOLERANCE)
+
+@pytest.mark.parametrize('signal', SIGNALS, ids=[signal['name'] for signal in SIGNALS])
+def test_auto_stop(signal):
+    # Capture-sized blocks are fed in until the detector fires
+    detector = VoiceActivityDetector(SAMPLE_RATE, auto_stop_ms=AUTO_STOP_MS)
+    stopped_at = None
+    for offset in range(0, len(signal['samples']), BLOCK_SIZE):
+        detector.feed(signal['samples'][offset:offset + BLOCK_SIZE])
+        if detector.triggered:
+            stopped_at = (offset + BLOCK_SIZE) / SAMPLE_RATE
+            break
+    expected_at = None
+    next_starts = [start for start, _ in signal['speech'][1:]] + [signal['duration']]
+    for (_, end), next_start in zip(signal['speech'], next_starts):
+        if next_start - end > AUTO_STOP_MS / 1000 + TOLERANCE:
+            expected_at = end + AUTO_STOP_MS / 1000
+            break
+    if expected_at is None:
+        assert stopped_at is None
+    else:
+        assert stopped_at is not None, 'never stopped'
+        assert stopped_at == pytest.approx(expected_at, abs=TOLERANCE)
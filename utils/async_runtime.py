@@ -0,0 +1,93 @@
+import asyncio
+import logging
+import threading
+import aiohttp
+from config.settings import OPENAI_API_BASE, HTTP_POOL_SIZE, HTTP_KEEPALIVE_SECONDS
+
+# One asyncio event loop per process, running on a background thread. It owns
+# the pooled keep-alive HTTP session shared by every upstream call, so DNS, TCP
+# and TLS setup is paid once instead of on every utterance. Synchronous code
+# hands coroutines to it with run() or submit().
+
+_loop = None
+_thread = None
+_session = None
+_clients = {}
+_lock = threading.Lock()
+
+# Callables run by prewarm(); stages register their own warm-up here
+prewarm_hooks = []
+
+def get_loop():
+    global _loop, _thread
+    with _lock:
+        if _loop is None or _loop.is_closed():
+            _loop = asyncio.new_event_loop()
+            _thread = threading.Thread(target=_loop.run_forever, name='async-runtime', daemon=True)
+            _thread.start()
+            logging.info("Async runtime started.")
+        return _loop
+
+def submit(coro):
+    return asyncio.run_coroutine_threadsafe(coro, get_loop())
+
+def run(coro, timeout=None):
+    return submit(coro).result(timeout)
+
+async def get_session():
+    global _session
+    if _session is None or _session.closed:
+        connector = aiohttp.TCPConnector(
+            limit=HTTP_POOL_SIZE,
+            keepalive_timeout=HTTP_KEEPALIVE_SECONDS,
+            ttl_dns_cache=300,
+        )
+        _session = aiohttp.ClientSession(connector=connector)
+    return _session
+
+def get_client(name, factory):
+    # Long-lived non-HTTP clients (such as the gRPC TTS client), created once
+    with _lock:
+        if name not in _clients:
+            _clients[name] = factory()
+        return _clients[name]
+
+async def _warm_http(url):
+    session = await get_session()
+    try:
+        # Any response will do: the point is an open, pooled connection
+        async with session.head(url, timeout=aiohttp.ClientTimeout(total=5)) as response:
+            logging.info(f"Pre-warmed connection to {url} ({response.status}).")
+    except Exception as e:
+        logging.warning(f"Could not pre-warm connection to {url}: {e}")
+
+def prewarm():
+    # Returns immediately; warm-up runs in the background
+    submit(_warm_http(OPENAI_API_BASE))
+    for hook in prewarm_hooks:
+        threading.Thread(target=_run_hook, args=(hook,), daemon=True).start()
+
+def _run_hook(hook):
+    try:
+        hook()
+    except Exception as e:
+        logging.warning(f"Pre-warm hook {getattr(hook, '__name__', hook)} failed: {e}")
+
+async def _close_session():
+    global _session
+    if _session is not None:
+        await _session.close()
+        _session = None
+
+def shutdown():
+    global _loop
+    with _lock:
+        loop, _loop = _loop, None
+    if loop is None:
+        return
+    try:
+        asyncio.run_coroutine_threadsafe(_close_session(), loop).result(5)
+    except Exception as e:
+        logging.warning(f"Error closing HTTP session: {e}")
+    loop.call_soon_threadsafe(loop.stop)
+    logging.info("Async runtime stopped.")
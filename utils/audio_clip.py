@@ -0,0 +1,56 @@
+import io
+import os
+import wave
+import logging
+import numpy as np
+
+class AudioClip:
+    """Mono 16-bit PCM audio held in memory, handed from capture to transcription."""
+
+    def __init__(self, samples, sample_rate=16000):
+        self.samples = np.asarray(samples, dtype=np.int16).reshape(-1)
+        self.sample_rate = sample_rate
+
+    @classmethod
+    def from_float_blocks(cls, blocks, sample_rate=16000):
+        samples = (np.concatenate(blocks, axis=0) * 32767).astype(np.int16)
+        return cls(samples, sample_rate)
+
+    @classmethod
+    def from_wav(cls, file):
+        with wave.open(file, 'rb') as wf:
+            if wf.getnchannels() != 1 or wf.getsampwidth() != 2:
+                raise ValueError("Expected mono 16-bit WAV audio")
+            return cls(np.frombuffer(wf.readframes(wf.getnframes()), dtype=np.int16), wf.getframerate())
+
+    @property
+    def duration(self):
+        return len(self.samples) / self.sample_rate
+
+    def __len__(self):
+        return len(self.samples)
+
+    def __repr__(self):
+        return f"AudioClip({self.duration:.2f}s @ {self.sample_rate} Hz)"
+
+    def write_wav(self, file):
+        with wave.open(file, 'wb') as wf:
+            wf.setnchannels(1)
+            wf.setsampwidth(2)
+            wf.setframerate(self.sample_rate)
+            wf.writeframes(self.pcm_view())
+
+    def pcm_view(self):
+        # The samples as bytes without copying them (spooled clips are memory maps)
+        return memoryview(np.ascontiguousarray(self.samples)).cast('B')
+
+    def to_wav_bytes(self):
+        buffer = io.BytesIO()
+        self.write_wav(buffer)
+        return buffer.getvalue()
+
+    def save(self, file_path):
+        os.makedirs(os.path.dirname(file_path) or '.', exist_ok=True)
+        self.write_wav(file_path)
+        logging.info(f"Audio file saved at {file_path}")
+        return file_path
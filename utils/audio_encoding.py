@@ -0,0 +1,117 @@
+import sys
+import time
+import wave
+import logging
+import threading
+import subprocess
+import numpy as np
+from utils.audio_clip import AudioClip
+
+# Encoders run between capture and upload. Compressed formats are produced by
+# piping raw PCM through ffmpeg (already required by pydub), so nothing is
+# written to disk.
+FFMPEG_BINARY = 'ffmpeg'
+OPUS_BITRATE = '24k'
+
+encoder_stats = {}
+encoder_stats_lock = threading.Lock()
+
+class EncodedAudio:
+    def __init__(self, data, format, extension, mime_type, raw_size, encode_seconds):
+        self.data = data
+        self.format = format
+        self.extension = extension
+        self.mime_type = mime_type
+        self.raw_size = raw_size
+        self.encode_seconds = encode_seconds
+
+    @property
+    def size(self):
+        return len(self.data)
+
+    @property
+    def reduction(self):
+        return self.raw_size / self.size if self.size else 0.0
+
+def encode_wav(clip):
+    return clip.to_wav_bytes()
+
+def _ffmpeg_encode(clip, codec_args):
+    command = [
+        FFMPEG_BINARY, '-hide_banner', '-loglevel', 'error',
+        '-f', 's16le', '-ar', str(clip.sample_rate), '-ac', '1', '-i', 'pipe:0',
+        *codec_args, 'pipe:1',
+    ]
+    result = subprocess.run(command, input=clip.pcm_view(), capture_output=True, check=True)
+    return result.stdout
+
+def encode_flac(clip):
+    return _ffmpeg_encode(clip, ['-c:a', 'flac', '-f', 'flac'])
+
+def encode_opus(clip):
+    return _ffmpeg_encode(clip, ['-c:a', 'libopus', '-b:a', OPUS_BITRATE, '-application', 'voip', '-f', 'ogg'])
+
+# name -> (encode function, file extension, MIME type)
+ENCODERS = {
+    'wav': (encode_wav, 'wav', 'audio/wav'),
+    'flac': (encode_flac, 'flac', 'audio/flac'),
+    'ogg': (encode_opus, 'ogg', 'audio/ogg'),
+}
+
+def register_encoder(name, encode, extension, mime_type):
+    ENCODERS[name] = (encode, extension, mime_type)
+
+def encode_audio(clip, format='wav'):
+    if format not in ENCODERS:
+        logging.warning(f"Unknown encoder '{format}', falling back to wav.")
+        format = 'wav'
+    encode, extension, mime_type = ENCODERS[format]
+    raw_size = len(clip) * 2
+    start = time.perf_counter()
+    try:
+        data = encode(clip)
+    except Exception as e:
+        if format == 'wav':
+            raise
+        logging.error(f"Error encoding audio as {format}, falling back to wav: {e}")
+        return encode_audio(clip, 'wav')
+    encoded = EncodedAudio(data, format, extension, mime_type, raw_size, time.perf_counter() - start)
+    _record_stats(encoded)
+    logging.info(
+        f"Encoded {clip.duration:.2f}s of audio as {format}: {raw_size} -> {encoded.size} bytes "
+        f"({encoded.reduction:.1f}x smaller) in {encoded.encode_seconds * 1000:.1f} ms"
+    )
+    return encoded
+
+def _record_stats(encoded):
+    with encoder_stats_lock:
+        stats = encoder_stats.setdefault(
+            encoded.format, {'count': 0, 'encode_seconds': 0.0, 'raw_bytes': 0, 'encoded_bytes': 0}
+        )
+        stats['count'] += 1
+        stats['encode_seconds'] += encoded.encode_seconds
+        stats['raw_bytes'] += encoded.raw_size
+        stats['encoded_bytes'] += encoded.size
+
+def get_encoder_stats():
+    with encoder_stats_lock:
+        return {format: dict(stats) for format, stats in encoder_stats.items()}
+
+def compare_encoders(clip, formats=None):
+    results = {}
+    for format in formats or ENCODERS:
+        encoded = encode_audio(clip, format)
+        results[format] = {
+            'bytes': encoded.size,
+            'reduction': encoded.reduction,
+            'encode_ms': encoded.encode_seconds * 1000,
+        }
+    return results
+
+if __name__ == '__main__':
+    # Usage: python -m utils.audio_encoding recording.wav
+    with wave.open(sys.argv[1], 'rb') as wf:
+        samples = np.frombuffer(wf.readframes(wf.getnframes()), dtype=np.int16)
+        clip = AudioClip(samples, wf.getframerate())
+    for format, result in compare_encoders(clip).items():
+        print(f"{format:>5}: {result['bytes']:>9} bytes  {result['reduction']:5.1f}x  {result['encode_ms']:7.1f} ms")
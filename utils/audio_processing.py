@@ -1,138 +1,354 @@
-import sounddevice as sd
-import queue
-import wave
-from config.settings import INPUT_DEVICE, OUTPUT_DEVICE
-from utils.text_to_speech import text_to_speech
-import os
-import winsound
-import numpy as np
-import pyaudio
-import logging
-import threading
-from pydub import AudioSegment
-from pydub.playback import _play_with_simpleaudio
-from playsound import playsound
-
-# Configure logging
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
-
-q = queue.Queue()
-recording = False
-audio_stream = None
-
-def get_audio_devices(kind='input'):
-    devices = sd.query_devices()
-    if kind == 'input':
-        return [device['name'] for device in devices if device['max_input_channels'] > 0 and not device['name'].startswith('Disabled')]
-    elif kind == 'output':
-        return [device['name'] for device in devices if device['max_output_channels'] > 0 and not device['name'].startswith('Disabled')]
-    return []
-
-def set_audio_devices(input_device_name, output_device_name):
-    global INPUT_DEVICE, OUTPUT_DEVICE
-    devices = sd.query_devices()
-    input_device = next(
-        (i for i, d in enumerate(devices) if d['name'] == input_device_name and d['max_input_channels'] > 0),
-        None
-    )
-    output_device = next(
-        (i for i, d in enumerate(devices) if d['name'] == output_device_name and d['max_output_channels'] > 0),
-        None
-    )
-    
-    if input_device is not None:
-        INPUT_DEVICE = input_device
-    if output_device is not None:
-        OUTPUT_DEVICE = output_device
-
-def audio_callback(indata, frames, time, status):
-    if status:
-        logging.warning(f"Audio callback status: {status}")
-    q.put(indata.copy())
-
-def start_recording():
-    global recording, audio_stream
-    recording = True
-    q.queue.clear()  # Clear the queue before starting recording
-    try:
-        audio_stream = sd.InputStream(
-            callback=audio_callback, 
-            device=INPUT_DEVICE, 
-            channels=1, 
-            samplerate=16000, 
-            blocksize=8000
-        )
-        audio_stream.start()
-        logging.info("Audio stream started successfully.")
-    except Exception as e:
-        logging.error(f"Error starting audio stream: {e}")
-        recording = False
-    play_sound(os.path.join('audio', 'start_sound.mp3'))  # Use MP3 file
-
-def stop_recording():
-    global recording, audio_stream
-    recording = False
-    if audio_stream:
-        audio_stream.stop()
-        audio_stream.close()
-        logging.info("Audio stream stopped and closed.")
-    else:
-        logging.warning("Audio stream was not active.")
-    play_sound(os.path.join('audio', 'stop_sound.mp3'))  # Use MP3 file
-    return save_audio_file()
-
-def save_audio_file():
-    audio_frames = []
-    while not q.empty():
-        audio_frames.append(q.get())
-    if not audio_frames:
-        logging.warning("No audio data captured.")
-        return None
-    audio_data = (np.concatenate(audio_frames, axis=0) * 32767).astype(np.int16)
-    
-    file_path = 'audio/input.wav'
-    os.makedirs(os.path.dirname(file_path), exist_ok=True)
-    try:
-        with wave.open(file_path, 'wb') as wf:
-            wf.setnchannels(1)
-            wf.setsampwidth(2)
-            wf.setframerate(16000)
-            wf.writeframes(audio_data.tobytes())
-        logging.info(f"Audio file saved at {file_path}")
-    except Exception as e:
-        logging.error(f"Error saving audio file: {e}")
-        return None
-    return file_path
-
-def play_sound(sound_path):
-    def play():
-        logging.info(f"Attempting to play sound: {sound_path}")
-        if not os.path.isfile(sound_path):
-            logging.error(f"Sound file does not exist: {sound_path}")
-            return
-        try:
-            playsound(sound_path)
-            logging.info("Sound playback finished")
-        except Exception as e:
-            logging.error(f"Error playing sound: {e}")
-    threading.Thread(target=play).start()
-
-def get_default_device(kind='input'):
-    p = pyaudio.PyAudio()
-    try:
-        if kind == 'input':
-            device_info = p.get_default_input_device_info()
-            device_name = device_info['name']
-            logging.info(f"Default input device: {device_name}")
-        elif kind == 'output':
-            device_info = p.get_default_output_device_info()
-            device_name = device_info['name']
-            logging.info(f"Default output device: {device_name}")
-        else:
-            device_name = None
-    except IOError as e:
-        logging.error(f"Error getting default {kind} device: {e}")
-        device_name = None
-    finally:
-        p.terminate()
-    return device_name
\ No newline at end of file
+import sounddevice as sd
+import queue
+import collections
+import contextlib
+from config.settings import (
+    INPUT_DEVICE,
+    OUTPUT_DEVICE,
+    SAVE_DEBUG_AUDIO,
+    DEBUG_AUDIO_DIR,
+    VAD_TRIM_SILENCE,
+    PRE_ROLL_MS,
+    AUDIO_BLOCK_SIZE,
+)
+from utils.text_to_speech import text_to_speech, precache_speech
+import os
+import logging
+import threading
+import time
+import uuid
+from utils.streaming_transcription import StreamingTranscriber
+from utils.audio_clip import AudioClip
+from utils.vad import VoiceActivityDetector, trim_silence
+from utils.output_engine import get_output_engine
+from utils.recording_spool import RecordingSpool
+from utils.device_registry import device_registry
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+q = queue.Queue()
+recording = False
+audio_stream = None
+stream_transcriber = None
+voice_detector = None
+recording_spool = None
+
+# Persistent capture: the input stream stays open between recordings and keeps
+# the most recent PRE_ROLL_MS of audio, which is claimed when recording starts
+SAMPLE_RATE = 16000
+persistent_stream = None
+pre_roll = collections.deque()
+pre_roll_frames = 0
+capture_lock = threading.Lock()
+
+CUE_SOUNDS = [
+    os.path.join('audio', 'start_sound.mp3'),
+    os.path.join('audio', 'stop_sound.mp3'),
+    os.path.join('audio', 'clipboard_sound.mp3'),
+]
+
+# Stopping waits until the callback has delivered the block that covers the
+# moment of the stop request, instead of sleeping for a fixed time
+tail_deadline = None
+tail_flushed = threading.Event()
+
+def get_audio_devices(kind='input'):
+    if kind not in ('input', 'output'):
+        return []
+    return device_registry.names(kind)
+
+def set_audio_devices(input_device_name, output_device_name):
+    # Devices are kept by key and looked up again whenever a stream opens,
+    # so the selection survives devices being added or removed
+    global INPUT_DEVICE, OUTPUT_DEVICE
+    input_device = device_registry.find(input_device_name, 'input')
+    output_device = device_registry.find(output_device_name, 'output')
+    if input_device is not None:
+        INPUT_DEVICE = input_device.key
+    if output_device is not None:
+        OUTPUT_DEVICE = output_device.key
+
+def is_audio_idle():
+    # Whether no stream is open, so the device registry may restart PortAudio
+    return audio_stream is None and persistent_stream is None and not get_output_engine().running
+
+def is_audio_quiet():
+    # Whether the open streams may be closed for a device refresh: nothing is
+    # being recorded, and no speech or cue is queued
+    return not recording and audio_stream is None and get_output_engine().is_quiet()
+
+@contextlib.contextmanager
+def paused_streams():
+    # Closes the open streams so PortAudio can restart, and reopens them after
+    engine = get_output_engine()
+    reopen_engine, reopen_capture = engine.running, persistent_stream is not None
+    engine.stop()
+    close_persistent_stream()
+    try:
+        yield
+    finally:
+        if reopen_engine and not start_output_engine():
+            logging.warning("Output engine unavailable after the device refresh.")
+        if reopen_capture and not open_persistent_stream():
+            logging.warning("Persistent capture unavailable after the device refresh.")
+
+device_registry.is_idle = is_audio_idle
+device_registry.is_quiet = is_audio_quiet
+device_registry.pause_streams = paused_streams
+
+def audio_callback(indata, frames, time, status):
+    if status:
+        logging.warning(f"Audio callback status: {status}")
+    block = indata.copy()
+    with capture_lock:
+        if recording:
+            deliver_block(block)
+            if tail_deadline is not None:
+                block_start = time.inputBufferAdcTime or time.currentTime
+                if block_start + frames / SAMPLE_RATE >= tail_deadline:
+                    tail_flushed.set()
+        elif persistent_stream is not None:
+            push_pre_roll(block)
+
+def deliver_block(block):
+    if voice_detector is not None:
+        voice_detector.feed(block)
+    if stream_transcriber is not None:
+        stream_transcriber.feed(block)
+    elif recording_spool is not None:
+        recording_spool.write(block)
+    else:
+        q.put(block)
+
+def push_pre_roll(block):
+    global pre_roll_frames
+    pre_roll.append(block)
+    pre_roll_frames += len(block)
+    limit = int(SAMPLE_RATE * PRE_ROLL_MS / 1000)
+    while pre_roll and pre_roll_frames - len(pre_roll[0]) >= limit:
+        pre_roll_frames -= len(pre_roll.popleft())
+
+def claim_pre_roll():
+    # Hands the buffered audio (trimmed to exactly PRE_ROLL_MS) to the new recording
+    global pre_roll_frames
+    excess = pre_roll_frames - int(SAMPLE_RATE * PRE_ROLL_MS / 1000)
+    if pre_roll and excess > 0:
+        pre_roll[0] = pre_roll[0][excess:]
+    claimed = pre_roll_frames - max(excess, 0)
+    while pre_roll:
+        deliver_block(pre_roll.popleft())
+    pre_roll_frames = 0
+    return claimed
+
+def open_persistent_stream():
+    global persistent_stream
+    close_persistent_stream()
+    # Holding the registry's lock keeps a device refresh from restarting PortAudio meanwhile
+    with device_registry.lock:
+        try:
+            stream = sd.InputStream(
+                callback=audio_callback,
+                device=device_registry.index(INPUT_DEVICE, 'input'),
+                channels=1,
+                samplerate=SAMPLE_RATE,
+                blocksize=AUDIO_BLOCK_SIZE
+            )
+            stream.start()
+        except Exception as e:
+            logging.error(f"Error opening persistent audio stream: {e}")
+            return False
+        with capture_lock:
+            persistent_stream = stream
+    logging.info(f"Persistent audio stream opened with {PRE_ROLL_MS} ms pre-roll.")
+    return True
+
+def close_persistent_stream():
+    global persistent_stream, pre_roll_frames
+    with capture_lock:
+        stream, persistent_stream = persistent_stream, None
+        pre_roll.clear()
+        pre_roll_frames = 0
+    if stream is not None:
+        stream.stop()
+        stream.close()
+        logging.info("Persistent audio stream closed.")
+
+def start_recording(streaming=False, encoder='wav', auto_stop_ms=0, on_auto_stop=None, transcriber='remote', trace=None,
+                    spool=False):
+    global recording, audio_stream, stream_transcriber, voice_detector, recording_spool
+    q.queue.clear()  # Clear the queue before starting recording
+    stream_transcriber = StreamingTranscriber(encoder=encoder, backend=transcriber, trace=trace) if streaming else None
+    discard_spool()  # Left by an earlier recording that was never collected
+    recording_spool = RecordingSpool(SAMPLE_RATE) if spool and not streaming else None
+    voice_detector = VoiceActivityDetector(auto_stop_ms=auto_stop_ms, on_auto_stop=on_auto_stop) if auto_stop_ms else None
+    # Holding the registry's lock keeps a device refresh from closing the persistent stream meanwhile
+    with device_registry.lock:
+        if persistent_stream is not None:
+            # The stream is already running: claim the pre-roll and start immediately
+            with capture_lock:
+                claimed = claim_pre_roll()
+                recording = True
+            logging.info(f"Recording started on persistent stream with {claimed * 1000 // SAMPLE_RATE} ms pre-roll.")
+            play_sound(os.path.join('audio', 'start_sound.mp3'))  # Use MP3 file
+            return
+        recording = True
+        try:
+            audio_stream = sd.InputStream(
+                callback=audio_callback, 
+                device=device_registry.index(INPUT_DEVICE, 'input'), 
+                channels=1, 
+                samplerate=SAMPLE_RATE, 
+                blocksize=AUDIO_BLOCK_SIZE
+            )
+            audio_stream.start()
+            logging.info("Audio stream started successfully.")
+        except Exception as e:
+            logging.error(f"Error starting audio stream: {e}")
+            recording = False
+            discard_spool()
+    play_sound(os.path.join('audio', 'start_sound.mp3'))  # Use MP3 file
+
+def discard_spool():
+    # Removes the spool file of a recording that will not be collected
+    global recording_spool
+    with capture_lock:
+        spool, recording_spool = recording_spool, None
+    if spool is not None:
+        spool.discard()
+        logging.info(f"Discarded recording spool {spool.path}.")
+
+def drain_tail(stream):
+    # Waits for the block that holds the last audio before the stop request
+    global tail_deadline
+    tail_flushed.clear()
+    try:
+        tail_deadline = stream.time
+    except Exception as e:
+        logging.warning(f"Could not read stream time, not waiting for the final block: {e}")
+        return
+    block_seconds = AUDIO_BLOCK_SIZE / SAMPLE_RATE
+    if not tail_flushed.wait(timeout=2 * block_seconds + 0.1):
+        logging.warning("Timed out waiting for the final audio block.")
+    tail_deadline = None
+
+def stop_recording():
+    global recording, audio_stream, stream_transcriber, voice_detector
+    stream = audio_stream if audio_stream is not None else persistent_stream
+    if recording and stream is not None:
+        drain_tail(stream)
+    if persistent_stream is not None and audio_stream is None:
+        # Keep the stream open; audio goes back to the pre-roll buffer
+        with capture_lock:
+            recording = False
+        logging.info("Recording stopped on persistent stream.")
+    elif audio_stream:
+        audio_stream.stop()
+        audio_stream.close()
+        audio_stream = None
+        recording = False
+        logging.info("Audio stream stopped and closed.")
+    else:
+        recording = False
+        logging.warning("Audio stream was not active.")
+    voice_detector = None
+    play_sound(os.path.join('audio', 'stop_sound.mp3'))  # Use MP3 file
+    if stream_transcriber is not None:
+        # Streaming mode: earlier segments are already uploaded, only the tail is left
+        transcriber, stream_transcriber = stream_transcriber, None
+        return transcriber
+    return collect_audio_clip()
+
+def collect_audio_clip():
+    global recording_spool
+    if recording_spool is not None:
+        spool, recording_spool = recording_spool, None
+        clip = spool.finish()
+        if clip is None:
+            logging.warning("No audio data captured.")
+            return None
+    else:
+        audio_frames = []
+        while not q.empty():
+            audio_frames.append(q.get())
+        if not audio_frames:
+            logging.warning("No audio data captured.")
+            return None
+        clip = AudioClip.from_float_blocks(audio_frames)
+        logging.info(f"Captured {clip.duration:.2f}s of audio in memory.")
+    if SAVE_DEBUG_AUDIO:
+        save_debug_audio(clip)
+    if VAD_TRIM_SILENCE:
+        clip = trim_silence(clip)
+        if not len(clip):
+            return None
+    return clip
+
+def save_debug_audio(clip):
+    # Unique name per utterance so overlapping recordings never overwrite each other
+    file_path = os.path.join(DEBUG_AUDIO_DIR, f"input_{time.strftime('%Y%m%d-%H%M%S')}_{uuid.uuid4().hex[:8]}.wav")
+    try:
+        return clip.save(file_path)
+    except Exception as e:
+        logging.error(f"Error saving debug audio file: {e}")
+        return None
+
+def start_output_engine():
+    # Opens the output stream on the selected device and decodes the cues once
+    engine = get_output_engine()
+    if not engine.start(OUTPUT_DEVICE):
+        return False
+    for sound_path in CUE_SOUNDS:
+        if os.path.normpath(sound_path) in engine.decoded_cues:
+            continue  # Reopened at the same rate
+        try:
+            engine.load_cue(sound_path)
+        except Exception as e:
+            logging.error(f"Error decoding sound {sound_path}: {e}")
+    # Speech cached ahead is keyed by the output rate, so make it for this one
+    threading.Thread(target=precache_for_output, name='tts-precache', daemon=True).start()
+    return True
+
+def precache_for_output():
+    try:
+        precache_speech()
+    except Exception as e:
+        logging.warning(f"Could not precache speech: {e}")
+
+def stop_output_engine():
+    get_output_engine().stop()
+    # Pick up devices plugged in since the last refresh now that the stream is closed
+    try:
+        device_registry.refresh()
+    except Exception as e:
+        logging.error(f"Error refreshing audio devices: {e}")
+
+def play_sound(sound_path):
+    if get_output_engine().play_cue(sound_path):
+        return
+
+    # Output engine not running or cue not decoded: fall back to decoding the file
+    def play():
+        logging.info(f"Attempting to play sound: {sound_path}")
+        if not os.path.isfile(sound_path):
+            logging.error(f"Sound file does not exist: {sound_path}")
+            return
+        try:
+            from playsound import playsound
+            playsound(sound_path)
+            logging.info("Sound playback finished")
+        except Exception as e:
+            logging.error(f"Error playing sound: {e}")
+    threading.Thread(target=play).start()
+
+def get_default_device(kind='input'):
+    try:
+        device = device_registry.default(kind) if kind in ('input', 'output') else None
+    except Exception as e:
+        logging.error(f"Error getting default {kind} device: {e}")
+        return None
+    if device is None:
+        logging.error(f"No default {kind} device.")
+        return None
+    logging.info(f"Default {kind} device: {device.name}")
+    return device.name
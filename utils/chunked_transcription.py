@@ -0,0 +1,78 @@
+import re
+import bisect
+import numpy as np
+from config.settings import (
+    VAD_FRAME_MS,
+    CHUNK_MAX_SECONDS,
+    CHUNK_MIN_PAUSE_MS,
+    CHUNK_OVERLAP_MS,
+    CHUNK_DEDUP_WORDS,
+    UPLOAD_LIMIT_BYTES,
+)
+from utils.vad import speech_frames
+
+# Long recordings are transcribed as several requests. The audio is cut in
+# the middle of natural pauses so no word is split; only when a stretch of
+# speech has no pause within CHUNK_MAX_SECONDS is it cut hard, with
+# CHUNK_OVERLAP_MS of overlap so the word at the cut is heard whole by at least
+# one request. Words transcribed twice in that overlap are removed again by
+# merge_transcripts().
+
+def max_chunk_seconds(sample_rate, max_seconds=CHUNK_MAX_SECONDS):
+    # Uncompressed WAV is the largest upload format, so it sets the bound
+    header_allowance = 4096
+    return min(max_seconds, (UPLOAD_LIMIT_BYTES - header_allowance) / (sample_rate * 2))
+
+def split_at_pauses(samples, sample_rate=16000, max_seconds=CHUNK_MAX_SECONDS,
+                    min_pause_ms=CHUNK_MIN_PAUSE_MS, overlap_ms=CHUNK_OVERLAP_MS):
+    # Returns (start, end) sample ranges in order; a range starts before the
+    # previous one ends only at a hard cut
+    frame_length = int(sample_rate * VAD_FRAME_MS / 1000)
+    mask = speech_frames(samples, sample_rate)
+    edges = np.diff(np.concatenate(([0], (~mask).astype(np.int8), [0])))
+    pause_starts, pause_ends = np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)
+    min_pause_frames = min_pause_ms / VAD_FRAME_MS
+    cuts = [int((start + end) // 2) * frame_length
+            for start, end in zip(pause_starts, pause_ends) if end - start >= min_pause_frames]
+
+    total = len(samples)
+    max_length = int(max_chunk_seconds(sample_rate, max_seconds) * sample_rate)
+    overlap = int(sample_rate * overlap_ms / 1000)
+    chunks = []
+    start = 0
+    while total - start > max_length:
+        limit = start + max_length
+        index = bisect.bisect_right(cuts, limit) - 1
+        if index >= 0 and cuts[index] > start:
+            chunks.append((start, cuts[index]))
+            start = cuts[index]
+        else:
+            chunks.append((start, limit))
+            start = limit - overlap
+    chunks.append((start, total))
+    # A chunk that is all pause has nothing to transcribe
+    return [(start, end) for start, end in chunks if mask[start // frame_length:-(-end // frame_length)].any()]
+
+def overlapping_flags(chunks):
+    return [index > 0 and start < chunks[index - 1][1] for index, (start, _) in enumerate(chunks)]
+
+def _normalize(word):
+    return re.sub(r'\W', '', word.lower())
+
+def merge_transcripts(texts, overlapping, max_words=CHUNK_DEDUP_WORDS):
+    # Joins chunk transcripts in order. overlapping[i] says whether chunk i
+    # overlaps the one before it; there, the longest run of words that ends
+    # the text so far and also starts the chunk is dropped from the chunk.
+    words = []
+    for text, overlaps in zip(texts, overlapping):
+        new_words = (text or '').split()
+        skip = 0
+        if overlaps and words:
+            tail = [_normalize(word) for word in words[-max_words:]]
+            head = [_normalize(word) for word in new_words[:max_words]]
+            for count in range(min(len(tail), len(head)), 0, -1):
+                if tail[-count:] == head[:count]:
+                    skip = count
+                    break
+        words.extend(new_words[skip:])
+    return ' '.join(words)
@@ -1,15 +1,45 @@
-import json
-import os
-
-CONFIG_FILE = 'config/user_settings.json'
-
-def load_settings():
-    if not os.path.exists(CONFIG_FILE):
-        return {}
-    with open(CONFIG_FILE, 'r') as f:
-        return json.load(f)
-
-def save_settings(settings):
-    os.makedirs(os.path.dirname(CONFIG_FILE), exist_ok=True)
-    with open(CONFIG_FILE, 'w') as f:
-        json.dump(settings, f, indent=4)
\ No newline at end of file
+import json
+import os
+import re
+
+CONFIG_FILE = 'config/user_settings.json'
+
+# Per-hotkey options that are read from the settings file as '<hotkey_id>_<option>'
+PROFILE_OPTION_DEFAULTS = {
+    'streaming': False,
+    'encoder': 'wav',
+    'auto_stop_ms': 0,
+    'stream_llm': False,
+    'policy': 'queue',
+    'transcriber': 'remote',
+    'memory_tokens': 0,
+    'memory_summary': False,
+    'response_cache': False,
+    'hedge_model': '',
+    'hedge_after_ms': 1500,
+}
+
+# Profiles edited in the window; more can be added to the settings file as
+# hotkey4, hotkey4_mode, hotkey4_model, hotkey4_output, hotkey4_precontext, ...
+WINDOW_HOTKEY_IDS = ['hotkey1', 'hotkey2', 'hotkey3']
+
+def load_settings(path=CONFIG_FILE):
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r') as f:
+        return json.load(f)
+
+def save_settings(settings):
+    os.makedirs(os.path.dirname(CONFIG_FILE), exist_ok=True)
+    with open(CONFIG_FILE, 'w') as f:
+        json.dump(settings, f, indent=4)
+
+def get_profile_options(settings, hotkey_id):
+    return {
+        option: settings.get(f'{hotkey_id}_{option}', default)
+        for option, default in PROFILE_OPTION_DEFAULTS.items()
+    }
+
+def get_hotkey_ids(settings):
+    extra = [key for key in settings if re.fullmatch(r'hotkey\d+', key) and key not in WINDOW_HOTKEY_IDS]
+    return WINDOW_HOTKEY_IDS + sorted(extra, key=lambda key: int(key[len('hotkey'):]))
@@ -0,0 +1,155 @@
+import os
+import hmac
+import json
+import socket
+import logging
+import secrets
+import threading
+import socketserver
+from config.settings import CONTROL_SOCKET, CONTROL_PORT
+
+# A small local control API. Each request is one line of JSON with a
+# 'command', its arguments and the server's 'token'; each reply is one line of
+# JSON with 'ok' and either 'result' or 'error'. Unix sockets are used where
+# the platform has them, otherwise a TCP port bound to localhost. Any local
+# process (or a web page posting to the port) can connect to that, so every
+# request must carry a random token the server writes to a file only the user
+# can read, next to the socket path; the temporary directory is per-user on
+# Windows.
+
+HAS_UNIX_SOCKETS = hasattr(socket, 'AF_UNIX')
+INVALID_TOKEN = 'Invalid token'
+
+def token_path(path=CONTROL_SOCKET):
+    return f'{path}.token'
+
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self):
+        try:
+            for line in self.rfile:
+                if not line.strip():
+                    continue
+                reply = self.server.control.dispatch(line)
+                if reply is None:
+                    return  # Not our protocol (an HTTP request, say): hang up without a word
+                self.wfile.write(json.dumps(reply).encode('utf-8') + b'\n')
+                if reply.get('error') == INVALID_TOKEN:
+                    return
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # The client hung up early
+
+class ControlServer:
+    """Serves commands from a local socket to handler functions.
+
+    handlers maps command names to callables that take the request's other
+    fields as keyword arguments and return something JSON-serializable.
+    Connections are handled on their own threads, so a slow command does not
+    hold up a status query.
+    """
+
+    def __init__(self, handlers, path=CONTROL_SOCKET, port=CONTROL_PORT):
+        self.handlers = handlers
+        self.path = path
+        self.port = port
+        self.token = secrets.token_hex(16)
+        self.server = None
+
+    @property
+    def address(self):
+        return self.path if HAS_UNIX_SOCKETS else f'127.0.0.1:{self.port}'
+
+    def dispatch(self, line):
+        # Returns the reply, or None if the line is not a JSON request at all
+        try:
+            request = json.loads(line)
+        except ValueError:
+            return None
+        if not isinstance(request, dict):
+            return None
+        token = request.pop('token', None)
+        if not isinstance(token, str) or not hmac.compare_digest(token, self.token):
+            logging.warning("Control request with a missing or wrong token refused.")
+            return {'ok': False, 'error': INVALID_TOKEN}
+        command = request.pop('command', None)
+        handler = self.handlers.get(command) if isinstance(command, str) else None
+        if handler is None:
+            return {'ok': False, 'error': f"Unknown command '{command}'"}
+        try:
+            return {'ok': True, 'result': handler(**request)}
+        except Exception as e:
+            logging.error(f"Control command '{command}' failed: {e}")
+            return {'ok': False, 'error': str(e) or type(e).__name__}
+
+    def start(self):
+        if HAS_UNIX_SOCKETS:
+            if os.path.exists(self.path):
+                if _is_listening(self.path):
+                    raise RuntimeError(f"Another instance is already listening on {self.path}")
+                os.unlink(self.path)  # Left behind by a process that did not shut down cleanly
+            server = socketserver.ThreadingUnixStreamServer(self.path, _Handler)
+            os.chmod(self.path, 0o600)
+        else:
+            server = socketserver.ThreadingTCPServer(('127.0.0.1', self.port), _Handler)
+        server.daemon_threads = True
+        server.control = self
+        self.server = server
+        self._write_token()
+        threading.Thread(target=server.serve_forever, name='control-server', daemon=True).start()
+        logging.info(f"Control socket listening on {self.address}.")
+
+    def stop(self):
+        server, self.server = self.server, None
+        if server is None:
+            return
+        server.shutdown()
+        server.server_close()
+        if HAS_UNIX_SOCKETS and os.path.exists(self.path):
+            os.unlink(self.path)
+        if os.path.exists(token_path(self.path)):
+            os.unlink(token_path(self.path))
+
+    def _write_token(self):
+        path = token_path(self.path)
+        if os.path.exists(path):
+            os.unlink(path)  # A new file, so it is created with the mode below
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        with os.fdopen(fd, 'w') as f:
+            f.write(self.token)
+
+def _connect(path, port, timeout):
+    if HAS_UNIX_SOCKETS:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        address = path
+    else:
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        address = ('127.0.0.1', port)
+    sock.settimeout(timeout)
+    try:
+        sock.connect(address)
+    except OSError:
+        sock.close()
+        raise
+    return sock
+
+def _is_listening(path):
+    try:
+        _connect(path, None, 1).close()
+        return True
+    except OSError:
+        return False
+
+def send_command(command, arguments=None, path=CONTROL_SOCKET, port=CONTROL_PORT, timeout=10):
+    # Returns the command's result; raises RuntimeError with the server's error message
+    with open(token_path(path)) as f:
+        token = f.read().strip()
+    with _connect(path, port, timeout) as sock:
+        request = {'command': command, **(arguments or {}), 'token': token}
+        sock.sendall(json.dumps(request).encode('utf-8') + b'\n')
+        with sock.makefile('rb') as reply_file:
+            line = reply_file.readline()
+    if not line:
+        raise ConnectionError("The control socket closed without a reply")
+    reply = json.loads(line)
+    if not reply.get('ok'):
+        raise RuntimeError(reply.get('error', 'Command failed'))
+    return reply.get('result')
@@ -0,0 +1,130 @@
+import math
+import logging
+import threading
+from collections import deque
+from config.settings import CONVERSATION_SUMMARY_MAX_TOKENS, CONVERSATION_SUMMARY_MAX_SHARE
+
+# Per-message framing the chat format adds on top of the content
+MESSAGE_OVERHEAD_TOKENS = 4
+
+_encoding = None
+_encoding_loaded = False
+
+def _get_encoding():
+    global _encoding, _encoding_loaded
+    if not _encoding_loaded:
+        _encoding_loaded = True
+        try:
+            # Optional dependency; without it token counts are estimated
+            import tiktoken
+            _encoding = tiktoken.get_encoding('cl100k_base')
+        except Exception as e:
+            logging.info(f"Estimating token counts from text length ({e}).")
+    return _encoding
+
+def count_tokens(text):
+    encoding = _get_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text)) + MESSAGE_OVERHEAD_TOKENS
+    # About four characters per token in English text
+    return math.ceil(len(text) / 4) + MESSAGE_OVERHEAD_TOKENS
+
+class Conversation:
+    """Recent exchanges of one hotkey profile, kept within a token budget.
+
+    Each exchange is counted once, when it is added, and the running total is
+    kept up to date, so building a prompt only copies the kept messages. When
+    the budget is exceeded the oldest exchanges are dropped; with summarize
+    set they are collected for summarize_conversation(), whose summary then
+    stands in for them and counts against the budget too. The summary is
+    limited to summary_limit tokens, a share of the budget, so it never
+    crowds out the recent exchanges.
+    """
+
+    def __init__(self, budget_tokens, summarize=False):
+        self.budget_tokens = budget_tokens
+        self.summarize = summarize
+        self.exchanges = deque()
+        self.tokens = 0
+        self.summary = ''
+        self.summary_tokens = 0
+        self.evicted = []
+        self.summarizing = False
+        self.lock = threading.Lock()
+
+    def messages(self):
+        with self.lock:
+            messages = []
+            if self.summary:
+                messages.append({'role': 'system', 'content': f'Summary of the earlier conversation: {self.summary}'})
+            for question, answer, _ in self.exchanges:
+                messages.append({'role': 'user', 'content': question})
+                messages.append({'role': 'assistant', 'content': answer})
+            return messages
+
+    def add(self, question, answer):
+        tokens = count_tokens(question) + count_tokens(answer)
+        with self.lock:
+            self.exchanges.append((question, answer, tokens))
+            self.tokens += tokens
+            self._trim()
+
+    def _trim(self):
+        while self.exchanges and self.tokens + self.summary_tokens > self.budget_tokens:
+            question, answer, tokens = self.exchanges.popleft()
+            self.tokens -= tokens
+            if self.summarize:
+                self.evicted.append((question, answer))
+
+    @property
+    def summary_limit(self):
+        return min(CONVERSATION_SUMMARY_MAX_TOKENS, int(self.budget_tokens * CONVERSATION_SUMMARY_MAX_SHARE))
+
+    def _fit_summary(self, summary):
+        # Drops words from the end until the summary fits its share of the budget
+        while summary and count_tokens(summary) > self.summary_limit:
+            summary = summary.rsplit(' ', 1)[0] if ' ' in summary else ''
+        self.summary = summary
+        self.summary_tokens = count_tokens(summary) if summary else 0
+
+    def set_budget(self, budget_tokens, summarize):
+        with self.lock:
+            self.budget_tokens = budget_tokens
+            self.summarize = summarize
+            self._fit_summary(self.summary)
+            self._trim()
+
+    def take_evicted(self):
+        # (current summary, evicted exchanges) to summarize, or None if there
+        # is nothing to do or a summary is already being written
+        with self.lock:
+            if self.summarizing or not self.evicted:
+                return None
+            self.summarizing = True
+            evicted, self.evicted = self.evicted, []
+            return self.summary, evicted
+
+    def set_summary(self, summary):
+        # Called when summarizing ends; None keeps the previous summary
+        with self.lock:
+            self.summarizing = False
+            if summary is not None:
+                self._fit_summary(summary)
+                self._trim()
+
+    def __repr__(self):
+        return (f"Conversation({len(self.exchanges)} exchanges, "
+                f"{self.tokens + self.summary_tokens}/{self.budget_tokens} tokens)")
+
+_conversations = {}
+_conversations_lock = threading.Lock()
+
+def get_conversation(hotkey_id, budget_tokens, summarize=False):
+    with _conversations_lock:
+        conversation = _conversations.get(hotkey_id)
+        if conversation is None:
+            conversation = _conversations[hotkey_id] = Conversation(budget_tokens, summarize)
+            return conversation
+    if (conversation.budget_tokens, conversation.summarize) != (budget_tokens, summarize):
+        conversation.set_budget(budget_tokens, summarize)
+    return conversation
@@ -0,0 +1,205 @@
+import time
+import logging
+import threading
+from collections import namedtuple
+from config.settings import DEVICE_REFRESH_SECONDS, DEVICE_REFRESH_RUNNING_SECONDS
+
+# key is the device's persistent identity, '<host API>: <name>'. PortAudio
+# renumbers devices when one is plugged in or removed, so selections are kept
+# by key (or name) and resolved to the current index only when a stream opens.
+AudioDevice = namedtuple('AudioDevice', 'key index name hostapi max_input_channels max_output_channels default_samplerate')
+
+CHANNELS = {'input': 'max_input_channels', 'output': 'max_output_channels'}
+
+def _scan():
+    # Returns (devices, {'input': default index, 'output': default index})
+    import sounddevice as sd
+    hostapis = sd.query_hostapis()
+    devices = []
+    for index, info in enumerate(sd.query_devices()):
+        hostapi = hostapis[info['hostapi']]['name']
+        devices.append(AudioDevice(
+            f"{hostapi}: {info['name']}", index, info['name'], hostapi,
+            info['max_input_channels'], info['max_output_channels'], info['default_samplerate'],
+        ))
+    default_hostapi = hostapis[sd.default.hostapi]
+    defaults = {
+        'input': default_hostapi['default_input_device'],
+        'output': default_hostapi['default_output_device'],
+    }
+    return devices, defaults
+
+def _reinitialize():
+    # PortAudio only enumerates devices when it starts, so seeing a hot-plugged
+    # device means restarting it; only done while no stream is open
+    import sounddevice as sd
+    sd._terminate()
+    sd._initialize()
+
+class DeviceRegistry:
+    """Audio devices, enumerated once and indexed by key, name and direction.
+
+    Lookups never query PortAudio; refresh() enumerates again, and watch()
+    does so in the background every DEVICE_REFRESH_SECONDS to pick up
+    hot-plugged devices. Refreshing restarts PortAudio, which needs every
+    stream closed: while is_idle() says one is open, the refresh runs inside
+    pause_streams(), which closes and reopens them, but only when is_quiet()
+    says nothing is being recorded or played. Otherwise it is left pending
+    and the watcher retries it. on_change() callbacks run after a refresh
+    that found a different set of devices.
+    """
+
+    def __init__(self, scan=_scan, reinitialize=_reinitialize):
+        self.scan = scan
+        self.reinitialize = reinitialize
+        self.is_idle = lambda: True
+        self.is_quiet = lambda: False
+        self.pause_streams = None
+        self.pending = False
+        self.lock = threading.RLock()
+        self.loaded = False
+        self.by_key = {}
+        self.by_name = {kind: {} for kind in CHANNELS}
+        self.lists = {kind: [] for kind in CHANNELS}
+        self.defaults = {kind: None for kind in CHANNELS}
+        self.callbacks = []
+        self.watcher = None
+        self.stop_watching_event = threading.Event()
+
+    def _index(self, devices, defaults):
+        by_key = {device.key: device for device in devices}
+        by_name = {kind: {} for kind in CHANNELS}
+        lists = {kind: [] for kind in CHANNELS}
+        for device in devices:
+            for kind, channels in CHANNELS.items():
+                if getattr(device, channels) > 0:
+                    lists[kind].append(device)
+                    # The first device with a name wins, as when matching names in a list
+                    by_name[kind].setdefault(device.name, device)
+        self.by_key, self.by_name, self.lists = by_key, by_name, lists
+        self.defaults = {kind: devices[index] if 0 <= index < len(devices) else None for kind, index in defaults.items()}
+
+    def _signature(self):
+        return tuple(self.by_key), tuple(device.key if device else None for device in self.defaults.values())
+
+    def _ensure_loaded(self):
+        if not self.loaded:
+            start = time.perf_counter()
+            self._index(*self.scan())
+            self.loaded = True
+            logging.info(f"Found {len(self.by_key)} audio device(s) in {(time.perf_counter() - start) * 1000:.0f} ms.")
+
+    def refresh(self, reinitialize=True):
+        # Returns True if the devices changed; on_change() callbacks are then called.
+        # pending is left True if audio was in use, so nothing was refreshed.
+        with self.lock:
+            if not self.loaded:
+                self._ensure_loaded()
+                return False
+            if reinitialize and not self.is_idle():
+                if not self.is_quiet():
+                    if not self.pending:
+                        logging.info("Audio is in use; the device refresh will wait until it is not.")
+                    self.pending = True
+                    return False
+                with self.pause_streams():
+                    changed = self._rescan(reinitialize)
+            else:
+                changed = self._rescan(reinitialize)
+        if changed:
+            logging.info(f"Audio devices changed; {len(self.by_key)} device(s) now available.")
+            for callback in list(self.callbacks):
+                try:
+                    callback()
+                except Exception as e:
+                    logging.error(f"Error in device change callback: {e}")
+        return changed
+
+    def _rescan(self, reinitialize):
+        if reinitialize:
+            self.reinitialize()
+            self.pending = False
+        before = self._signature()
+        self._index(*self.scan())
+        return self._signature() != before
+
+    def on_change(self, callback):
+        self.callbacks.append(callback)
+
+    def devices(self, kind):
+        with self.lock:
+            self._ensure_loaded()
+            return list(self.lists[kind])
+
+    def names(self, kind):
+        # Device names for a settings menu, without duplicates or disabled devices
+        names = dict.fromkeys(device.name for device in self.devices(kind))
+        return [name for name in names if not name.startswith('Disabled')]
+
+    def default(self, kind):
+        with self.lock:
+            self._ensure_loaded()
+            return self.defaults[kind]
+
+    def find(self, selection, kind):
+        # selection is a device key or name; returns the AudioDevice or None
+        if selection is None:
+            return None
+        with self.lock:
+            self._ensure_loaded()
+            device = self.by_key.get(selection)
+            if device is not None and getattr(device, CHANNELS[kind]) > 0:
+                return device
+            return self.by_name[kind].get(selection)
+
+    def index(self, selection, kind):
+        # The selection's current PortAudio index, or None for the default device
+        device = self.find(selection, kind)
+        return device.index if device is not None else None
+
+    def watch(self, interval=DEVICE_REFRESH_SECONDS, running_interval=DEVICE_REFRESH_RUNNING_SECONDS):
+        if self.watcher is not None or not interval:
+            return
+        self.stop_watching_event.clear()
+        self.watcher = threading.Thread(target=self._watch, args=(interval, running_interval), name='device-watcher',
+                                        daemon=True)
+        self.watcher.start()
+
+    def stop_watching(self):
+        watcher, self.watcher = self.watcher, None
+        if watcher is not None:
+            self.stop_watching_event.set()
+            watcher.join()
+
+    def _watch(self, interval, running_interval):
+        last_paused = time.monotonic()
+        while not self.stop_watching_event.wait(interval):
+            try:
+                if self.is_idle() or self.pending:
+                    self.refresh()
+                elif running_interval and time.monotonic() - last_paused >= running_interval:
+                    # Refreshing now means closing the open streams, so it is done less often
+                    last_paused = time.monotonic()
+                    self.refresh()
+            except Exception as e:
+                logging.error(f"Error refreshing audio devices: {e}")
+
+device_registry = DeviceRegistry()
+
+if __name__ == '__main__':
+    # Lists the devices with the keys settings can refer to them by, and
+    # compares the cost of enumerating with a lookup in the registry
+    start = time.perf_counter()
+    device_registry.refresh(reinitialize=False)
+    scan_ms = (time.perf_counter() - start) * 1000
+    for kind in CHANNELS:
+        default = device_registry.default(kind)
+        print(f"{kind.capitalize()} devices:")
+        for device in device_registry.devices(kind):
+            print(f"  {'*' if device == default else ' '} [{device.index}] {device.key}")
+    name = next((device.name for device in device_registry.devices('input')), None)
+    start = time.perf_counter()
+    for _ in range(1000):
+        device_registry.find(name, 'input')
+    lookup_us = (time.perf_counter() - start) * 1000
+    print(f"Enumerating took {scan_ms:.1f} ms; a lookup by name takes {lookup_us:.1f} us.")
@@ -1,43 +1,310 @@
-import aiohttp
-import asyncio
-from config.settings import OPENAI_API_KEY
-import logging
-
-async def get_response(transcription, model, output_method, precontext='Provide a brief and direct response.'):
-    url = 'https://api.openai.com/v1/chat/completions'
-    headers = {
-        'Authorization': f'Bearer {OPENAI_API_KEY}',
-        'Content-Type': 'application/json',
-    }
-    
-    messages = [{'role': 'user', 'content': transcription}]
-    if output_method != 'Clipboard':
-        messages.insert(0, {'role': 'system', 'content': precontext})
-
-    data = {
-        'model': model,
-        'messages': messages,
-        'max_tokens': 150,
-        'temperature': 0.7,
-    }
-    
-    try:
-        async with aiohttp.ClientSession() as session:
-            async with session.post(url, headers=headers, json=data) as response:
-                response.raise_for_status()
-                result = await response.json()
-                ai_response = result['choices'][0]['message']['content'].strip()
-                return postprocess_output(ai_response)
-    except aiohttp.ClientResponseError as e:
-        logging.error(f"HTTP error occurred: {e.status} - {e.message}")
-        return "Sorry, I couldn't process your request due to an HTTP error."
-    except Exception as e:
-        logging.error(f"An unexpected error occurred: {e}")
-        return "An error occurred while generating a response."
-
-def postprocess_output(ai_response):
-    unwanted_phrases = ["hello", "hi", "greetings", "thank you", "goodbye", "have a great day"]
-    for phrase in unwanted_phrases:
-        ai_response = ai_response.replace(phrase, "")
-    
-    return ai_response.strip()
\ No newline at end of file
+import aiohttp
+import asyncio
+import json
+import time
+from contextlib import aclosing
+from config.settings import OPENAI_API_KEY, OPENAI_API_BASE, STAGE_TIMEOUTS
+from utils.async_runtime import get_session
+from utils.sentences import SentenceSplitter, split_sentences
+from utils.tracing import span
+from utils.response_cache import ResponseCache
+from utils.hedging import race_with_hedge, HedgeMetrics
+from utils.resilience import call_with_retry, get_breaker, CircuitOpen, DeadlineExceeded
+from utils.response_filter import response_filter
+import logging
+
+CHAT_COMPLETIONS_URL = f'{OPENAI_API_BASE}/chat/completions'
+
+HTTP_ERROR_REPLY = "Sorry, I couldn't process your request due to an HTTP error."
+GENERIC_ERROR_REPLY = "An error occurred while generating a response."
+UNAVAILABLE_REPLY = "Sorry, the language model isn't responding right now. Please try again in a moment."
+ERROR_REPLIES = (HTTP_ERROR_REPLY, GENERIC_ERROR_REPLY, UNAVAILABLE_REPLY)
+
+# Failures that mean the endpoint is down or too slow, not that the request was wrong
+UNAVAILABLE_ERRORS = (CircuitOpen, DeadlineExceeded, asyncio.TimeoutError)
+
+response_cache = ResponseCache()
+hedge_metrics = HedgeMetrics()
+
+def response_cache_key(transcription, model, output_method, precontext, history=None):
+    # Answers that depend on earlier exchanges are not cached
+    if history:
+        return None
+    system_prompt = precontext if output_method != 'Clipboard' else None
+    return response_cache.make_key(model, system_prompt, transcription)
+
+def get_cached_response(key, model, trace=None):
+    if key is None:
+        return None
+    start = time.perf_counter()
+    cached = response_cache.get(key)
+    if cached is not None:
+        logging.info("Response cache hit.")
+        if trace:
+            trace.record('llm_completion', start, model=model, cached=True)
+    return cached
+
+def build_request(transcription, model, output_method, precontext, stream=False, history=None):
+    headers = {
+        'Authorization': f'Bearer {OPENAI_API_KEY}',
+        'Content-Type': 'application/json',
+    }
+    
+    # Earlier exchanges of the conversation, if the hotkey keeps any
+    messages = list(history or []) + [{'role': 'user', 'content': transcription}]
+    if output_method != 'Clipboard':
+        messages.insert(0, {'role': 'system', 'content': precontext})
+
+    data = {
+        'model': model,
+        'messages': messages,
+        'max_tokens': 150,
+        'temperature': 0.7,
+    }
+    if stream:
+        data['stream'] = True
+    return headers, data
+
+async def request_completion(transcription, model, output_method, precontext, history=None):
+    headers, data = build_request(transcription, model, output_method, precontext, history=history)
+    session = await get_session()
+    async with session.post(CHAT_COMPLETIONS_URL, headers=headers, json=data) as response:
+        response.raise_for_status()
+        result = await response.json()
+    return result['choices'][0]['message']['content'].strip()
+
+async def request_hedged_completion(transcription, model, output_method, precontext, history, hedge_model, hedge_after):
+    # Sends the same request to hedge_model if model hasn't answered within
+    # hedge_after seconds (or failed); the first answer wins
+    start = time.perf_counter()
+    index, text, hedged = await race_with_hedge(
+        lambda: request_completion(transcription, model, output_method, precontext, history),
+        lambda: request_completion(transcription, hedge_model, output_method, precontext, history),
+        hedge_after,
+    )
+    hedge_metrics.record('completion', model, hedged, index == 1, time.perf_counter() - start)
+    if index == 1:
+        logging.info(f"Hedge model '{hedge_model}' answered before '{model}'.")
+    return text
+
+async def get_response(transcription, model, output_method, precontext='Provide a brief and direct response.', trace=None,
+                       history=None, use_cache=True, hedge_model=None, hedge_after=1.5, deadline=None):
+    key = response_cache_key(transcription, model, output_method, precontext, history) if use_cache else None
+    cached = get_cached_response(key, model, trace)
+    if cached is not None:
+        return cached
+    
+    try:
+        breaker = get_breaker('chat')
+        if hedge_model:
+            with span(trace, 'llm_completion', model=model, hedge_model=hedge_model):
+                ai_response = await call_with_retry(lambda: request_hedged_completion(
+                    transcription, model, output_method, precontext, history, hedge_model, hedge_after
+                ), 'llm', breaker, deadline)
+        else:
+            with span(trace, 'llm_completion', model=model):
+                ai_response = await call_with_retry(
+                    lambda: request_completion(transcription, model, output_method, precontext, history),
+                    'llm', breaker, deadline,
+                )
+        answer = postprocess_output(ai_response)
+        if key and answer:
+            response_cache.put(key, answer)
+        return answer
+    except aiohttp.ClientResponseError as e:
+        logging.error(f"HTTP error occurred: {e.status} - {e.message}")
+        return HTTP_ERROR_REPLY
+    except UNAVAILABLE_ERRORS as e:
+        logging.error(f"Language model unavailable: {e!r}")
+        return UNAVAILABLE_REPLY
+    except Exception as e:
+        logging.error(f"An unexpected error occurred: {e}")
+        return GENERIC_ERROR_REPLY
+
+async def stream_tokens(transcription, model, output_method, precontext='Provide a brief and direct response.', trace=None,
+                        history=None):
+    # Yields content deltas from a server-sent events chat completion
+    headers, data = build_request(transcription, model, output_method, precontext, stream=True, history=history)
+    start = time.perf_counter()
+    session = await get_session()
+    async with session.post(CHAT_COMPLETIONS_URL, headers=headers, json=data) as response:
+        response.raise_for_status()
+        async for raw_line in response.content:
+            line = raw_line.decode('utf-8').strip()
+            if not line.startswith('data:'):
+                continue
+            payload = line[len('data:'):].strip()
+            if payload == '[DONE]':
+                break
+            choices = json.loads(payload).get('choices') or [{}]
+            delta = choices[0].get('delta', {}).get('content')
+            if delta:
+                if trace:
+                    trace.record_once('llm_first_token', start, model=model)
+                yield delta
+    if trace:
+        trace.record('llm_completion', start, model=model, streamed=True)
+
+async def stream_hedged_tokens(transcription, model, output_method, precontext, trace, history, hedge_model, hedge_after):
+    # Like stream_tokens, but if model has sent no token within hedge_after
+    # seconds (or failed) the request also goes to hedge_model, and the
+    # stream that starts first is used
+    start = time.perf_counter()
+    streams = {}
+
+    async def first_token(index, name):
+        streams[index] = stream_tokens(transcription, name, output_method, precontext, history=history)
+        return await streams[index].__anext__()
+
+    try:
+        index, token, hedged = await race_with_hedge(
+            lambda: first_token(0, model), lambda: first_token(1, hedge_model), hedge_after
+        )
+    except StopAsyncIteration:
+        return  # Neither model sent any content
+    winner = (model, hedge_model)[index]
+    hedge_metrics.record('first_token', model, hedged, index == 1, time.perf_counter() - start)
+    if index == 1:
+        logging.info(f"Hedge model '{hedge_model}' started streaming before '{model}'.")
+    if trace:
+        trace.record_once('llm_first_token', start, model=winner, hedged=hedged)
+    yield token
+    async for token in streams[index]:
+        yield token
+    if trace:
+        trace.record('llm_completion', start, model=winner, streamed=True, hedged=hedged)
+
+async def next_token(tokens):
+    try:
+        return await tokens.__anext__()
+    except StopAsyncIteration:
+        return None
+
+async def stream_sentences(transcription, model, output_method, precontext='Provide a brief and direct response.', trace=None,
+                           history=None, errors=None, hedge_model=None, hedge_after=1.5, deadline=None):
+    # Yields the response one sentence at a time as soon as each is complete.
+    # An error that ends the stream is appended to errors, if given.
+    splitter = SentenceSplitter()
+    # Filtering the tokens before they reach the splitter holds back only a possible phrase, not a sentence
+    token_filter = response_filter.stream()
+    emitted = False
+
+    async def first_token():
+        # Only the wait for the first token is retried; after that the answer is already being spoken
+        if hedge_model:
+            tokens = stream_hedged_tokens(transcription, model, output_method, precontext, trace, history,
+                                          hedge_model, hedge_after)
+        else:
+            tokens = stream_tokens(transcription, model, output_method, precontext, trace, history)
+        return tokens, await next_token(tokens)
+
+    tokens = None
+    try:
+        tokens, token = await call_with_retry(first_token, 'llm', get_breaker('chat'), deadline)
+        while token is not None:
+            for sentence in splitter.feed(token_filter.feed(token)):
+                sentence = sentence.strip()
+                if sentence:
+                    emitted = True
+                    yield sentence
+            # A stream that stalls part-way is given up after the stage timeout
+            token = await asyncio.wait_for(next_token(tokens), STAGE_TIMEOUTS['llm'])
+    except aiohttp.ClientResponseError as e:
+        logging.error(f"HTTP error occurred: {e.status} - {e.message}")
+        if errors is not None:
+            errors.append(e)
+        if not emitted:
+            yield HTTP_ERROR_REPLY
+        return
+    except UNAVAILABLE_ERRORS as e:
+        logging.error(f"Language model unavailable: {e!r}")
+        if errors is not None:
+            errors.append(e)
+        if not emitted:
+            yield UNAVAILABLE_REPLY
+        return
+    except Exception as e:
+        logging.error(f"An unexpected error occurred: {e}")
+        if errors is not None:
+            errors.append(e)
+        if not emitted:
+            yield GENERIC_ERROR_REPLY
+        return
+    finally:
+        if tokens is not None:
+            # Also releases the connection when the caller stops reading early
+            await tokens.aclose()
+    sentences = [sentence.strip() for sentence in splitter.feed(token_filter.flush())]
+    for sentence in sentences + [splitter.flush()]:
+        if sentence:
+            yield sentence
+
+async def speak_streamed_response(transcription, model, output_method, precontext, speak, trace=None, history=None,
+                                  use_cache=True, hedge_model=None, hedge_after=1.5, deadline=None):
+    # Hands each sentence to speak() as soon as it arrives; returns the full answer.
+    # speak() returning False means the speech was interrupted: the rest is not read.
+    key = response_cache_key(transcription, model, output_method, precontext, history) if use_cache else None
+    cached = get_cached_response(key, model, trace)
+    if cached is not None:
+        for sentence in split_sentences(cached):
+            if speak(sentence) is False:
+                break
+        return cached
+    sentences = []
+    errors = []
+    interrupted = False
+    stream = stream_sentences(transcription, model, output_method, precontext, trace, history, errors,
+                              hedge_model, hedge_after, deadline)
+    async with aclosing(stream):
+        async for sentence in stream:
+            if not sentences:
+                logging.info("First sentence of streamed response ready for speech.")
+            if speak(sentence) is False:
+                # Closing the stream ends the request instead of reading tokens nobody will hear
+                interrupted = True
+                break
+            sentences.append(sentence)
+    answer = ' '.join(sentences)
+    if key and answer and not errors and not interrupted:
+        response_cache.put(key, answer)
+    return answer
+
+async def summarize_conversation(conversation, model):
+    # Folds exchanges that fell out of the conversation's budget into its summary
+    pending = conversation.take_evicted()
+    if pending is None:
+        return
+    summary, exchanges = pending
+    lines = [f'Earlier summary: {summary}'] if summary else []
+    for question, answer in exchanges:
+        lines += [f'User: {question}', f'Assistant: {answer}']
+    headers, data = build_request('\n'.join(lines), model, 'LLM', (
+        'Summarize this conversation in a few sentences, keeping facts, names and '
+        'open questions the user may refer back to.'
+    ))
+    data['max_tokens'] = max(1, conversation.summary_limit)
+    data['temperature'] = 0.2
+
+    async def attempt():
+        session = await get_session()
+        async with session.post(CHAT_COMPLETIONS_URL, headers=headers, json=data) as response:
+            response.raise_for_status()
+            return await response.json()
+
+    try:
+        result = await call_with_retry(attempt, 'llm', get_breaker('chat'))
+        conversation.set_summary(result['choices'][0]['message']['content'].strip())
+        logging.info(f"Summarized {len(exchanges)} earlier exchange(s): {conversation}")
+    except Exception as e:
+        logging.warning(f"Could not summarize the conversation, dropping {len(exchanges)} exchange(s): {e}")
+        conversation.set_summary(None)
+
+def get_response_cache_stats():
+    return response_cache.stats()
+
+def get_hedge_stats():
+    return hedge_metrics.stats()
+
+def postprocess_output(ai_response):
+    # Removes the phrases in RESPONSE_FILTER_RULES as whole words, in any case
+    return response_filter.apply(ai_response).strip()
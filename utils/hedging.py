@@ -0,0 +1,71 @@
+import asyncio
+import threading
+
+async def race_with_hedge(primary, hedge, hedge_after):
+    # Runs primary(); if it has no result after hedge_after seconds, or fails,
+    # hedge() runs as well. Returns (index, result, hedged) for the first of
+    # the two to succeed (index 0 is primary) and cancels the other. Raises the
+    # last error if both fail.
+    tasks = {asyncio.ensure_future(primary()): 0}
+    hedged = False
+    error = None
+    try:
+        while True:
+            done, _ = await asyncio.wait(tasks, timeout=None if hedged else hedge_after,
+                                         return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                index = tasks.pop(task)
+                if task.exception() is None:
+                    return index, task.result(), hedged
+                error = task.exception()
+            if not hedged:
+                hedged = True
+                tasks[asyncio.ensure_future(hedge())] = 1
+            elif not tasks:
+                raise error
+    finally:
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+class HedgeMetrics:
+    """Counts of hedged requests and an estimate of the latency they saved.
+
+    When the hedge wins, the saving is the primary model's typical latency (a
+    moving average of the requests it won) minus the time the answer took.
+    Slow primary requests that lost are missing from that average, so the
+    estimate errs low.
+    """
+
+    def __init__(self, smoothing=0.2):
+        self.smoothing = smoothing
+        self.lock = threading.Lock()
+        self.typical = {}
+        self.requests = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+        self.saved_seconds = 0.0
+
+    def record(self, stage, model, hedged, hedge_won, elapsed):
+        with self.lock:
+            self.requests += 1
+            self.hedged += hedged
+            key = (stage, model)
+            typical = self.typical.get(key)
+            if hedge_won:
+                self.hedge_wins += 1
+                if typical is not None:
+                    self.saved_seconds += max(0.0, typical - elapsed)
+            else:
+                self.typical[key] = elapsed if typical is None else typical + self.smoothing * (elapsed - typical)
+
+    def stats(self):
+        with self.lock:
+            return {
+                'requests': self.requests,
+                'hedged': self.hedged,
+                'hedge_rate': self.hedged / self.requests if self.requests else 0.0,
+                'hedge_wins': self.hedge_wins,
+                'saved_ms': round(self.saved_seconds * 1000, 1),
+            }
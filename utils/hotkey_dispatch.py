@@ -0,0 +1,115 @@
+import logging
+
+MODIFIERS = {'ctrl', 'shift', 'alt', 'cmd'}
+
+def normalize_key_name(name):
+    # 'Page Up', 'page_up' -> 'page_up'; 'ctrl_l', 'right ctrl', 'alt_gr' -> 'ctrl' / 'alt'
+    name = name.lower().strip().replace(' ', '_')
+    for side in ('left_', 'right_'):
+        if name.startswith(side) and name[len(side):] in MODIFIERS:
+            return name[len(side):]
+    base = name.rsplit('_', 1)[0]
+    if base in MODIFIERS:
+        return base
+    return name
+
+# Raw key name -> normalized name, so the hook normalizes each distinct key once
+_normalized = {}
+
+def key_name(key):
+    # pynput Key or KeyCode -> the name used in hotkey settings, or None
+    name = getattr(key, 'char', None) or getattr(key, 'name', None)
+    if not name:
+        return None
+    normalized = _normalized.get(name)
+    if normalized is None:
+        normalized = _normalized[name] = normalize_key_name(name)
+    return normalized
+
+def parse_hotkey(hotkey):
+    # 'f9' or a chord such as 'ctrl+shift+f9' -> (trigger key, modifier set)
+    keys = [normalize_key_name(part) for part in hotkey.split('+') if part.strip()]
+    if not keys:
+        raise ValueError(f"Empty hotkey: {hotkey!r}")
+    return keys[-1], frozenset(keys[:-1])
+
+class HotkeyDispatcher:
+    """One process-wide keyboard hook for every hotkey profile.
+
+    Bindings map a trigger key to its (modifiers, hotkey_id) pairs, so a
+    keystroke costs one dict lookup however many profiles there are. The hook
+    callbacks only track held keys, look the key up and post events; all real
+    work happens on the thread that handles the posted events.
+    """
+
+    def __init__(self, post, is_busy=lambda: False):
+        self.post = post
+        self.is_busy = is_busy
+        self.bindings = {}
+        self.modes = {}
+        self.held = set()
+        self.active = {}
+        self.listener = None
+
+    def bind(self, hotkey_id, hotkey, mode):
+        self.unbind(hotkey_id)
+        trigger, modifiers = parse_hotkey(hotkey)
+        # Most specific chord first, so ctrl+f9 wins over f9 when ctrl is held
+        entries = sorted(self.bindings.get(trigger, []) + [(modifiers, hotkey_id)], key=lambda entry: -len(entry[0]))
+        self.bindings[trigger] = entries
+        self.modes[hotkey_id] = mode
+        logging.info(f"Hotkey '{hotkey_id}' bound to {hotkey} ({mode}).")
+
+    def unbind(self, hotkey_id):
+        for trigger, entries in list(self.bindings.items()):
+            remaining = [entry for entry in entries if entry[1] != hotkey_id]
+            if remaining:
+                self.bindings[trigger] = remaining
+            else:
+                del self.bindings[trigger]
+        self.modes.pop(hotkey_id, None)
+
+    def clear(self):
+        self.bindings = {}
+        self.modes = {}
+        self.active.clear()
+
+    def start(self):
+        if self.listener is None:
+            from pynput import keyboard
+            self.listener = keyboard.Listener(on_press=self.on_press, on_release=self.on_release)
+            self.listener.start()
+            logging.info("Keyboard listener started.")
+
+    def stop(self):
+        listener, self.listener = self.listener, None
+        if listener is not None:
+            listener.stop()
+            logging.info("Keyboard listener stopped.")
+        self.held.clear()
+        self.active.clear()
+
+    def on_press(self, key):
+        name = key_name(key)
+        if name is None:
+            return
+        # Any key interrupts speech; the stop itself runs off the hook thread
+        if self.is_busy():
+            self.post('interrupt', None)
+        self.held.add(name)
+        if name in self.active:
+            return  # Auto-repeat of a hotkey that is already down
+        for modifiers, hotkey_id in self.bindings.get(name, ()):
+            if modifiers <= self.held:
+                self.active[name] = hotkey_id
+                self.post('toggle' if self.modes[hotkey_id] == 'Toggle' else 'press', hotkey_id)
+                return
+
+    def on_release(self, key):
+        name = key_name(key)
+        if name is None:
+            return
+        self.held.discard(name)
+        hotkey_id = self.active.pop(name, None)
+        if hotkey_id is not None and self.modes.get(hotkey_id) == 'Hold':
+            self.post('release', hotkey_id)
@@ -1,151 +1,290 @@
-from pynput import keyboard
-from utils.audio_processing import start_recording, stop_recording, play_sound
-from utils.gpt_response import get_response
-from utils.text_to_speech import text_to_speech, stop_text_to_speech, is_audio_playing
-import threading
-import asyncio
-import pyperclip
-import logging
-import os
-import time
-
-# Configure logging
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
-
-recording_flags = {
-    'hotkey1': False,
-    'hotkey2': False,
-    'hotkey3': False  # Added hotkey3
-}
-recording_locks = {
-    'hotkey1': threading.Lock(),
-    'hotkey2': threading.Lock(),
-    'hotkey3': threading.Lock()  # Added lock for hotkey3
-}
-
-# Add a debounce time in seconds
-DEBOUNCE_TIME = 0.2
-last_toggle_time = {
-    'hotkey1': 0,
-    'hotkey2': 0,
-    'hotkey3': 0  # Added hotkey3
-}
-
-# Locks for each hotkey to ensure thread safety
-hotkey_locks = {
-    'hotkey1': threading.Lock(),
-    'hotkey2': threading.Lock(),
-    'hotkey3': threading.Lock()  # Added hotkey3
-}
-
-def on_hotkey_pressed(hotkey_id, model, output_method, precontext, mode):
-    current_time = time.time()
-
-    with hotkey_locks[hotkey_id]:
-        # Check for debounce only in Toggle mode
-        if mode == 'Toggle' and current_time - last_toggle_time[hotkey_id] < DEBOUNCE_TIME:
-            logging.info(f"Debounce active for '{hotkey_id}'. Ignoring toggle.")
-            return
-
-        last_toggle_time[hotkey_id] = current_time
-
-        with recording_locks[hotkey_id]:
-            # Check if any other hotkey is active
-            if any(flag for key, flag in recording_flags.items() if key != hotkey_id and flag) and not recording_flags[hotkey_id]:
-                logging.warning(f"Another hotkey is already active. Cannot start '{hotkey_id}'.")
-                return
-
-            # Toggle the recording state
-            if not recording_flags[hotkey_id]:
-                logging.info(f"Hotkey '{hotkey_id}' pressed: Initiating start sequence.")
-                stop_text_to_speech()
-                logging.info("Stopped any ongoing text-to-speech playback.")
-                start_recording()
-                logging.info("Recording started.")
-                recording_flags[hotkey_id] = True
-            else:
-                logging.info(f"Hotkey '{hotkey_id}' pressed: Initiating stop sequence.")
-                # Add a delay before stopping the recording
-                time.sleep(0.5)  # 500ms delay, adjust as needed
-                audio_file_path = stop_recording()
-                logging.info(f"Recording stopped after delay. Audio file saved to {audio_file_path}")
-                recording_flags[hotkey_id] = False
-                if audio_file_path:
-                    threading.Thread(
-                        target=process_audio,
-                        args=(audio_file_path, model, output_method, precontext),
-                        daemon=True
-                    ).start()
-                    logging.info("Started processing audio in a new thread.")
-                else:
-                    logging.error("No audio file was created. Skipping audio processing.")
-
-def process_audio(file_path, model, output_method, precontext):
-    logging.info(f"Beginning to process audio file: {file_path}")
-    from utils.transcription import transcribe_audio
-    try:
-        transcription = transcribe_audio(file_path)
-        logging.info(f"Transcription: {transcription}")
-        os.remove(file_path)  # Clean up the audio file after transcription
-        logging.info(f"Deleted temporary audio file: {file_path}")
-
-        if output_method == 'Clipboard':
-            pyperclip.copy(transcription)
-            logging.info("Transcription copied to clipboard.")
-            play_sound('audio/clipboard_sound.mp3')
-        else:
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            logging.info(f"Sending transcription to GPT model '{model}' with precontext.")
-            answer = loop.run_until_complete(get_response(transcription, model, output_method, precontext))
-            logging.info(f"GPT Response: {answer}")
-
-            if output_method == 'LLM':
-                text_to_speech(answer)
-            else:
-                logging.warning(f"Unknown output method: {output_method}")
-    except Exception as e:
-        logging.error(f"Error processing audio: {e}")
-
-def setup_hotkey_listener(hotkey_id, hotkey, mode, model, output_method, precontext):
-    key_combination = {hotkey.lower()}  # Ensure the hotkey is in a set for comparison
-
-    pressed_keys = set()
-    key_pressed = False  # Track if the key is currently pressed
-
-    def on_press(key):
-        nonlocal key_pressed
-        try:
-            key_char = key.char.lower()
-        except AttributeError:
-            key_char = key.name.lower()
-
-        # Stop audio playback when any key is pressed, but only if audio is playing
-        if is_audio_playing():
-            stop_text_to_speech()
-
-        if key_char in key_combination:
-            if not key_pressed:  # Only toggle if the key wasn't already pressed
-                key_pressed = True
-                logging.info(f"Hotkey '{hotkey_id}' detected: {key_combination}")
-                if mode == 'Toggle':
-                    on_hotkey_pressed(hotkey_id, model, output_method, precontext, mode)
-                elif mode == 'Hold' and not recording_flags[hotkey_id]:
-                    on_hotkey_pressed(hotkey_id, model, output_method, precontext, mode)
-
-    def on_release(key):
-        nonlocal key_pressed
-        try:
-            key_char = key.char.lower()
-        except AttributeError:
-            key_char = key.name.lower()
-
-        if key_char in key_combination:
-            key_pressed = False  # Reset the key pressed state
-
-        if mode == 'Hold' and not key_combination <= pressed_keys and recording_flags[hotkey_id]:
-            on_hotkey_pressed(hotkey_id, model, output_method, precontext, mode)
-
-    listener = keyboard.Listener(on_press=on_press, on_release=on_release)
-    listener.start()
-    return listener
\ No newline at end of file
+from utils.gpt_response import get_response, speak_streamed_response, summarize_conversation, ERROR_REPLIES
+from utils.text_to_speech import text_to_speech, stop_text_to_speech, is_audio_playing, precache_speech, speech_generation
+from utils.streaming_transcription import StreamingTranscriber
+from utils.pipeline_scheduler import PipelineScheduler, JobCancelled
+from utils.tracing import start_trace, span
+from utils.hotkey_dispatch import HotkeyDispatcher
+from utils.conversation import get_conversation
+from utils.resilience import Deadline
+from utils.audio_clip import AudioClip
+from config.settings import UTTERANCE_BUDGET_SECONDS, UTTERANCE_BUDGET_PER_AUDIO_SECOND
+from utils import async_runtime
+import threading
+import queue
+import logging
+import time
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# The fixed error replies are most likely to be needed when the network is
+# struggling, so have their speech ready before then
+async_runtime.prewarm_hooks.append(lambda: precache_speech(list(ERROR_REPLIES)))
+
+# Add a debounce time in seconds
+DEBOUNCE_TIME = 0.2
+
+# Per-hotkey profiles: mode, model, output method, precontext and options
+# (see PROFILE_OPTION_DEFAULTS in config_manager)
+hotkey_profiles = {}
+
+class RecordingStateMachine:
+    """Owns recording start/stop, driven by events from the keyboard listener.
+
+    Listener callbacks only post events, so key handling never waits on audio
+    devices or file work. Events are handled in order on a single worker
+    thread, which makes the per-hotkey locks unnecessary.
+    """
+
+    IDLE = 'idle'
+    RECORDING = 'recording'
+
+    def __init__(self):
+        self.events = queue.Queue()
+        self.state = self.IDLE
+        self.active_hotkey = None
+        self.session = 0
+        self.trace = None
+        self.last_toggle_time = {}
+        self.thread = threading.Thread(target=self._run, name='recording-state-machine', daemon=True)
+        self.thread.start()
+
+    def post(self, event, hotkey_id, session=None):
+        self.events.put((event, hotkey_id, session, time.time()))
+
+    def is_recording(self, hotkey_id=None):
+        return self.state == self.RECORDING and hotkey_id in (None, self.active_hotkey)
+
+    def _run(self):
+        while True:
+            event, hotkey_id, session, event_time = self.events.get()
+            try:
+                getattr(self, f'_on_{event}')(hotkey_id, session, event_time)
+            except Exception as e:
+                logging.error(f"Error handling '{event}' for '{hotkey_id}': {e}")
+
+    def _on_toggle(self, hotkey_id, session, event_time):
+        if event_time - self.last_toggle_time.get(hotkey_id, 0) < DEBOUNCE_TIME:
+            logging.info(f"Debounce active for '{hotkey_id}'. Ignoring toggle.")
+            return
+        self.last_toggle_time[hotkey_id] = event_time
+        if self.state == self.IDLE:
+            self._start(hotkey_id, event_time)
+        elif self.active_hotkey == hotkey_id:
+            self._stop(hotkey_id)
+        else:
+            logging.warning(f"Another hotkey is already active. Cannot start '{hotkey_id}'.")
+
+    def _on_press(self, hotkey_id, session, event_time):
+        if self.state == self.IDLE:
+            self._start(hotkey_id, event_time)
+        elif self.active_hotkey != hotkey_id:
+            logging.warning(f"Another hotkey is already active. Cannot start '{hotkey_id}'.")
+
+    def _on_release(self, hotkey_id, session, event_time):
+        if self.is_recording(hotkey_id):
+            self._stop(hotkey_id)
+
+    def _on_interrupt(self, hotkey_id, session, event_time):
+        if is_audio_playing():
+            stop_text_to_speech()
+
+    def _on_auto_stop(self, hotkey_id, session, event_time):
+        # A late auto-stop must not end a newer recording
+        if self.is_recording(hotkey_id) and session == self.session:
+            logging.info(f"Hotkey '{hotkey_id}' auto-stopped after silence.")
+            self._stop(hotkey_id)
+
+    def _start(self, hotkey_id, event_time=None):
+        # Capture needs the audio libraries, which load with the first recording
+        from utils.audio_processing import start_recording
+        profile = hotkey_profiles[hotkey_id]
+        trace = start_trace(hotkey_id, event_time)
+        if trace:
+            trace.record('dispatch', trace.start)
+        options = profile['options']
+        logging.info(f"Hotkey '{hotkey_id}' pressed: Initiating start sequence.")
+        stop_text_to_speech()
+        logging.info("Stopped any ongoing text-to-speech playback.")
+        if options.get('policy', 'queue') == 'newest_wins':
+            cancelled = pipeline.cancel(hotkey_id)
+            if cancelled:
+                logging.info(f"Newest wins: cancelled {cancelled} older utterance(s) from '{hotkey_id}'.")
+        self.session += 1
+        session = self.session
+        auto_stop_ms = options.get('auto_stop_ms', 0) if profile['mode'] == 'Toggle' else 0
+        with span(trace, 'stream_open'):
+            start_recording(
+                streaming=options.get('streaming', False),
+                encoder=options.get('encoder', 'wav'),
+                auto_stop_ms=auto_stop_ms,
+                transcriber=options.get('transcriber', 'remote'),
+                on_auto_stop=lambda: self.post('auto_stop', hotkey_id, session),
+                trace=trace,
+                spool=profile['mode'] == 'Toggle',
+            )
+        if trace:
+            trace.mark('capture_start')
+        self.trace = trace
+        self.state = self.RECORDING
+        self.active_hotkey = hotkey_id
+        logging.info("Recording started.")
+
+    def _stop(self, hotkey_id):
+        from utils.audio_processing import stop_recording
+        logging.info(f"Hotkey '{hotkey_id}' released: Initiating stop sequence.")
+        audio = stop_recording()
+        trace, self.trace = self.trace, None
+        if trace:
+            trace.record('capture', trace.marks['capture_start'])
+            trace.mark('capture_end')
+        self.state = self.IDLE
+        self.active_hotkey = None
+        if audio:
+            submit_audio(hotkey_id, audio, trace)
+        else:
+            logging.error("No audio was captured. Skipping audio processing.")
+
+# Utterances are processed on a bounded worker pool instead of a thread each
+pipeline = PipelineScheduler()
+state_machine = RecordingStateMachine()
+# One keyboard hook for all profiles
+dispatcher = HotkeyDispatcher(state_machine.post, is_audio_playing)
+
+def get_pipeline_stats():
+    return pipeline.stats()
+
+def submit_audio(hotkey_id, audio, trace=None):
+    # Queues a recording (or any AudioClip) for processing with the hotkey's profile
+    profile = hotkey_profiles[hotkey_id]
+    options = profile['options']
+    conversation = None
+    if profile['output_method'] == 'LLM' and options.get('memory_tokens'):
+        conversation = get_conversation(hotkey_id, options['memory_tokens'], options.get('memory_summary', False))
+    return pipeline.submit(
+        hotkey_id, process_audio,
+        audio, profile['model'], profile['output_method'], profile['precontext'], options, trace, conversation,
+    )
+
+def start_capture(hotkey_id):
+    # The same events a key press and release post, so capture behaves as if the key were held
+    state_machine.post('press', hotkey_id)
+
+def stop_capture(hotkey_id):
+    state_machine.post('release', hotkey_id)
+
+def get_listener_status():
+    return {
+        'state': state_machine.state,
+        'active_hotkey': state_machine.active_hotkey,
+        'speaking': is_audio_playing(),
+        'hotkeys': sorted(hotkey_profiles),
+        'pipeline': get_pipeline_stats(),
+    }
+
+def process_audio(audio, model, output_method, precontext, options=None, trace=None, conversation=None, job=None):
+    from utils.transcription import transcribe_audio_async
+    options = options or {}
+    run = job.run if job else async_runtime.run
+    backend = options.get('transcriber', 'remote')
+    # One time budget for all upstream calls of this utterance; long recordings get more
+    duration = audio.duration if isinstance(audio, AudioClip) else 0
+    deadline = Deadline(UTTERANCE_BUDGET_SECONDS + duration * UTTERANCE_BUDGET_PER_AUDIO_SECOND)
+    try:
+        if isinstance(audio, StreamingTranscriber):
+            if job:
+                job.on_cancel(audio.cancel)
+            logging.info(f"Waiting for {audio.pending_segments()} streaming segment(s) to finish.")
+            with span(trace, 'transcription', backend=backend, streaming=True):
+                transcription = audio.finish()
+        else:
+            logging.info(f"Beginning to process audio: {audio}")
+            with span(trace, 'transcription', backend=backend):
+                transcription = run(transcribe_audio_async(
+                    audio, encoder=options.get('encoder', 'wav'), backend=backend, trace=trace, deadline=deadline
+                ))
+        logging.info(f"Transcription: {transcription}")
+        if not transcription or not transcription.strip():
+            # A recording with no speech (all-silent streaming segments, say): nothing to answer or copy
+            logging.warning("Nothing was transcribed. Skipping the response.")
+            return
+        if job:
+            job.check()
+            if output_method == 'LLM':
+                # Cancelling the job also stops its queued synthesis and playback
+                job.on_cancel(stop_text_to_speech)
+
+        history = conversation.messages() if conversation else None
+        llm_options = {
+            'use_cache': options.get('response_cache', False),
+            'hedge_model': options.get('hedge_model') or None,
+            'hedge_after': options.get('hedge_after_ms', 1500) / 1000,
+            'deadline': deadline,
+        }
+        if output_method == 'Clipboard':
+            import pyperclip
+            from utils.audio_processing import play_sound
+            pyperclip.copy(transcription)
+            logging.info("Transcription copied to clipboard.")
+            play_sound('audio/clipboard_sound.mp3')
+        elif output_method == 'LLM' and options.get('stream_llm', False):
+            logging.info(f"Streaming response from GPT model '{model}' into speech.")
+            # An interruption from here on drops the sentences still to come
+            generation = speech_generation()
+            answer = run(speak_streamed_response(
+                transcription, model, output_method, precontext,
+                lambda sentence: text_to_speech(sentence, trace, generation), trace=trace, history=history,
+                **llm_options,
+            ))
+            logging.info(f"GPT Response: {answer}")
+            remember(conversation, transcription, answer, model)
+        else:
+            logging.info(f"Sending transcription to GPT model '{model}' with precontext.")
+            answer = run(get_response(
+                transcription, model, output_method, precontext, trace=trace, history=history,
+                **llm_options,
+            ))
+            logging.info(f"GPT Response: {answer}")
+            if job:
+                job.check()
+            remember(conversation, transcription, answer, model)
+
+            if output_method == 'LLM':
+                text_to_speech(answer, trace)
+            else:
+                logging.warning(f"Unknown output method: {output_method}")
+    except JobCancelled:
+        logging.info(f"Processing cancelled for {job}.")
+    except Exception as e:
+        if job and job.cancelled.is_set():
+            logging.info(f"Processing cancelled for {job}.")
+        else:
+            logging.error(f"Error processing audio: {e}")
+
+def remember(conversation, question, answer, model):
+    if conversation is None or not answer or answer in ERROR_REPLIES:
+        return
+    conversation.add(question, answer)
+    logging.info(f"Conversation memory: {conversation}")
+    if conversation.evicted:
+        # Off the critical path: the summary is ready for a later question
+        async_runtime.submit(summarize_conversation(conversation, model))
+
+def register_profile(hotkey_id, mode, model, output_method, precontext, options=None):
+    hotkey_profiles[hotkey_id] = {
+        'mode': mode,
+        'model': model,
+        'output_method': output_method,
+        'precontext': precontext,
+        'options': options or {},
+    }
+
+def setup_hotkey_listener(hotkey_id, hotkey, mode, model, output_method, precontext, options=None):
+    register_profile(hotkey_id, mode, model, output_method, precontext, options)
+    dispatcher.bind(hotkey_id, hotkey, mode)
+    dispatcher.start()
+    return dispatcher
+
+def stop_hotkey_listener():
+    dispatcher.stop()
+    dispatcher.clear()
@@ -0,0 +1,59 @@
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from config.settings import LOCAL_WHISPER_MODEL, LOCAL_WHISPER_COMPUTE_TYPE, LOCAL_WHISPER_THREADS
+
+SAMPLE_RATE = 16000
+
+class LocalWhisper:
+    """A Whisper model running on the CPU inside this process.
+
+    load() is called once when the assistant starts and keeps the model in
+    memory, including one warm-up pass so the first utterance doesn't pay for
+    lazy initialisation. transcribe() takes 16 kHz PCM samples directly.
+    Calls are serialized on one thread, since a single inference already uses
+    every core the runtime is given.
+    """
+
+    def __init__(self, model_name=LOCAL_WHISPER_MODEL, compute_type=LOCAL_WHISPER_COMPUTE_TYPE,
+                 cpu_threads=LOCAL_WHISPER_THREADS):
+        self.model_name = model_name
+        self.compute_type = compute_type
+        self.cpu_threads = cpu_threads
+        self.model = None
+        self.lock = threading.Lock()
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='local-whisper')
+
+    def load(self):
+        with self.lock:
+            if self.model is None:
+                # Optional dependency, only needed when a hotkey uses it
+                from faster_whisper import WhisperModel
+                start = time.perf_counter()
+                model = WhisperModel(self.model_name, device='cpu', compute_type=self.compute_type,
+                                     cpu_threads=self.cpu_threads)
+                self._run(model, np.zeros(SAMPLE_RATE, dtype=np.float32))
+                self.model = model
+                logging.info(f"Loaded local Whisper model '{self.model_name}' in {time.perf_counter() - start:.1f}s.")
+        return self.model
+
+    @staticmethod
+    def _run(model, samples):
+        segments, _ = model.transcribe(samples, beam_size=1, condition_on_previous_text=False)
+        return ' '.join(segment.text.strip() for segment in segments).strip()
+
+    def transcribe(self, samples, sample_rate=SAMPLE_RATE):
+        if sample_rate != SAMPLE_RATE:
+            raise ValueError(f"Local transcription expects {SAMPLE_RATE} Hz audio, got {sample_rate} Hz")
+        samples = np.asarray(samples).reshape(-1)
+        if samples.dtype == np.int16:
+            samples = samples.astype(np.float32) / 32768.0
+        model = self.load()
+        start = time.perf_counter()
+        text = self._run(model, samples.astype(np.float32, copy=False))
+        logging.info(f"Local transcription of {len(samples) / sample_rate:.2f}s took {(time.perf_counter() - start) * 1000:.0f} ms.")
+        return text
+
+local_whisper = LocalWhisper()
@@ -0,0 +1,180 @@
+import os
+import logging
+import threading
+from collections import deque
+import numpy as np
+from config.settings import OUTPUT_BLOCK_SIZE
+from utils.device_registry import device_registry
+
+# The rate for streams from a stream_factory when start() is not given one
+DEFAULT_SAMPLE_RATE = 48000
+
+class _Voice:
+    def __init__(self, samples, on_start=None):
+        self.samples = samples
+        self.on_start = on_start
+        self.position = 0
+        self.done = threading.Event()
+
+def pcm_to_float(pcm, sample_width=2):
+    if sample_width != 2:
+        raise ValueError(f"Unsupported sample width: {sample_width}")
+    return np.frombuffer(pcm, dtype=np.int16).astype(np.float32) / 32768.0
+
+def resample(samples, source_rate, target_rate):
+    if source_rate == target_rate or not len(samples):
+        return samples
+    duration = len(samples) / source_rate
+    positions = np.arange(int(duration * target_rate)) * (source_rate / target_rate)
+    return np.interp(positions, np.arange(len(samples)), samples).astype(np.float32)
+
+class OutputEngine:
+    """One long-lived output stream on the selected device.
+
+    Speech is played in order from a queue, cues are mixed on top of it, and
+    both go through the same stream, so nothing opens a device per sound. Cue
+    files are decoded to PCM once by load_cue(); play_cue() only queues the
+    decoded samples, so a cue starts within one output block.
+
+    device is a key or name from the device registry. It is resolved to
+    PortAudio's current index under the registry's lock each time the stream
+    opens, so reopening it never uses an index from before a hot-plug.
+    """
+
+    def __init__(self, blocksize=OUTPUT_BLOCK_SIZE, stream_factory=None):
+        self.blocksize = blocksize
+        self.stream_factory = stream_factory
+        self.device = None
+        self.sample_rate = None
+        self.stream = None
+        self.lock = threading.Lock()
+        self.speech = deque()
+        self.cues = []
+        self.decoded_cues = {}
+
+    @property
+    def running(self):
+        return self.stream is not None
+
+    def start(self, device=None, sample_rate=None):
+        # All under the registry's lock, so a start from the playback thread
+        # never races a device refresh that closes and reopens the stream
+        with device_registry.lock:
+            if self.running and device == self.device:
+                return True
+            self.stop()
+            self.device = device
+            try:
+                index = device_registry.index(device, 'output')
+                if self.stream_factory is None:
+                    # PortAudio is loaded when the first stream opens, not on import
+                    import sounddevice as sd
+                    stream_factory = sd.OutputStream
+                    sample_rate = sample_rate or int(sd.query_devices(index, 'output')['default_samplerate'])
+                else:
+                    # A stand-in stream has no device to ask for its rate
+                    stream_factory = self.stream_factory
+                    sample_rate = sample_rate or self.sample_rate or DEFAULT_SAMPLE_RATE
+                stream = stream_factory(
+                    device=index,
+                    samplerate=sample_rate,
+                    channels=1,
+                    dtype='float32',
+                    blocksize=self.blocksize,
+                    latency='low',
+                    callback=self._callback,
+                )
+                stream.start()
+            except Exception as e:
+                logging.error(f"Error starting output stream: {e}")
+                return False
+            if sample_rate != self.sample_rate:
+                # Cues were decoded for another rate
+                self.decoded_cues = {}
+            self.sample_rate, self.stream = sample_rate, stream
+        logging.info(f"Output engine started on {device or 'the default device'} (index {index}) at {sample_rate} Hz.")
+        return True
+
+    def ensure_started(self):
+        return self.running or self.start(self.device)
+
+    def stop(self):
+        stream, self.stream = self.stream, None
+        if stream is not None:
+            stream.stop()
+            stream.close()
+            logging.info("Output engine stopped.")
+        self.clear_speech()
+        with self.lock:
+            self.cues = []
+
+    def is_quiet(self):
+        # Nothing queued to play
+        with self.lock:
+            return not self.speech and not self.cues
+
+    def load_cue(self, path):
+        from pydub import AudioSegment
+        segment = AudioSegment.from_file(path).set_channels(1).set_sample_width(2).set_frame_rate(self.sample_rate)
+        self.decoded_cues[os.path.normpath(path)] = pcm_to_float(segment.raw_data)
+        logging.info(f"Decoded cue {path} ({len(segment)} ms).")
+
+    def play_cue(self, path):
+        samples = self.decoded_cues.get(os.path.normpath(path))
+        if samples is None or not self.running:
+            return False
+        with self.lock:
+            self.cues.append(_Voice(samples))
+        return True
+
+    def play_speech(self, samples, sample_rate, on_start=None):
+        # Returns an event that is set once the samples have been played or cleared.
+        # on_start runs on the audio thread when the first frame is output, so it must be quick.
+        voice = _Voice(resample(samples, sample_rate, self.sample_rate), on_start)
+        with self.lock:
+            self.speech.append(voice)
+        return voice.done
+
+    def clear_speech(self):
+        with self.lock:
+            voices, self.speech = self.speech, deque()
+        for voice in voices:
+            voice.done.set()
+
+    def _callback(self, outdata, frames, time, status):
+        if status:
+            logging.warning(f"Output callback status: {status}")
+        out = np.zeros(frames, dtype=np.float32)
+        finished = []
+        started = []
+        with self.lock:
+            filled = 0
+            while filled < frames and self.speech:
+                voice = self.speech[0]
+                if voice.position == 0 and voice.on_start is not None:
+                    started.append(voice.on_start)
+                count = min(frames - filled, len(voice.samples) - voice.position)
+                out[filled:filled + count] += voice.samples[voice.position:voice.position + count]
+                voice.position += count
+                filled += count
+                if voice.position >= len(voice.samples):
+                    finished.append(self.speech.popleft())
+            remaining = []
+            for cue in self.cues:
+                count = min(frames, len(cue.samples) - cue.position)
+                out[:count] += cue.samples[cue.position:cue.position + count]
+                cue.position += count
+                if cue.position < len(cue.samples):
+                    remaining.append(cue)
+            self.cues = remaining
+        np.clip(out, -1.0, 1.0, out=out)
+        outdata[:, 0] = out
+        for on_start in started:
+            on_start()
+        for voice in finished:
+            voice.done.set()
+
+output_engine = OutputEngine()
+
+def get_output_engine():
+    return output_engine
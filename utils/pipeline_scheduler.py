@@ -0,0 +1,154 @@
+import logging
+import threading
+from collections import deque
+from concurrent.futures import CancelledError
+from config.settings import PIPELINE_WORKERS, PIPELINE_MAX_QUEUED
+from utils import async_runtime
+
+class JobCancelled(Exception):
+    pass
+
+class Job:
+    """One utterance on its way through transcription, completion and speech.
+
+    Blocking work goes through run() (coroutines on the async runtime) or
+    registers an on_cancel() hook, so cancel() interrupts the stage that is in
+    progress instead of waiting for it to finish.
+    """
+
+    def __init__(self, job_id, hotkey_id, target, args):
+        self.id = job_id
+        self.hotkey_id = hotkey_id
+        self.target = target
+        self.args = args
+        self.cancelled = threading.Event()
+        self.lock = threading.Lock()
+        self.cancel_hooks = []
+
+    def cancel(self):
+        with self.lock:
+            if self.cancelled.is_set():
+                return False
+            self.cancelled.set()
+            hooks, self.cancel_hooks = self.cancel_hooks, []
+        for hook in hooks:
+            try:
+                hook()
+            except Exception as e:
+                logging.warning(f"Cancel hook for job {self.id} failed: {e}")
+        return True
+
+    def on_cancel(self, hook):
+        with self.lock:
+            if not self.cancelled.is_set():
+                self.cancel_hooks.append(hook)
+                return
+        hook()
+
+    def remove_cancel_hook(self, hook):
+        with self.lock:
+            if hook in self.cancel_hooks:
+                self.cancel_hooks.remove(hook)
+
+    def check(self):
+        if self.cancelled.is_set():
+            raise JobCancelled(f"Job {self.id} was cancelled")
+
+    def run(self, coro):
+        if self.cancelled.is_set():
+            coro.close()
+            self.check()
+        future = async_runtime.submit(coro)
+        self.on_cancel(future.cancel)
+        try:
+            return future.result()
+        except CancelledError:
+            raise JobCancelled(f"Job {self.id} was cancelled")
+        finally:
+            self.remove_cancel_hook(future.cancel)
+
+    def __repr__(self):
+        return f"Job({self.id}, {self.hotkey_id})"
+
+class PipelineScheduler:
+    """Runs utterance jobs on a fixed number of worker threads.
+
+    At most max_queued jobs wait for a worker; when the queue is full the
+    oldest waiting job is dropped, since a fresher utterance is more useful
+    than a stale one. stats() reports queue depth and the job counters.
+    """
+
+    def __init__(self, max_workers=PIPELINE_WORKERS, max_queued=PIPELINE_MAX_QUEUED):
+        self.max_queued = max_queued
+        self.condition = threading.Condition()
+        self.queue = deque()
+        self.running = set()
+        self.next_id = 0
+        self.max_depth = 0
+        self.counters = {'submitted': 0, 'completed': 0, 'cancelled': 0, 'dropped': 0}
+        for i in range(max_workers):
+            threading.Thread(target=self._worker, name=f'pipeline-worker-{i}', daemon=True).start()
+
+    def submit(self, hotkey_id, target, *args):
+        with self.condition:
+            self.next_id += 1
+            job = Job(self.next_id, hotkey_id, target, args)
+            if len(self.queue) >= self.max_queued:
+                dropped = self.queue.popleft()
+                dropped.cancel()
+                self.counters['dropped'] += 1
+                logging.warning(f"Pipeline queue full; dropped {dropped}.")
+            self.queue.append(job)
+            self.counters['submitted'] += 1
+            self.max_depth = max(self.max_depth, len(self.queue))
+            self.condition.notify()
+        logging.info(f"Queued {job} (queue depth {len(self.queue)}, running {len(self.running)}).")
+        return job
+
+    def cancel_all(self):
+        # Cancels every queued and running job; returns how many were cancelled
+        return self._cancel(lambda job: True)
+
+    def cancel(self, hotkey_id):
+        # Cancels the queued and running jobs of one hotkey, leaving the others alone
+        return self._cancel(lambda job: job.hotkey_id == hotkey_id)
+
+    def _cancel(self, matches):
+        with self.condition:
+            jobs = [job for job in list(self.queue) + list(self.running) if matches(job)]
+            self.queue = deque(job for job in self.queue if not matches(job))
+        cancelled = [job for job in jobs if job.cancel()]
+        with self.condition:
+            self.counters['cancelled'] += len(cancelled)
+        for job in cancelled:
+            logging.info(f"Cancelled {job}.")
+        return len(cancelled)
+
+    def _worker(self):
+        while True:
+            with self.condition:
+                while not self.queue:
+                    self.condition.wait()
+                job = self.queue.popleft()
+                self.running.add(job)
+            try:
+                job.target(*job.args, job=job)
+                with self.condition:
+                    if not job.cancelled.is_set():
+                        self.counters['completed'] += 1
+            except JobCancelled:
+                logging.info(f"{job} stopped after cancellation.")
+            except Exception as e:
+                logging.error(f"Unhandled error in {job}: {e}")
+            finally:
+                with self.condition:
+                    self.running.discard(job)
+
+    def stats(self):
+        with self.condition:
+            return {
+                'queue_depth': len(self.queue),
+                'max_queue_depth': self.max_depth,
+                'running': len(self.running),
+                **self.counters,
+            }
@@ -0,0 +1,121 @@
+import os
+import mmap
+import struct
+import logging
+import tempfile
+import weakref
+import threading
+import numpy as np
+from config.settings import SPOOL_DIR, SPOOL_CHUNK_SECONDS
+from utils.audio_clip import AudioClip
+
+WAV_HEADER_BYTES = 44
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except OSError as e:
+        logging.warning(f"Could not remove recording spool {path}: {e}")
+
+class RecordingSpool:
+    """Capture for long recordings, written as int16 to a memory-mapped WAV file.
+
+    write() is called from the audio callback with each float32 block and
+    converts only that block, so RAM use does not grow with the recording;
+    the frames live in the file's pages, which the OS can write back and
+    drop. The file grows SPOOL_CHUNK_SECONDS at a time, on a helper thread
+    while the last half chunk is being filled, so the callback never waits
+    for the file to be extended and mapped again. finish() returns an
+    AudioClip whose samples are a read-only memory map of the file, so
+    trimming and encoding work on it without concatenating anything. The
+    file is removed once the last view of those samples is gone.
+    """
+
+    def __init__(self, sample_rate=16000, directory=SPOOL_DIR, chunk_seconds=SPOOL_CHUNK_SECONDS):
+        self.sample_rate = sample_rate
+        self.chunk_frames = int(sample_rate * chunk_seconds)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.file = tempfile.NamedTemporaryFile(prefix='recording_', suffix='.wav', dir=directory or None, delete=False)
+        self.path = self.file.name
+        self.frames = 0
+        self.capacity = 0
+        self.map = None
+        self.lock = threading.Lock()
+        self.grower = None
+        self._grow()
+
+    def _grow(self):
+        # Both maps view the same file, so frames written to the old one
+        # while the new one is set up are kept
+        capacity = self.capacity + self.chunk_frames
+        size = WAV_HEADER_BYTES + capacity * 2
+        self.file.truncate(size)
+        new_map = mmap.mmap(self.file.fileno(), size)
+        with self.lock:
+            old_map, self.map, self.capacity = self.map, new_map, capacity
+        if old_map is not None:
+            old_map.close()
+
+    def _grow_ahead(self):
+        try:
+            self._grow()
+        except Exception as e:
+            logging.error(f"Error extending recording spool {self.path}: {e}")
+        finally:
+            self.grower = None
+
+    def _wait_for_grower(self):
+        grower = self.grower
+        if grower is not None:
+            grower.join()
+
+    def write(self, block):
+        samples = (np.asarray(block).reshape(-1) * 32767).astype(np.int16)
+        end = self.frames + len(samples)
+        if end > self.capacity:
+            # Only when a block outruns the helper thread
+            self._wait_for_grower()
+            while end > self.capacity:
+                self._grow()
+        elif self.capacity - end < self.chunk_frames // 2 and self.grower is None:
+            self.grower = threading.Thread(target=self._grow_ahead, name='spool-grow', daemon=True)
+            self.grower.start()
+        offset = WAV_HEADER_BYTES + self.frames * 2
+        with self.lock:
+            self.map[offset:offset + samples.nbytes] = samples.tobytes()
+        self.frames = end
+
+    @property
+    def duration(self):
+        return self.frames / self.sample_rate
+
+    def _close(self):
+        self._wait_for_grower()
+        self.map.close()
+        self.file.truncate(WAV_HEADER_BYTES + self.frames * 2)
+        # A valid header makes the spool a playable WAV file while it exists
+        data_bytes = self.frames * 2
+        self.file.seek(0)
+        self.file.write(struct.pack(
+            '<4sI4s4sIHHIIHH4sI', b'RIFF', 36 + data_bytes, b'WAVE', b'fmt ', 16, 1, 1,
+            self.sample_rate, self.sample_rate * 2, 2, 16, b'data', data_bytes,
+        ))
+        self.file.close()
+
+    def finish(self):
+        self._close()
+        if not self.frames:
+            _remove(self.path)
+            return None
+        samples = np.memmap(self.path, dtype=np.int16, mode='r', offset=WAV_HEADER_BYTES, shape=(self.frames,))
+        weakref.finalize(samples._mmap, _remove, self.path)
+        logging.info(f"Spooled {self.duration:.2f}s of audio to {self.path}.")
+        return AudioClip(samples, self.sample_rate)
+
+    def discard(self):
+        # For a recording that will not be collected; does nothing after finish()
+        if self.file.closed:
+            return
+        self._close()
+        _remove(self.path)
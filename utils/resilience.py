@@ -0,0 +1,171 @@
+import time
+import random
+import asyncio
+import logging
+import threading
+import aiohttp
+from config.settings import (
+    STAGE_TIMEOUTS,
+    RETRY_MAX_ATTEMPTS,
+    RETRY_BASE_DELAY,
+    RETRY_MAX_DELAY,
+    BREAKER_FAILURE_THRESHOLD,
+    BREAKER_RESET_SECONDS,
+)
+
+# Timeouts, retries and circuit breaking for upstream calls. An utterance
+# gets a Deadline; each attempt at a stage is limited to the stage's timeout
+# or whatever is left of the deadline, and a failed attempt is retried after
+# a jittered backoff only if the error is transient and the deadline leaves
+# room. Each endpoint has a CircuitBreaker, so once it is clearly down calls
+# fail at once instead of each waiting out its timeouts.
+
+class DeadlineExceeded(Exception):
+    pass
+
+class CircuitOpen(Exception):
+    pass
+
+class Deadline:
+    """The time left for one utterance's upstream calls."""
+
+    def __init__(self, seconds):
+        self.seconds = seconds
+        self.expires = time.monotonic() + seconds
+
+    def remaining(self):
+        return self.expires - time.monotonic()
+
+    def timeout(self, stage_timeout):
+        remaining = self.remaining()
+        if remaining <= 0:
+            raise DeadlineExceeded(f"Utterance budget of {self.seconds:.1f}s is used up")
+        return min(stage_timeout, remaining)
+
+class CircuitBreaker:
+    """Fails calls to an endpoint fast after repeated transient failures.
+
+    After failure_threshold failures in a row the circuit opens and allow()
+    raises CircuitOpen for reset_seconds. Calls are then let through again;
+    the first success closes the circuit, while a failure opens it again at
+    once.
+    """
+
+    def __init__(self, name, failure_threshold=BREAKER_FAILURE_THRESHOLD, reset_seconds=BREAKER_RESET_SECONDS):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.lock = threading.Lock()
+        self.failures = 0
+        self.opened_at = None
+        self.rejected = 0
+
+    @property
+    def state(self):
+        with self.lock:
+            return self._state()
+
+    def _state(self):
+        if self.opened_at is None:
+            return 'closed'
+        if time.monotonic() - self.opened_at < self.reset_seconds:
+            return 'open'
+        return 'half_open'
+
+    def allow(self):
+        with self.lock:
+            if self._state() == 'open':
+                self.rejected += 1
+                raise CircuitOpen(f"The {self.name} endpoint is failing; not calling it for now")
+
+    def record_success(self):
+        with self.lock:
+            if self.opened_at is not None:
+                logging.info(f"Circuit for {self.name} closed.")
+            self.failures = 0
+            self.opened_at = None
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            reopening = self._state() == 'half_open'
+            if reopening or (self.opened_at is None and self.failures >= self.failure_threshold):
+                self.opened_at = time.monotonic()
+                logging.warning(f"Circuit for {self.name} opened after {self.failures} failure(s).")
+
+    def stats(self):
+        with self.lock:
+            return {'state': self._state(), 'failures': self.failures, 'rejected': self.rejected}
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+def get_breaker(name):
+    with _breakers_lock:
+        if name not in _breakers:
+            _breakers[name] = CircuitBreaker(name)
+        return _breakers[name]
+
+def get_breaker_stats():
+    with _breakers_lock:
+        return {name: breaker.stats() for name, breaker in _breakers.items()}
+
+def is_transient(error):
+    # Timeouts, dropped connections, rate limiting and server errors are worth
+    # retrying; anything else would fail the same way again
+    if isinstance(error, (asyncio.TimeoutError, TimeoutError, aiohttp.ClientConnectionError)):
+        return True
+    status = getattr(error, 'status', None)
+    if status is None and isinstance(getattr(error, 'code', None), int):
+        status = error.code  # google.api_core errors carry the HTTP equivalent
+    return isinstance(status, int) and (status in (408, 429) or status >= 500)
+
+def backoff_delay(attempt):
+    # Exponential backoff with "equal jitter": half fixed, half random
+    cap = min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** (attempt - 1))
+    return cap / 2 + random.uniform(0, cap / 2)
+
+def _describe(error):
+    return str(error) or type(error).__name__
+
+def _retry_delay(error, stage, breaker, deadline, attempt, attempts):
+    # Returns how long to wait before the next attempt, or re-raises error
+    if not is_transient(error):
+        raise error
+    breaker.record_failure()
+    delay = backoff_delay(attempt)
+    if attempt >= attempts or (deadline is not None and deadline.remaining() <= delay):
+        logging.error(f"{stage} failed after {attempt} attempt(s): {_describe(error)}")
+        raise error
+    logging.warning(f"{stage} attempt {attempt} failed ({_describe(error)}); retrying in {delay * 1000:.0f} ms.")
+    return delay
+
+async def call_with_retry(call, stage, breaker, deadline=None, timeout=None, attempts=None):
+    # call() returns a new coroutine for every attempt
+    timeout = timeout or STAGE_TIMEOUTS[stage]
+    attempts = attempts or RETRY_MAX_ATTEMPTS
+    for attempt in range(1, attempts + 1):
+        breaker.allow()
+        attempt_timeout = deadline.timeout(timeout) if deadline is not None else timeout
+        try:
+            result = await asyncio.wait_for(call(), attempt_timeout)
+        except Exception as e:
+            await asyncio.sleep(_retry_delay(e, stage, breaker, deadline, attempt, attempts))
+            continue
+        breaker.record_success()
+        return result
+
+def call_with_retry_sync(call, stage, breaker, deadline=None, timeout=None, attempts=None):
+    # Blocking version; call(timeout) must itself give up after timeout seconds
+    timeout = timeout or STAGE_TIMEOUTS[stage]
+    attempts = attempts or RETRY_MAX_ATTEMPTS
+    for attempt in range(1, attempts + 1):
+        breaker.allow()
+        attempt_timeout = deadline.timeout(timeout) if deadline is not None else timeout
+        try:
+            result = call(attempt_timeout)
+        except Exception as e:
+            time.sleep(_retry_delay(e, stage, breaker, deadline, attempt, attempts))
+            continue
+        breaker.record_success()
+        return result
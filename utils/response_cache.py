@@ -0,0 +1,124 @@
+import os
+import re
+import json
+import time
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from config.settings import RESPONSE_CACHE_MAX_ENTRIES, RESPONSE_CACHE_TTL_SECONDS, RESPONSE_CACHE_FILE
+
+def normalize_prompt(text):
+    # "What's the time?" and "whats the time" are the same spoken command
+    text = re.sub(r"[^\w\s]", '', text.casefold())
+    return ' '.join(text.split())
+
+class ResponseCache:
+    """Chat responses keyed by model, system prompt and normalized question.
+
+    Entries are (response, stored_at) in an LRU of at most max_entries and
+    expire ttl_seconds after they were stored. With a path the cache is
+    loaded from that JSON file at start and rewritten after each change, so
+    answers survive restarts.
+    """
+
+    def __init__(self, max_entries=RESPONSE_CACHE_MAX_ENTRIES, ttl_seconds=RESPONSE_CACHE_TTL_SECONDS,
+                 path=RESPONSE_CACHE_FILE):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.path = path
+        self.lock = threading.Lock()
+        self.save_lock = threading.Lock()
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evictions = 0
+        if path:
+            self._load()
+
+    @staticmethod
+    def make_key(model, system_prompt, prompt):
+        material = json.dumps({'model': model, 'system': system_prompt, 'prompt': normalize_prompt(prompt)})
+        return hashlib.sha256(material.encode('utf-8')).hexdigest()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if time.time() - entry[1] > self.ttl_seconds:
+                del self.entries[key]
+                self.expired += 1
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, response):
+        with self.lock:
+            self.entries.pop(key, None)
+            self.entries[key] = (response, time.time())
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+        if self.path:
+            self._save()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                stored = json.load(f)
+            if not isinstance(stored, list):
+                raise ValueError(f"expected a list of entries, not {type(stored).__name__}")
+        except Exception as e:
+            logging.warning(f"Ignoring unreadable response cache {self.path}: {e}")
+            return
+        now = time.time()
+        skipped = 0
+        for row in stored[-self.max_entries:]:
+            try:
+                key, (response, stored_at) = row
+                if not isinstance(key, str) or not isinstance(response, str):
+                    raise TypeError("key and response must be strings")
+                stored_at = float(stored_at)
+            except (TypeError, ValueError):
+                skipped += 1
+                continue
+            if now - stored_at <= self.ttl_seconds:
+                self.entries[key] = (response, stored_at)
+        if skipped:
+            logging.warning(f"Skipped {skipped} malformed entr{'y' if skipped == 1 else 'ies'} in response cache {self.path}.")
+        logging.info(f"Loaded {len(self.entries)} cached response(s) from {self.path}.")
+
+    def _save(self):
+        # Written to a temporary file first, so a crash never leaves half a cache.
+        # Saves take turns, and each takes its snapshot in turn, so two workers
+        # never write the same file and the last save holds the newest entries.
+        temp_path = f'{self.path}.tmp'
+        with self.save_lock:
+            with self.lock:
+                snapshot = list(self.entries.items())
+            try:
+                os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+                with open(temp_path, 'w', encoding='utf-8') as f:
+                    json.dump([[key, list(entry)] for key, entry in snapshot], f)
+                os.replace(temp_path, self.path)
+            except Exception as e:
+                logging.warning(f"Could not write response cache {self.path}: {e}")
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'entries': len(self.entries),
+                'expired': self.expired,
+                'evictions': self.evictions,
+            }
@@ -0,0 +1,114 @@
+import re
+from config.settings import RESPONSE_FILTER_RULES
+
+# Punctuation and spacing that go with a removed phrase, as in "Hi! " or "Hello, "
+TRAILING = r'[,!.]?\s*'
+
+def _normalize(text):
+    return ' '.join(text.casefold().split())
+
+class ResponseFilter:
+    """Replaces whole-word phrases in model output, in one regex pass.
+
+    rules maps phrases to replacements; an empty replacement removes the
+    phrase together with the punctuation and spacing right after it. Matching
+    ignores case and needs a word boundary on both sides, so 'hi' never
+    matches inside 'this'. stream() returns a StreamFilter that gives the same
+    result for text arriving in pieces.
+    """
+
+    def __init__(self, rules=RESPONSE_FILTER_RULES):
+        self.rules = {_normalize(phrase): replacement for phrase, replacement in rules.items() if phrase.strip()}
+        # Longest first, so 'have a great day' wins over any shorter phrase it contains
+        phrases = sorted(self.rules, key=len, reverse=True)
+        alternation = '|'.join(r'\s+'.join(re.escape(word) for word in phrase.split()) for phrase in phrases)
+        self.pattern = re.compile(rf'(?<!\w)({alternation})(?!\w)({TRAILING})', re.IGNORECASE) if phrases else None
+        # Every text a match could start with, for deciding what a stream must hold back
+        self.prefixes = {phrase[:length] for phrase in phrases for length in range(1, len(phrase) + 1)}
+        self.max_length = max((len(phrase) for phrase in phrases), default=0)
+
+    def _replace(self, match):
+        replacement = self.rules[_normalize(match.group(1))]
+        return replacement + match.group(2) if replacement else ''
+
+    def apply(self, text):
+        return self.pattern.sub(self._replace, text) if self.pattern else text
+
+    def stream(self):
+        return StreamFilter(self)
+
+class StreamFilter:
+    """Filters a token stream incrementally.
+
+    feed() returns the text that can no longer be part of a match and keeps
+    the rest: a match that reaches the end of what has arrived so far (the
+    next character could still break its word boundary or add punctuation),
+    or a tail that is the start of some phrase. Anything else passes through
+    at once. flush() releases what is left at the end of the stream.
+    """
+
+    def __init__(self, response_filter):
+        self.filter = response_filter
+        self.buffer = ''
+        # The character before the buffer, which the word-boundary check needs
+        self.context = ''
+
+    def feed(self, text):
+        self.buffer += text
+        pattern = self.filter.pattern
+        if pattern is None:
+            emitted, self.buffer = self.buffer, ''
+            return emitted
+        data = self.context + self.buffer
+        pieces = []
+        last = len(self.context)
+        hold = None
+        for match in pattern.finditer(data, last):
+            # Unsettled if more text could still break the match or make a longer one
+            if match.end() == len(data) or self._is_partial(data, match.start()):
+                hold = match.start()
+                break
+            pieces.append(data[last:match.start()])
+            pieces.append(self.filter._replace(match))
+            last = match.end()
+        if hold is None:
+            hold = self._partial_start(data, last)
+        pieces.append(data[last:hold])
+        if hold > 0:
+            self.context = data[hold - 1]
+        self.buffer = data[hold:]
+        return ''.join(pieces)
+
+    def _is_partial(self, data, index):
+        # Whether data[index:] is the start of a phrase (or a whole one)
+        if len(data) - index > self.filter.max_length:
+            return False
+        tail = data[index:].casefold()
+        tail = ' '.join(tail.split()) + (' ' if tail[-1:].isspace() else '')
+        return tail in self.filter.prefixes
+
+    def _partial_start(self, data, start):
+        # Earliest position from which the rest of data could still grow into a match
+        for index in range(max(start, len(data) - self.filter.max_length), len(data)):
+            if index > 0 and (data[index - 1].isalnum() or data[index - 1] == '_'):
+                continue
+            if self._is_partial(data, index):
+                return index
+        return len(data)
+
+    def flush(self):
+        data = self.context + self.buffer
+        start = len(self.context)
+        self.buffer = ''
+        self.context = ''
+        if self.filter.pattern is None:
+            return data[start:]
+        pieces = []
+        for match in self.filter.pattern.finditer(data, start):
+            pieces.append(data[start:match.start()])
+            pieces.append(self.filter._replace(match))
+            start = match.end()
+        pieces.append(data[start:])
+        return ''.join(pieces)
+
+response_filter = ResponseFilter()
@@ -0,0 +1,36 @@
+import re
+
+class SentenceSplitter:
+    # A sentence ends at ., ! or ? (plus any closing quotes or brackets) once
+    # whitespace follows, so "3.5" and a trailing "Dr." wait for more text
+    BOUNDARY = re.compile(r'[.!?]+["\')\]]*\s+')
+    ABBREVIATIONS = {'mr.', 'mrs.', 'ms.', 'dr.', 'st.', 'vs.', 'e.g.', 'i.e.', 'etc.', 'jr.', 'sr.'}
+
+    def __init__(self):
+        self.buffer = ''
+
+    def feed(self, text):
+        self.buffer += text
+        sentences = []
+        start = 0
+        for match in self.BOUNDARY.finditer(self.buffer):
+            candidate = self.buffer[start:match.end()].strip()
+            last_word = candidate.rsplit(None, 1)[-1].lower() if candidate else ''
+            if last_word in self.ABBREVIATIONS:
+                continue
+            sentences.append(candidate)
+            start = match.end()
+        self.buffer = self.buffer[start:]
+        return sentences
+
+    def flush(self):
+        remainder, self.buffer = self.buffer.strip(), ''
+        return remainder
+
+def split_sentences(text):
+    splitter = SentenceSplitter()
+    sentences = splitter.feed(text)
+    remainder = splitter.flush()
+    if remainder:
+        sentences.append(remainder)
+    return sentences
@@ -0,0 +1,318 @@
+import io
+import json
+import os
+import re
+import time
+import wave
+import random
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from email.parser import BytesParser
+from email.policy import default as default_policy
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Local stand-ins for the upstream services, used to exercise the pipeline
+# without network access. Point OPENAI_API_BASE at server.base_url and
+# TTS_STAND_IN_ENDPOINT at tts_server.endpoint to use them. Every server takes
+# a latency per request, a failure_rate (fraction of requests answered with an
+# error) and max_concurrency (requests served at once; the rest wait).
+
+def parse_multipart(content_type, body):
+    message = BytesParser(policy=default_policy).parsebytes(
+        f'Content-Type: {content_type}\r\n\r\n'.encode() + body
+    )
+    fields, files = {}, {}
+    for part in message.iter_parts():
+        name = part.get_param('name', header='content-disposition')
+        filename = part.get_filename()
+        payload = part.get_payload(decode=True)
+        if filename is not None:
+            files[name] = (filename, payload)
+        else:
+            fields[name] = payload.decode()
+    return fields, files
+
+class StandInServer:
+    def __init__(self, latency=0.0, failure_rate=0.0, bandwidth=0, max_concurrency=0, seed=0,
+                 host='127.0.0.1', port=0):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        # Upload bandwidth in bytes per second; 0 is unlimited
+        self.bandwidth = bandwidth
+        self.slots = threading.BoundedSemaphore(max_concurrency) if max_concurrency else None
+        self.random = random.Random(seed)
+        self.request_log = []
+        self.failures = 0
+        self.lock = threading.Lock()
+        self.server = ThreadingHTTPServer((host, port), self._make_handler())
+        self.server.daemon_threads = True
+        self.thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.server.server_address[:2]
+        return f'http://{host}:{port}/v1'
+
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        logging.info(f"Stand-in server listening on {self.base_url}")
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def routes(self):
+        return {}
+
+    def _make_handler(self):
+        stand_in = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'  # Keep-alive, like the real endpoints
+
+            def do_HEAD(self):
+                self.send_response(200)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+
+            def do_POST(self):
+                length = int(self.headers.get('Content-Length', 0))
+                body = self.rfile.read(length)
+                with stand_in.lock:
+                    stand_in.request_log.append((self.path, time.time(), len(body)))
+                route = stand_in.routes().get(self.path)
+                if route is None:
+                    self.send_error(404)
+                    return
+                if stand_in.slots:
+                    stand_in.slots.acquire()
+                try:
+                    if stand_in.bandwidth:
+                        time.sleep(length / stand_in.bandwidth)
+                    if stand_in.latency:
+                        time.sleep(stand_in.latency)
+                    if stand_in.should_fail():
+                        stand_in.send_json(self, {'error': {'message': 'Stand-in failure'}}, status=503)
+                        return
+                    route(self, body)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass  # The client gave up: a timeout or a cancelled hedge
+                finally:
+                    if stand_in.slots:
+                        stand_in.slots.release()
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def should_fail(self):
+        with self.lock:
+            failed = self.random.random() < self.failure_rate
+            self.failures += failed
+            return failed
+
+    @staticmethod
+    def send_json(handler, payload, status=200):
+        data = json.dumps(payload).encode()
+        handler.send_response(status)
+        handler.send_header('Content-Type', 'application/json')
+        handler.send_header('Content-Length', str(len(data)))
+        handler.end_headers()
+        handler.wfile.write(data)
+
+DEFAULT_REPLY = (
+    "This reply comes from the local stand-in server. "
+    "It arrives one token at a time, like a streamed completion. "
+    "Each sentence can be spoken as soon as it is complete."
+)
+
+class StandInOpenAIServer(StandInServer):
+    def __init__(self, transcribe=None, reply=DEFAULT_REPLY, token_interval=0.0, **kwargs):
+        super().__init__(**kwargs)
+        # By default the "transcription" is the uploaded file name without its
+        # extension, which makes segment ordering easy to check
+        self.transcribe = transcribe or (lambda filename, audio: os.path.splitext(filename)[0])
+        # reply is a string or a callable taking the parsed request body
+        self.reply = reply
+        self.token_interval = token_interval
+
+    def routes(self):
+        return {
+            '/v1/audio/transcriptions': self.handle_transcription,
+            '/v1/chat/completions': self.handle_chat,
+        }
+
+    def handle_chat(self, handler, body):
+        request = json.loads(body)
+        reply = self.reply(request) if callable(self.reply) else self.reply
+        tokens = re.findall(r'\s*\S+', reply)
+        if not request.get('stream'):
+            # A buffered reply still takes as long to generate as a streamed one
+            time.sleep(max(0, len(tokens) - 1) * self.token_interval)
+            self.send_json(handler, {
+                'object': 'chat.completion',
+                'model': request.get('model'),
+                'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': reply}, 'finish_reason': 'stop'}],
+            })
+            return
+        handler.send_response(200)
+        handler.send_header('Content-Type', 'text/event-stream')
+        handler.send_header('Connection', 'close')
+        handler.end_headers()
+        handler.close_connection = True
+        for index, token in enumerate(tokens):
+            if index and self.token_interval:
+                time.sleep(self.token_interval)
+            chunk = {
+                'object': 'chat.completion.chunk',
+                'model': request.get('model'),
+                'choices': [{'index': 0, 'delta': {'content': token}, 'finish_reason': None}],
+            }
+            handler.wfile.write(f'data: {json.dumps(chunk)}\n\n'.encode())
+            handler.wfile.flush()
+        handler.wfile.write(b'data: [DONE]\n\n')
+        handler.wfile.flush()
+
+    def handle_transcription(self, handler, body):
+        fields, files = parse_multipart(handler.headers['Content-Type'], body)
+        if 'file' not in files:
+            self.send_json(handler, {'error': {'message': 'No file uploaded'}}, status=400)
+            return
+        filename, audio = files['file']
+        self.send_json(handler, {'text': self.transcribe(filename, audio)})
+
+class StandInTTSServer:
+    """Plaintext gRPC stand-in for Google Text-to-Speech.
+
+    SynthesizeSpeech answers with speech-like LINEAR16 audio at the requested
+    sample rate, seconds_per_char long. Synthesis takes latency plus
+    char_interval per character, like the real service.
+    """
+
+    SERVICE = 'google.cloud.texttospeech.v1.TextToSpeech'
+
+    def __init__(self, latency=0.0, char_interval=0.0, seconds_per_char=0.06, failure_rate=0.0,
+                 max_concurrency=0, seed=0, host='127.0.0.1', port=0):
+        import grpc
+        from google.cloud import texttospeech
+        self.latency = latency
+        self.char_interval = char_interval
+        self.seconds_per_char = seconds_per_char
+        self.failure_rate = failure_rate
+        self.random = random.Random(seed)
+        self.request_log = []
+        self.failures = 0
+        self.lock = threading.Lock()
+        self.server = grpc.server(ThreadPoolExecutor(max_workers=max_concurrency or 10))
+        handlers = {
+            'SynthesizeSpeech': grpc.unary_unary_rpc_method_handler(
+                self.synthesize_speech,
+                request_deserializer=texttospeech.SynthesizeSpeechRequest.deserialize,
+                response_serializer=texttospeech.SynthesizeSpeechResponse.serialize,
+            ),
+            'ListVoices': grpc.unary_unary_rpc_method_handler(
+                self.list_voices,
+                request_deserializer=texttospeech.ListVoicesRequest.deserialize,
+                response_serializer=texttospeech.ListVoicesResponse.serialize,
+            ),
+        }
+        self.server.add_generic_rpc_handlers((grpc.method_handlers_generic_handler(self.SERVICE, handlers),))
+        self.port = self.server.add_insecure_port(f'{host}:{port}')
+        self.host = host
+
+    @property
+    def endpoint(self):
+        return f'{self.host}:{self.port}'
+
+    def start(self):
+        self.server.start()
+        logging.info(f"Stand-in TTS server listening on {self.endpoint}")
+        return self
+
+    def stop(self):
+        self.server.stop(grace=None)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def _begin(self, context, name, size):
+        import grpc
+        with self.lock:
+            self.request_log.append((name, time.time(), size))
+            failed = self.random.random() < self.failure_rate
+            self.failures += failed
+        if self.latency:
+            time.sleep(self.latency)
+        if failed:
+            context.abort(grpc.StatusCode.UNAVAILABLE, 'Stand-in failure')
+
+    def list_voices(self, request, context):
+        from google.cloud import texttospeech
+        self._begin(context, 'ListVoices', 0)
+        return texttospeech.ListVoicesResponse()
+
+    def synthesize_speech(self, request, context):
+        from google.cloud import texttospeech
+        from utils.synthetic_audio import speech_like, to_int16
+        text = request.input.text
+        self._begin(context, 'SynthesizeSpeech', len(text))
+        if self.char_interval:
+            time.sleep(self.char_interval * len(text))
+        sample_rate = request.audio_config.sample_rate_hertz or 24000
+        samples = to_int16(speech_like(max(0.1, len(text) * self.seconds_per_char), sample_rate=sample_rate))
+        buffer = io.BytesIO()
+        with wave.open(buffer, 'wb') as wf:
+            wf.setnchannels(1)
+            wf.setsampwidth(2)
+            wf.setframerate(sample_rate)
+            wf.writeframes(samples.tobytes())
+        return texttospeech.SynthesizeSpeechResponse(audio_content=buffer.getvalue())
+
+class StandInOutputStream:
+    """Takes the place of sounddevice.OutputStream: pulls blocks from the
+    callback in real time and discards them, so playback timing is realistic
+    without an audio device."""
+
+    def __init__(self, samplerate, blocksize, callback, channels=1, **kwargs):
+        self.samplerate = samplerate
+        self.blocksize = blocksize
+        self.callback = callback
+        self.channels = channels
+        self.active = threading.Event()
+        self.thread = None
+
+    def start(self):
+        self.active.set()
+        self.thread = threading.Thread(target=self._run, name='stand-in-output', daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        import numpy as np
+        block = np.zeros((self.blocksize, self.channels), dtype=np.float32)
+        interval = self.blocksize / self.samplerate
+        next_time = time.perf_counter()
+        while self.active.is_set():
+            self.callback(block, self.blocksize, None, None)
+            next_time += interval
+            time.sleep(max(0.0, next_time - time.perf_counter()))
+
+    def stop(self):
+        self.active.clear()
+        if self.thread is not None:
+            self.thread.join()
+
+    def close(self):
+        pass
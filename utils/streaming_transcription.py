@@ -0,0 +1,91 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from config.settings import (
+    STREAM_SEGMENT_SECONDS,
+    STREAM_MAX_SEGMENT_SECONDS,
+    STREAM_MAX_IN_FLIGHT,
+    VAD_TRIM_SILENCE,
+)
+from utils.audio_clip import AudioClip
+from utils.transcription import transcribe_audio
+from utils.vad import is_silent, trim_silence
+
+SAMPLE_RATE = 16000
+
+class StreamingTranscriber:
+    """Cuts live capture into segments and transcribes them while recording continues.
+
+    feed() is called from the audio callback, so it only appends the block and,
+    when a segment is complete, hands it to a worker. Conversion to an
+    AudioClip, upload and transcription all happen on the worker threads.
+    finish() submits whatever is left and joins the segment transcriptions
+    in capture order.
+    """
+
+    def __init__(self, transcribe=transcribe_audio, segment_seconds=STREAM_SEGMENT_SECONDS,
+                 max_segment_seconds=STREAM_MAX_SEGMENT_SECONDS,
+                 max_in_flight=STREAM_MAX_IN_FLIGHT, sample_rate=SAMPLE_RATE, encoder='wav', backend='remote', trace=None):
+        self.transcribe = transcribe
+        self.encoder = encoder
+        self.backend = backend
+        self.trace = trace
+        self.sample_rate = sample_rate
+        self.segment_frames = int(segment_seconds * sample_rate)
+        self.max_segment_frames = int(max(max_segment_seconds, segment_seconds) * sample_rate)
+        self.executor = ThreadPoolExecutor(max_workers=max_in_flight, thread_name_prefix='stream-transcribe')
+        self.lock = threading.Lock()
+        self.blocks = []
+        self.frames = 0
+        self.futures = []
+        self.closed = False
+
+    def feed(self, block):
+        with self.lock:
+            if self.closed:
+                return
+            self.blocks.append(block)
+            self.frames += len(block)
+            if self.frames >= self.max_segment_frames:
+                self._submit_segment()
+            elif self.frames >= self.segment_frames and is_silent(block, self.sample_rate):
+                self._submit_segment()
+
+    def _submit_segment(self):
+        blocks, self.blocks, self.frames = self.blocks, [], 0
+        index = len(self.futures)
+        self.futures.append(self.executor.submit(self._transcribe_segment, index, blocks))
+        logging.info(f"Streaming segment {index} submitted for transcription.")
+
+    def _transcribe_segment(self, index, blocks):
+        clip = AudioClip.from_float_blocks(blocks, self.sample_rate)
+        if VAD_TRIM_SILENCE:
+            clip = trim_silence(clip)
+            if not len(clip):
+                logging.info(f"Streaming segment {index} has no speech, skipping upload.")
+                return ''
+        text = self.transcribe(clip, name=f'segment_{index}', encoder=self.encoder, backend=self.backend, trace=self.trace)
+        logging.info(f"Streaming segment {index} transcribed: {text}")
+        return text
+
+    def pending_segments(self):
+        return sum(1 for future in self.futures if not future.done())
+
+    def finish(self):
+        with self.lock:
+            self.closed = True
+            if self.frames:
+                self._submit_segment()
+        try:
+            texts = [future.result() for future in self.futures]
+        finally:
+            self.executor.shutdown(wait=False)
+        return ' '.join(text.strip() for text in texts if text and text.strip())
+
+    def cancel(self):
+        with self.lock:
+            self.closed = True
+            self.blocks, self.frames = [], 0
+        for future in self.futures:
+            future.cancel()
+        self.executor.shutdown(wait=False)
@@ -0,0 +1,84 @@
+import numpy as np
+
+# Synthetic signals that stand in for the microphone: used to check the voice
+# activity detector and to drive the pipeline without real recordings.
+SAMPLE_RATE = 16000
+
+def _scale(signal, level_db):
+    rms = np.sqrt(np.mean(np.square(signal))) or 1.0
+    return (signal * (10 ** (level_db / 20) / rms)).astype(np.float32)
+
+def silence(seconds, sample_rate=SAMPLE_RATE):
+    return np.zeros(int(seconds * sample_rate), dtype=np.float32)
+
+def noise(seconds, level_db=-60.0, sample_rate=SAMPLE_RATE, seed=0):
+    rng = np.random.default_rng(seed)
+    return _scale(rng.standard_normal(int(seconds * sample_rate)), level_db)
+
+def tone(seconds, frequency, level_db=-30.0, sample_rate=SAMPLE_RATE):
+    t = np.arange(int(seconds * sample_rate)) / sample_rate
+    return _scale(np.sin(2 * np.pi * frequency * t), level_db)
+
+def fricative(seconds, level_db=-50.0, sample_rate=SAMPLE_RATE, seed=1):
+    # First difference of white noise: hiss with most energy at high frequencies,
+    # like "s" and "f"
+    rng = np.random.default_rng(seed)
+    return _scale(np.diff(rng.standard_normal(int(seconds * sample_rate) + 1)), level_db)
+
+def speech_like(seconds, level_db=-20.0, pitch=140.0, syllable_rate=4.0, sample_rate=SAMPLE_RATE, seed=2):
+    # Harmonic voice with a wandering pitch, a few formant-like peaks and a
+    # syllable-rate amplitude envelope
+    rng = np.random.default_rng(seed)
+    n = int(seconds * sample_rate)
+    t = np.arange(n) / sample_rate
+    f0 = pitch * (1 + 0.05 * np.sin(2 * np.pi * 0.7 * t) + 0.02 * np.sin(2 * np.pi * 5.3 * t))
+    phase = 2 * np.pi * np.cumsum(f0) / sample_rate
+    voice = np.zeros(n)
+    for harmonic in range(1, 25):
+        frequency = harmonic * pitch
+        if frequency >= sample_rate / 2:
+            break
+        weight = sum(np.exp(-((frequency - formant) / 150.0) ** 2) for formant in (700, 1200, 2600)) + 0.05
+        voice += weight / harmonic * np.sin(harmonic * phase + rng.uniform(0, 2 * np.pi))
+    envelope = 0.15 + 0.85 * np.sin(np.pi * syllable_rate * t + rng.uniform(0, np.pi)) ** 2
+    return _scale(voice * envelope, level_db)
+
+def concat(*parts):
+    return np.concatenate(parts).astype(np.float32)
+
+def to_int16(samples):
+    return (np.clip(samples, -1.0, 1.0) * 32767).astype(np.int16)
+
+def utterance(seconds=3.0, lead=0.5, tail=0.5, level_db=-20.0, sample_rate=SAMPLE_RATE, seed=2):
+    # Speech-like audio padded with room noise, as a hotkey recording would be
+    return concat(
+        noise(lead, sample_rate=sample_rate, seed=seed),
+        speech_like(seconds, level_db=level_db, sample_rate=sample_rate, seed=seed),
+        noise(tail, sample_rate=sample_rate, seed=seed + 1),
+    )
+
+def corpus(sample_rate=SAMPLE_RATE):
+    # Labelled signals: 'speech' lists the (start, end) seconds that contain speech
+    signals = [
+        ('digital_silence', [silence(2.0, sample_rate)], []),
+        ('room_noise', [noise(2.0, sample_rate=sample_rate)], []),
+        ('mains_hum', [tone(2.0, 50.0, level_db=-55.0, sample_rate=sample_rate)], []),
+        ('key_click', [noise(1.0, sample_rate=sample_rate), noise(0.02, level_db=-15.0, sample_rate=sample_rate, seed=3),
+                       noise(1.0, sample_rate=sample_rate, seed=4)], []),
+        ('padded_speech', [noise(1.0, sample_rate=sample_rate), speech_like(2.0, sample_rate=sample_rate),
+                           noise(1.5, sample_rate=sample_rate, seed=5)], [(1.0, 3.0)]),
+        ('speech_pause_speech', [speech_like(1.0, sample_rate=sample_rate), noise(1.0, sample_rate=sample_rate),
+                                 speech_like(1.0, sample_rate=sample_rate, seed=6)], [(0.0, 1.0), (2.0, 3.0)]),
+        ('fricative_onset', [noise(0.5, sample_rate=sample_rate), fricative(0.2, sample_rate=sample_rate),
+                             speech_like(1.0, sample_rate=sample_rate), noise(0.5, sample_rate=sample_rate)],
+         [(0.5, 1.7)]),
+        ('quiet_speech', [noise(0.5, sample_rate=sample_rate), speech_like(1.5, level_db=-35.0, sample_rate=sample_rate),
+                          noise(0.5, sample_rate=sample_rate)], [(0.5, 2.0)]),
+        ('long_dead_air', [speech_like(1.0, sample_rate=sample_rate), noise(4.0, sample_rate=sample_rate)],
+         [(0.0, 1.0)]),
+    ]
+    return [
+        {'name': name, 'samples': concat(*parts), 'speech': speech,
+         'duration': sum(len(part) for part in parts) / sample_rate}
+        for name, parts, speech in signals
+    ]
@@ -1,141 +1,264 @@
-from google.cloud import texttospeech
-import os
-import threading
-import logging
-import uuid
-import time
-from pydub import AudioSegment
-from pydub.playback import play
-from playsound import playsound
-from pynput import keyboard
-import wave
-import pyaudio
-import atexit
-
-# Configure logging
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
-
-audio_playing = threading.Event()
-audio_playing_lock = threading.Lock()
-current_playback = None
-current_audio_file = None
-
-# List to store temporary files for later deletion
-temp_files = []
-
-def delete_temp_files():
-    global temp_files
-    for file in temp_files[:]:  # Iterate over a copy of the list
-        try:
-            if os.path.exists(file):
-                os.close(os.open(file, os.O_RDONLY))  # Ensure the file is closed
-                os.remove(file)
-                logging.info(f"Deleted temporary audio file: {file}")
-                temp_files.remove(file)
-        except Exception as e:
-            logging.error(f"Error deleting temporary file '{file}': {e}")
-            # If we can't delete it now, we'll try again later
-    
-    # If there are still files to delete, schedule another attempt
-    if temp_files:
-        threading.Timer(5.0, delete_temp_files).start()
-
-# Register the cleanup function to run at exit
-atexit.register(delete_temp_files)
-
-def text_to_speech(text):
-    global current_playback, current_audio_file
-    audio_filename = os.path.abspath(f"audio/response_{uuid.uuid4()}.wav")
-    os.makedirs(os.path.dirname(audio_filename), exist_ok=True)
-    
-    # Add the filename to the list of temporary files
-    temp_files.append(audio_filename)
-    
-    # Initialize Google Cloud TTS client
-    client = texttospeech.TextToSpeechClient()
-    
-    # Set the text input to be synthesized
-    synthesis_input = texttospeech.SynthesisInput(text=text)
-    
-    # Build the voice request
-    voice = texttospeech.VoiceSelectionParams(
-        language_code="en-US",
-        ssml_gender=texttospeech.SsmlVoiceGender.NEUTRAL
-    )
-    
-    # Select the type of audio file you want returned
-    audio_config = texttospeech.AudioConfig(
-        audio_encoding=texttospeech.AudioEncoding.LINEAR16
-    )
-    
-    # Perform the text-to-speech request
-    response = client.synthesize_speech(
-        input=synthesis_input, voice=voice, audio_config=audio_config
-    )
-    
-    # Save the response to an audio file
-    with open(audio_filename, "wb") as out:
-        out.write(response.audio_content)
-        logging.info(f'Audio content written to file "{audio_filename}"')
-
-    def play_audio():
-        global current_playback, current_audio_file
-        try:
-            logging.info(f"Playing sound: {audio_filename}")
-            audio_playing.set()
-            current_audio_file = audio_filename
-            
-            # Open the wave file
-            with wave.open(audio_filename, 'rb') as wf:
-                # Initialize PyAudio
-                p = pyaudio.PyAudio()
-                
-                # Open a stream
-                stream = p.open(format=p.get_format_from_width(wf.getsampwidth()),
-                                channels=wf.getnchannels(),
-                                rate=wf.getframerate(),
-                                output=True)
-                
-                # Read data in chunks
-                chunk = 1024
-                data = wf.readframes(chunk)
-                
-                # Play the sound
-                while len(data) > 0 and audio_playing.is_set():
-                    stream.write(data)
-                    data = wf.readframes(chunk)
-                
-                # Clean up
-                stream.stop_stream()
-                stream.close()
-                p.terminate()
-            
-        except Exception as e:
-            logging.error(f"Error playing sound: {e}")
-        finally:
-            audio_playing.clear()
-            current_playback = None
-            current_audio_file = None
-            logging.info("Playback finished")
-            # Schedule file deletion
-            threading.Timer(1.0, delete_temp_files).start()
-
-    playback_thread = threading.Thread(target=play_audio)
-    playback_thread.start()
-
-def stop_text_to_speech():
-    global current_playback, current_audio_file
-    with audio_playing_lock:
-        if audio_playing.is_set():
-            logging.info("Stopping text-to-speech playback")
-            audio_playing.clear()
-            current_playback = None
-            logging.info("Playback stopped")
-    # Schedule file deletion
-    threading.Timer(1.0, delete_temp_files).start()
-
-def is_audio_playing():
-    return audio_playing.is_set()
-
-def wait_for_audio_to_finish():
-    audio_playing.wait()
\ No newline at end of file
+import io
+import threading
+import queue
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor, CancelledError, Future
+import wave
+from config.settings import TTS_MAX_IN_FLIGHT, TTS_CHUNK_CHARS, TTS_STAND_IN_ENDPOINT
+from utils.async_runtime import get_client, prewarm_hooks
+from utils.sentences import split_sentences
+from utils.tts_cache import TTSCache
+from utils.output_engine import get_output_engine, pcm_to_float
+from utils.tracing import span
+from utils.resilience import call_with_retry_sync, get_breaker
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+audio_playing = threading.Event()
+audio_playing_lock = threading.Lock()
+
+# Voice and audio settings for every request; they are also part of the cache key
+VOICE_SETTINGS = {'language_code': 'en-US', 'ssml_gender': 'NEUTRAL'}
+
+def audio_settings():
+    # Speech is requested at the output stream's rate, found when the stream
+    # was opened, so it plays without resampling; this never opens a device
+    settings = {'audio_encoding': 'LINEAR16'}
+    sample_rate = get_output_engine().sample_rate
+    if sample_rate:
+        settings['sample_rate_hertz'] = sample_rate
+    return settings
+
+def make_tts_client():
+    # The Google client library takes a while to import, so it is loaded with the first client
+    from google.cloud import texttospeech
+    if TTS_STAND_IN_ENDPOINT:
+        import grpc
+        from google.cloud.texttospeech_v1.services.text_to_speech.transports import TextToSpeechGrpcTransport
+        logging.info(f"Using the Text-to-Speech stand-in at {TTS_STAND_IN_ENDPOINT}.")
+        transport = TextToSpeechGrpcTransport(channel=grpc.insecure_channel(TTS_STAND_IN_ENDPOINT))
+        return texttospeech.TextToSpeechClient(transport=transport)
+    return texttospeech.TextToSpeechClient()
+
+def get_tts_client():
+    # One client (and gRPC channel) for the whole process
+    return get_client('google_tts', make_tts_client)
+
+def prewarm_tts():
+    get_tts_client().list_voices(language_code="en-US")
+
+prewarm_hooks.append(prewarm_tts)
+
+def chunk_text(text, max_chars=TTS_CHUNK_CHARS):
+    # The first sentence is synthesized on its own so playback can start as
+    # early as possible; later sentences are grouped to save requests
+    sentences = split_sentences(text)
+    if not sentences:
+        return []
+    chunks = [sentences[0]]
+    current = ''
+    for sentence in sentences[1:]:
+        if current and len(current) + 1 + len(sentence) > max_chars:
+            chunks.append(current)
+            current = sentence
+        else:
+            current = f'{current} {sentence}' if current else sentence
+    if current:
+        chunks.append(current)
+    return chunks
+
+def synthesize_pcm(text):
+    # Returns (pcm_bytes, sample_rate, sample_width) for mono LINEAR16 speech
+    from google.cloud import texttospeech
+    client = get_tts_client()
+
+    # Set the text input to be synthesized
+    synthesis_input = texttospeech.SynthesisInput(text=text)
+
+    # Build the voice request
+    voice = texttospeech.VoiceSelectionParams(
+        language_code=VOICE_SETTINGS['language_code'],
+        ssml_gender=texttospeech.SsmlVoiceGender[VOICE_SETTINGS['ssml_gender']]
+    )
+
+    # Select the type of audio file you want returned
+    settings = audio_settings()
+    audio_config = texttospeech.AudioConfig(
+        audio_encoding=texttospeech.AudioEncoding[settings['audio_encoding']],
+        sample_rate_hertz=settings.get('sample_rate_hertz', 0)
+    )
+
+    # Perform the text-to-speech request. Chunks are synthesized while earlier
+    # ones play, so each has its own timeouts instead of the utterance budget.
+    response = call_with_retry_sync(
+        lambda timeout: client.synthesize_speech(
+            input=synthesis_input, voice=voice, audio_config=audio_config, timeout=timeout
+        ),
+        'synthesis', get_breaker('tts'),
+    )
+
+    # LINEAR16 responses carry a WAV header; read it from memory
+    with wave.open(io.BytesIO(response.audio_content), 'rb') as wf:
+        return wf.readframes(wf.getnframes()), wf.getframerate(), wf.getsampwidth()
+
+class TTSEngine:
+    """Synthesizes speech chunks concurrently and plays them from memory in order.
+
+    speak() splits the text into chunks and submits each to a bounded pool, at
+    most max_in_flight requests at once. The playback thread takes the chunks
+    in submission order and starts as soon as the first one is ready, while
+    later chunks are still being synthesized. stop() bumps the generation,
+    which cancels or skips everything submitted before it. A caller speaking
+    an answer piece by piece passes the generation it started in, so the
+    pieces that arrive after a stop() are dropped too.
+    """
+
+    def __init__(self, synthesize=synthesize_pcm, max_in_flight=TTS_MAX_IN_FLIGHT, cache=None):
+        self.synthesize = synthesize
+        self.cache = cache
+        self.executor = ThreadPoolExecutor(max_workers=max_in_flight, thread_name_prefix='tts-synthesis')
+        self.playback_queue = queue.Queue()
+        self.generation = 0
+        self.pending = 0
+        self.lock = threading.Lock()
+        self.playback_thread = None
+        self.precache_texts = {}
+
+    def speak(self, text, trace=None, generation=None):
+        # Returns False, queueing nothing, if the answer was interrupted since generation
+        chunks = chunk_text(text)
+        with self.lock:
+            if generation is not None and generation != self.generation:
+                logging.info("Speech was interrupted. Dropping the rest of the answer.")
+                return False
+            if self.playback_thread is None:
+                self.playback_thread = threading.Thread(target=self._playback_worker, name='tts-playback', daemon=True)
+                self.playback_thread.start()
+            for chunk in chunks:
+                self.pending += 1
+                self.playback_queue.put((self.generation, self._submit_chunk(chunk, trace), trace))
+        logging.info(f"Queued {len(chunks)} speech chunk(s) for synthesis.")
+        return True
+
+    def _submit_chunk(self, text, trace=None):
+        # Cache hits skip the pool and the network entirely
+        if self.cache is not None:
+            cached = self.cache.get(self._cache_key(text))
+            if cached is not None:
+                logging.info(f"TTS cache hit for {len(text)} characters.")
+                future = Future()
+                future.set_result(cached)
+                return future
+        return self.executor.submit(self._synthesize_chunk, text, trace)
+
+    def _cache_key(self, text):
+        return TTSCache.make_key(text, VOICE_SETTINGS, audio_settings())
+
+    def _synthesize_chunk(self, text, trace=None):
+        start = time.perf_counter()
+        with span(trace, 'synthesis', chars=len(text)):
+            result = self.synthesize(text)
+        logging.info(f"Synthesized {len(text)} characters in {(time.perf_counter() - start) * 1000:.0f} ms.")
+        if self.cache is not None:
+            self.cache.put(self._cache_key(text), result)
+        return result
+
+    def precache(self, texts=()):
+        # Synthesizes texts that are not cached yet, without playing them. The
+        # cache key includes the output rate, so until the output engine has
+        # one the texts are only kept; precache() with no texts, called when
+        # the engine starts, synthesizes all kept texts at its current rate.
+        self.precache_texts.update(dict.fromkeys(texts))
+        if self.cache is None or get_output_engine().sample_rate is None:
+            return
+        for text in list(self.precache_texts):
+            for chunk in chunk_text(text):
+                if self._cache_key(chunk) not in self.cache:
+                    self._synthesize_chunk(chunk)
+
+    def stop(self):
+        with self.lock:
+            self.generation += 1
+            # Cancel synthesis that hasn't started yet; the playback thread
+            # skips whatever remains of the old generation
+            for generation, future, trace in list(self.playback_queue.queue):
+                future.cancel()
+            stopped = audio_playing.is_set()
+            audio_playing.clear()
+        get_output_engine().clear_speech()
+        if stopped:
+            logging.info("Playback stopped")
+
+    def is_busy(self):
+        return audio_playing.is_set() or self.pending > 0
+
+    def _finish_chunk(self):
+        with self.lock:
+            self.pending = max(0, self.pending - 1)
+
+    @staticmethod
+    def _first_audio_hook(trace):
+        # Called from the output callback when the chunk's first frame goes out
+        if trace is None:
+            return None
+        return lambda: trace.record_once('first_audio', trace.marks.get('capture_end', trace.start))
+
+    def _playback_worker(self):
+        engine = get_output_engine()
+        last_done = None
+        while True:
+            generation, future, trace = self.playback_queue.get()
+            try:
+                pcm, sample_rate, sample_width = future.result()
+            except CancelledError:
+                self._finish_chunk()
+                continue
+            except Exception as e:
+                logging.error(f"Error synthesizing speech: {e}")
+                self._finish_chunk()
+                continue
+            try:
+                if generation == self.generation and engine.ensure_started():
+                    # Queued straight behind the previous chunk, so there is no gap
+                    last_done = engine.play_speech(pcm_to_float(pcm, sample_width), sample_rate, self._first_audio_hook(trace))
+                    audio_playing.set()
+            except Exception as e:
+                logging.error(f"Error playing sound: {e}")
+            finally:
+                self._finish_chunk()
+            if self.playback_queue.empty() and last_done is not None:
+                # Wait for the output to drain unless more speech arrives first
+                while not last_done.wait(0.02):
+                    if not self.playback_queue.empty() or not audio_playing.is_set():
+                        break
+                if last_done.is_set() and self.playback_queue.empty():
+                    audio_playing.clear()
+                    last_done = None
+                    logging.info("Playback finished")
+
+tts_cache = TTSCache()
+tts_engine = TTSEngine(cache=tts_cache)
+
+def text_to_speech(text, trace=None, generation=None):
+    return tts_engine.speak(text, trace, generation)
+
+def speech_generation():
+    # Pass to text_to_speech to drop the rest of an answer once speech is interrupted
+    return tts_engine.generation
+
+def precache_speech(texts=()):
+    tts_engine.precache(texts)
+
+def get_tts_cache_stats():
+    return tts_cache.stats()
+
+def stop_text_to_speech():
+    tts_engine.stop()
+
+def is_audio_playing():
+    return tts_engine.is_busy()
+
+def wait_for_audio_to_finish():
+    audio_playing.wait()
@@ -0,0 +1,152 @@
+import os
+import sys
+import json
+import time
+import uuid
+import queue
+import logging
+import threading
+import contextlib
+from logging.handlers import RotatingFileHandler
+import numpy as np
+from config.settings import TRACING, TRACE_FILE, TRACE_MAX_BYTES, TRACE_BACKUP_COUNT
+
+# Per-utterance latency tracing. Every utterance gets a Trace when its hotkey
+# is pressed; each stage records a timed span, and spans are written as JSON
+# lines to TRACE_FILE (rotated at TRACE_MAX_BYTES). Recording a span only puts
+# a dict on a queue, so it is cheap enough for the audio callback; a background
+# thread does the formatting and file writes.
+#
+# Summary: python -m utils.tracing [trace.jsonl]
+
+# Pipeline order, used to sort the summary
+STAGES = [
+    'dispatch', 'stream_open', 'capture', 'encode', 'upload', 'transcription',
+    'llm_first_token', 'llm_completion', 'synthesis', 'first_audio',
+]
+
+# Callables that also receive every record, e.g. the benchmark harness
+subscribers = []
+
+_records = queue.SimpleQueue()
+_writer = None
+_writer_lock = threading.Lock()
+
+class Trace:
+    """Spans of one utterance, timed from the key press (or start_time)."""
+
+    def __init__(self, hotkey_id, start_time=None):
+        self.id = uuid.uuid4().hex[:12]
+        self.hotkey_id = hotkey_id
+        now = time.time()
+        self.start_wall = start_time if start_time is not None else now
+        # The perf_counter reading at start_wall, so spans can begin before this object existed
+        self.start = time.perf_counter() - (now - self.start_wall)
+        self.marks = {}
+        self.recorded = set()
+        self.lock = threading.Lock()
+
+    def mark(self, name, at=None):
+        self.marks[name] = time.perf_counter() if at is None else at
+
+    def record(self, stage, start, end=None, **attrs):
+        end = time.perf_counter() if end is None else end
+        _emit({
+            'trace': self.id,
+            'hotkey': self.hotkey_id,
+            'stage': stage,
+            'time': round(self.start_wall + (start - self.start), 6),
+            'offset_ms': round((start - self.start) * 1000, 3),
+            'duration_ms': round((end - start) * 1000, 3),
+            **attrs,
+        })
+
+    def record_once(self, stage, start, end=None, **attrs):
+        with self.lock:
+            if stage in self.recorded:
+                return
+            self.recorded.add(stage)
+        self.record(stage, start, end, **attrs)
+
+    @contextlib.contextmanager
+    def span(self, stage, **attrs):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage, start, **attrs)
+
+def start_trace(hotkey_id, start_time=None):
+    return Trace(hotkey_id, start_time) if TRACING else None
+
+def span(trace, stage, **attrs):
+    # Lets callers trace optionally: span(None, ...) does nothing
+    return trace.span(stage, **attrs) if trace is not None else contextlib.nullcontext()
+
+def _emit(record):
+    for subscriber in subscribers:
+        subscriber(record)
+    _records.put(record)
+    if _writer is None:
+        _start_writer()
+
+def _start_writer():
+    global _writer
+    with _writer_lock:
+        if _writer is not None:
+            return
+        os.makedirs(os.path.dirname(TRACE_FILE) or '.', exist_ok=True)
+        handler = RotatingFileHandler(TRACE_FILE, maxBytes=TRACE_MAX_BYTES, backupCount=TRACE_BACKUP_COUNT, encoding='utf-8')
+        handler.setFormatter(logging.Formatter('%(message)s'))
+        trace_logger = logging.getLogger('whispry.trace')
+        trace_logger.setLevel(logging.INFO)
+        trace_logger.propagate = False
+        trace_logger.addHandler(handler)
+        _writer = threading.Thread(target=_write_records, args=(trace_logger,), name='trace-writer', daemon=True)
+        _writer.start()
+
+def _write_records(trace_logger):
+    while True:
+        record = _records.get()
+        try:
+            trace_logger.info(json.dumps(record))
+        except Exception as e:
+            logging.warning(f"Could not write trace record: {e}")
+
+def read_records(path=TRACE_FILE):
+    # Reads the current file and its rotated backups, oldest first
+    paths = [f'{path}.{index}' for index in range(TRACE_BACKUP_COUNT, 0, -1)] + [path]
+    records = []
+    for file_path in paths:
+        if not os.path.exists(file_path):
+            continue
+        with open(file_path, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    records.append(json.loads(line))
+                except json.JSONDecodeError:
+                    continue
+    return records
+
+def summarize(records):
+    # Returns {stage: (count, p50, p95, p99)} of duration_ms, in pipeline order
+    durations = {}
+    for record in records:
+        durations.setdefault(record['stage'], []).append(record['duration_ms'])
+    order = {stage: index for index, stage in enumerate(STAGES)}
+    summary = {}
+    for stage in sorted(durations, key=lambda stage: (order.get(stage, len(order)), stage)):
+        p50, p95, p99 = np.percentile(durations[stage], [50, 95, 99])
+        summary[stage] = (len(durations[stage]), p50, p95, p99)
+    return summary
+
+if __name__ == '__main__':
+    path = sys.argv[1] if len(sys.argv) > 1 else TRACE_FILE
+    records = read_records(path)
+    if not records:
+        print(f"No trace records in {path}")
+        raise SystemExit(1)
+    print(f"{len({record['trace'] for record in records})} utterances, {len(records)} spans from {path}")
+    print(f"{'stage':<18}{'count':>7}{'p50 (ms)':>11}{'p95 (ms)':>11}{'p99 (ms)':>11}")
+    for stage, (count, p50, p95, p99) in summarize(records).items():
+        print(f"{stage:<18}{count:>7}{p50:>11.1f}{p95:>11.1f}{p99:>11.1f}")
@@ -1,23 +1,96 @@
-import requests
-from config.settings import OPENAI_API_KEY
-import logging
-
-def transcribe_audio(file_path):
-    url = 'https://api.openai.com/v1/audio/transcriptions'
-    headers = {
-        'Authorization': f'Bearer {OPENAI_API_KEY}',
-    }
-    try:
-        with open(file_path, 'rb') as audio_file:
-            files = {'file': audio_file}
-            data = {'model': 'whisper-1'}
-            response = requests.post(url, headers=headers, files=files, data=data)
-            response.raise_for_status()
-            return response.json()['text']
-    except requests.exceptions.HTTPError as e:
-        logging.error(f"HTTP error occurred: {e}")
-        logging.error(f"Response content: {response.content.decode()}")
-        raise
-    except Exception as e:
-        logging.error(f"An error occurred: {e}")
-        raise
\ No newline at end of file
+import aiohttp
+import asyncio
+from config.settings import OPENAI_API_KEY, OPENAI_API_BASE, LONG_RECORDING_SECONDS, CHUNK_MAX_PARALLEL
+from utils.audio_clip import AudioClip
+from utils.audio_encoding import encode_audio
+from utils.async_runtime import get_session, run
+from utils.local_transcription import local_whisper
+from utils.tracing import span
+from utils.chunked_transcription import split_at_pauses, overlapping_flags, merge_transcripts
+from utils.resilience import call_with_retry, get_breaker
+import logging
+import os
+
+TRANSCRIPTION_URL = f'{OPENAI_API_BASE}/audio/transcriptions'
+
+def transcribe_audio(audio, name='input', encoder='wav', backend='remote', trace=None, deadline=None):
+    return run(transcribe_audio_async(audio, name, encoder, backend, trace, deadline))
+
+async def transcribe_audio_async(audio, name='input', encoder='wav', backend='remote', trace=None, deadline=None):
+    if backend not in TRANSCRIPTION_BACKENDS:
+        raise ValueError(f"Unknown transcription backend: {backend}")
+    if backend == 'remote' and isinstance(audio, AudioClip) and audio.duration > LONG_RECORDING_SECONDS:
+        return await _transcribe_chunked(audio, name, encoder, trace, deadline)
+    return await TRANSCRIPTION_BACKENDS[backend](audio, name, encoder, trace, deadline)
+
+async def _transcribe_remote(audio, name, encoder, trace=None, deadline=None):
+    # In-memory clips are encoded and uploaded straight from a buffer; a file
+    # path is still accepted for recordings kept on disk
+    if isinstance(audio, AudioClip):
+        # Encoding may run ffmpeg, so keep it off the event loop
+        with span(trace, 'encode', encoder=encoder):
+            encoded = await asyncio.get_running_loop().run_in_executor(None, encode_audio, audio, encoder)
+        return await _post_transcription(f'{name}.{encoded.extension}', encoded.data, encoded.mime_type, trace, deadline)
+    with open(audio, 'rb') as audio_file:
+        return await _post_transcription(os.path.basename(audio), audio_file.read(), 'audio/wav', trace, deadline)
+
+async def _post_transcription(filename, audio_bytes, content_type, trace=None, deadline=None):
+    headers = {
+        'Authorization': f'Bearer {OPENAI_API_KEY}',
+    }
+
+    async def attempt():
+        # A form can only be sent once, so every attempt builds its own
+        form = aiohttp.FormData()
+        form.add_field('file', audio_bytes, filename=filename, content_type=content_type)
+        form.add_field('model', 'whisper-1')
+        session = await get_session()
+        async with session.post(TRANSCRIPTION_URL, headers=headers, data=form) as response:
+            if response.status >= 400:
+                logging.error(f"Response content: {await response.text()}")
+            response.raise_for_status()
+            return await response.json()
+
+    try:
+        # The API doesn't report upload and inference separately, so this span covers both
+        with span(trace, 'upload', bytes=len(audio_bytes)):
+            result = await call_with_retry(attempt, 'transcription', get_breaker('transcription'), deadline)
+        return result['text']
+    except aiohttp.ClientResponseError as e:
+        logging.error(f"HTTP error occurred: {e.status} - {e.message}")
+        raise
+    except Exception as e:
+        logging.error(f"An error occurred: {e}")
+        raise
+
+async def _transcribe_chunked(clip, name, encoder, trace=None, deadline=None, max_parallel=CHUNK_MAX_PARALLEL):
+    # Splitting runs the VAD over the whole recording, so keep it off the event loop
+    loop = asyncio.get_running_loop()
+    chunks = await loop.run_in_executor(None, split_at_pauses, clip.samples, clip.sample_rate)
+    logging.info(f"Transcribing {clip.duration:.1f}s of audio as {len(chunks)} chunk(s), up to {max_parallel} at once.")
+    semaphore = asyncio.Semaphore(max_parallel)
+
+    async def transcribe_chunk(index, start, end):
+        async with semaphore:
+            chunk = AudioClip(clip.samples[start:end], clip.sample_rate)
+            return await _transcribe_remote(chunk, f'{name}_part{index}', encoder, trace, deadline)
+
+    texts = await asyncio.gather(*(transcribe_chunk(index, start, end) for index, (start, end) in enumerate(chunks)))
+    return merge_transcripts(texts, overlapping_flags(chunks))
+
+async def _transcribe_local(audio, name, encoder, trace=None, deadline=None):
+    # The samples go to the model as they are; nothing is encoded or written
+    clip = audio if isinstance(audio, AudioClip) else AudioClip.from_wav(audio)
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(local_whisper.executor, local_whisper.transcribe, clip.samples, clip.sample_rate)
+
+# Selected per hotkey with the 'transcriber' option
+TRANSCRIPTION_BACKENDS = {
+    'remote': _transcribe_remote,
+    'local': _transcribe_local,
+}
+
+def load_transcription_backend(backend):
+    # Loads a backend's model up front; the remote backend has nothing to load
+    if backend == 'local':
+        local_whisper.load()
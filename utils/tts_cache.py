@@ -0,0 +1,154 @@
+import os
+import io
+import json
+import wave
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from config.settings import TTS_CACHE_MAX_BYTES, TTS_CACHE_DIR, TTS_CACHE_DISK_MAX_BYTES
+
+class TTSCache:
+    """Synthesized speech keyed by text, voice and audio config.
+
+    Entries are (pcm, sample_rate, sample_width). The memory tier is an LRU
+    bounded by total PCM bytes; the optional disk tier keeps WAV files in
+    disk_dir, also evicted least recently used first, and survives restarts.
+    """
+
+    def __init__(self, max_bytes=TTS_CACHE_MAX_BYTES, disk_dir=TTS_CACHE_DIR, disk_max_bytes=TTS_CACHE_DISK_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.disk_dir = disk_dir
+        self.disk_max_bytes = disk_max_bytes
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+        self.bytes = 0
+        self.disk_entries = OrderedDict()
+        self.disk_bytes = 0
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        if disk_dir:
+            self._load_disk_index()
+
+    @staticmethod
+    def make_key(text, voice, audio_config):
+        material = json.dumps({'text': text, 'voice': voice, 'audio': audio_config}, sort_keys=True)
+        return hashlib.sha256(material.encode('utf-8')).hexdigest()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return entry
+        entry = self._read_disk(key)
+        with self.lock:
+            if entry is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+            self._store(key, entry)
+        return entry
+
+    def __contains__(self, key):
+        # A membership test that is not counted as a lookup and leaves the LRU order alone
+        with self.lock:
+            return key in self.entries or key in self.disk_entries
+
+    def put(self, key, entry):
+        with self.lock:
+            self._store(key, entry)
+        if self.disk_dir:
+            self._write_disk(key, entry)
+
+    def _store(self, key, entry):
+        size = len(entry[0])
+        if size > self.max_bytes:
+            return
+        if key in self.entries:
+            self.bytes -= len(self.entries.pop(key)[0])
+        self.entries[key] = entry
+        self.bytes += size
+        while self.bytes > self.max_bytes:
+            _, evicted = self.entries.popitem(last=False)
+            self.bytes -= len(evicted[0])
+            self.evictions += 1
+
+    def _path(self, key):
+        return os.path.join(self.disk_dir, f'{key}.wav')
+
+    def _load_disk_index(self):
+        os.makedirs(self.disk_dir, exist_ok=True)
+        files = []
+        for name in os.listdir(self.disk_dir):
+            if name.endswith('.wav'):
+                stat = os.stat(os.path.join(self.disk_dir, name))
+                files.append((stat.st_mtime, name[:-4], stat.st_size))
+        for _, key, size in sorted(files):
+            self.disk_entries[key] = size
+            self.disk_bytes += size
+
+    def _read_disk(self, key):
+        if not self.disk_dir:
+            return None
+        with self.lock:
+            if key not in self.disk_entries:
+                return None
+            self.disk_entries.move_to_end(key)
+        try:
+            with wave.open(self._path(key), 'rb') as wf:
+                entry = (wf.readframes(wf.getnframes()), wf.getframerate(), wf.getsampwidth())
+            os.utime(self._path(key))
+            return entry
+        except Exception as e:
+            logging.warning(f"Dropping unreadable TTS cache file for {key}: {e}")
+            with self.lock:
+                self.disk_bytes -= self.disk_entries.pop(key, 0)
+            return None
+
+    def _write_disk(self, key, entry):
+        pcm, sample_rate, sample_width = entry
+        buffer = io.BytesIO()
+        with wave.open(buffer, 'wb') as wf:
+            wf.setnchannels(1)
+            wf.setsampwidth(sample_width)
+            wf.setframerate(sample_rate)
+            wf.writeframes(pcm)
+        data = buffer.getvalue()
+        try:
+            with open(self._path(key), 'wb') as f:
+                f.write(data)
+        except Exception as e:
+            logging.warning(f"Could not write TTS cache file: {e}")
+            return
+        with self.lock:
+            self.disk_bytes += len(data) - self.disk_entries.pop(key, 0)
+            self.disk_entries[key] = len(data)
+            evicted = []
+            while self.disk_bytes > self.disk_max_bytes and len(self.disk_entries) > 1:
+                old_key, size = self.disk_entries.popitem(last=False)
+                self.disk_bytes -= size
+                evicted.append(old_key)
+        for old_key in evicted:
+            try:
+                os.remove(self._path(old_key))
+            except OSError as e:
+                logging.warning(f"Could not remove TTS cache file: {e}")
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                'hits': self.hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'hit_rate': (self.hits + self.disk_hits) / lookups if lookups else 0.0,
+                'entries': len(self.entries),
+                'bytes': self.bytes,
+                'disk_entries': len(self.disk_entries),
+                'disk_bytes': self.disk_bytes,
+                'evictions': self.evictions,
+            }
@@ -0,0 +1,155 @@
+import logging
+import threading
+import numpy as np
+from config.settings import (
+    VAD_FRAME_MS,
+    VAD_ENERGY_THRESHOLD_DB,
+    VAD_UNVOICED_MARGIN_DB,
+    VAD_ZCR_THRESHOLD,
+    VAD_MIN_SPEECH_MS,
+    VAD_HANGOVER_MS,
+    VAD_PADDING_MS,
+)
+from utils.audio_clip import AudioClip
+
+# Frames converted to float at once by frame_features (500 frames = 10 s at 20 ms)
+FEATURE_CHUNK_FRAMES = 500
+
+def _as_float(samples):
+    samples = np.asarray(samples).reshape(-1)
+    if samples.dtype == np.int16:
+        return samples.astype(np.float32) / 32768.0
+    return samples.astype(np.float32, copy=False)
+
+def frame_features(samples, frame_length, chunk_frames=FEATURE_CHUNK_FRAMES):
+    # Returns per-frame RMS level in dBFS and zero-crossing rate; a trailing
+    # partial frame is ignored. Long recordings are converted to float a
+    # chunk at a time, so memory use doesn't grow with their length.
+    samples = np.asarray(samples).reshape(-1)
+    n_frames = len(samples) // frame_length
+    level_db = np.empty(n_frames, dtype=np.float32)
+    zcr = np.empty(n_frames, dtype=np.float32)
+    for first in range(0, n_frames, chunk_frames):
+        last = min(n_frames, first + chunk_frames)
+        frames = _as_float(samples[first * frame_length:last * frame_length]).reshape(last - first, frame_length)
+        rms = np.sqrt(np.mean(np.square(frames), axis=1))
+        level_db[first:last] = 20 * np.log10(rms + 1e-10)
+        signs = np.signbit(frames)
+        zcr[first:last] = np.mean(signs[:, 1:] != signs[:, :-1], axis=1)
+    return level_db, zcr
+
+def classify_frames(level_db, zcr, energy_threshold_db=VAD_ENERGY_THRESHOLD_DB,
+                    unvoiced_margin_db=VAD_UNVOICED_MARGIN_DB, zcr_threshold=VAD_ZCR_THRESHOLD):
+    voiced = level_db >= energy_threshold_db
+    unvoiced = (level_db >= energy_threshold_db - unvoiced_margin_db) & (zcr >= zcr_threshold)
+    return voiced | unvoiced
+
+def _runs(mask):
+    # Start and end indices of each run of True values
+    edges = np.diff(np.concatenate(([0], mask.astype(np.int8), [0])))
+    return np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)
+
+def smooth_mask(mask, min_speech_frames, hangover_frames):
+    mask = mask.copy()
+    starts, ends = _runs(mask)
+    for start, end in zip(starts, ends):
+        if end - start < min_speech_frames:
+            mask[start:end] = False
+    starts, ends = _runs(mask)
+    for gap_start, gap_end in zip(ends[:-1], starts[1:]):
+        if gap_end - gap_start <= hangover_frames:
+            mask[gap_start:gap_end] = True
+    return mask
+
+def speech_frames(samples, sample_rate=16000, frame_ms=VAD_FRAME_MS, **thresholds):
+    frame_length = int(sample_rate * frame_ms / 1000)
+    level_db, zcr = frame_features(samples, frame_length)
+    mask = classify_frames(level_db, zcr, **thresholds)
+    return smooth_mask(
+        mask,
+        max(1, int(VAD_MIN_SPEECH_MS / frame_ms)),
+        int(VAD_HANGOVER_MS / frame_ms),
+    )
+
+def is_silent(samples, sample_rate=16000, **thresholds):
+    frame_length = int(sample_rate * VAD_FRAME_MS / 1000)
+    level_db, zcr = frame_features(samples, frame_length)
+    return not classify_frames(level_db, zcr, **thresholds).any()
+
+def speech_bounds(samples, sample_rate=16000, padding_ms=VAD_PADDING_MS, **thresholds):
+    # Sample range that holds all detected speech plus padding, or None
+    mask = speech_frames(samples, sample_rate, **thresholds)
+    speech = np.flatnonzero(mask)
+    if not len(speech):
+        return None
+    frame_length = int(sample_rate * VAD_FRAME_MS / 1000)
+    padding = int(sample_rate * padding_ms / 1000)
+    start = max(0, speech[0] * frame_length - padding)
+    end = min(len(samples), (speech[-1] + 1) * frame_length + padding)
+    return start, end
+
+def trim_silence(clip, padding_ms=VAD_PADDING_MS, **thresholds):
+    bounds = speech_bounds(clip.samples, clip.sample_rate, padding_ms, **thresholds)
+    if bounds is None:
+        logging.info(f"No speech detected in {clip.duration:.2f}s of audio.")
+        return AudioClip(clip.samples[:0], clip.sample_rate)
+    start, end = bounds
+    trimmed = AudioClip(clip.samples[start:end], clip.sample_rate)
+    if len(trimmed) < len(clip):
+        logging.info(f"Trimmed silence: {clip.duration:.2f}s -> {trimmed.duration:.2f}s")
+    return trimmed
+
+class VoiceActivityDetector:
+    """Tracks speech and trailing silence across the blocks from audio_callback.
+
+    With auto_stop_ms set, on_auto_stop is called once (on its own thread, never
+    on the audio thread) after that much silence has followed detected speech.
+    """
+
+    def __init__(self, sample_rate=16000, auto_stop_ms=0, on_auto_stop=None, **thresholds):
+        self.sample_rate = sample_rate
+        self.frame_length = int(sample_rate * VAD_FRAME_MS / 1000)
+        self.auto_stop_ms = auto_stop_ms
+        self.on_auto_stop = on_auto_stop
+        self.thresholds = thresholds
+        self.remainder = np.zeros(0, dtype=np.float32)
+        self.min_speech_frames = max(1, int(VAD_MIN_SPEECH_MS / VAD_FRAME_MS))
+        self.speech_detected = False
+        self.speech_run = 0
+        self.silence_frames = 0
+        self.triggered = False
+
+    @property
+    def silence_ms(self):
+        return self.silence_frames * VAD_FRAME_MS
+
+    def feed(self, block):
+        samples = np.concatenate((self.remainder, _as_float(block)))
+        usable = len(samples) // self.frame_length * self.frame_length
+        self.remainder = samples[usable:]
+        if not usable:
+            return
+        level_db, zcr = frame_features(samples[:usable], self.frame_length)
+        starts, ends = _runs(classify_frames(level_db, zcr, **self.thresholds))
+        # Only runs of at least VAD_MIN_SPEECH_MS count as speech, so a key click
+        # cannot arm auto-stop; a run may continue from the previous block
+        speech_end = None
+        for start, end in zip(starts, ends):
+            length = end - start + (self.speech_run if start == 0 else 0)
+            if length >= self.min_speech_frames:
+                speech_end = end
+        if len(ends) and ends[-1] == len(level_db):
+            self.speech_run = ends[-1] - starts[-1] + (self.speech_run if starts[-1] == 0 else 0)
+        else:
+            self.speech_run = 0
+        if speech_end is not None:
+            self.speech_detected = True
+            self.silence_frames = len(level_db) - speech_end
+        else:
+            self.silence_frames += len(level_db)
+        if (self.auto_stop_ms and self.speech_detected and not self.triggered
+                and self.silence_ms >= self.auto_stop_ms):
+            self.triggered = True
+            logging.info(f"Auto-stop after {self.silence_ms} ms of silence.")
+            if self.on_auto_stop:
+                threading.Thread(target=self.on_auto_stop, daemon=True).start()